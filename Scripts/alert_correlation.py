@@ -0,0 +1,163 @@
+import json
+import os
+import re
+from datetime import datetime, timedelta
+
+import pytz
+
+# 📌 Correlation Settings
+FLAP_WINDOW_MINUTES = 10      # Aynı cihazın bu süre içindeki değişiklikleri tek olaya indirilir
+SETTLE_MINUTES = 2            # Bu süreden yeni olaylar bir sonraki çalışmaya bekletilir (flap/site gruplaması için)
+RATE_LIMIT_WINDOW_MINUTES = 60
+RATE_LIMIT_MAX_MAILS = 6      # Alıcı başına pencere içinde gönderilebilecek en fazla mail
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+TR_TIMEZONE = pytz.timezone("Europe/Istanbul")     # statseeker_base log zamanları bu saat diliminde yazılır
+
+# statseeker_base.extract_location ve ap_data.extract_ap_location ile aynı kalıplar
+SITE_PATTERNS = [
+    re.compile(r'Tr([A-Za-z0-9]+?)(?=csw|sw|ttr)', re.IGNORECASE),
+    re.compile(r'Tr([A-Za-z0-9]+?)(?:-?TSEG|-?SEG)', re.IGNORECASE),
+]
+
+
+def site_of(hostname):
+    """Hostname'den site/lokasyon kodunu çıkarır."""
+    if not isinstance(hostname, str):
+        return "Unknown"
+    for pattern in SITE_PATTERNS:
+        match = pattern.search(hostname)
+        if match:
+            return match.group(1).upper()
+    return "Unknown"
+
+
+def parse_timestamp(value):
+    try:
+        return TR_TIMEZONE.localize(datetime.strptime(value, TIMESTAMP_FORMAT))
+    except (TypeError, ValueError):
+        return None
+
+
+def collapse_flaps(entries, flap_window=FLAP_WINDOW_MINUTES):
+    """
+    Bir cihazın birbirine flap_window dakikadan yakın değişikliklerini tek olaya indirir.
+    Sonuç olayda old_status ilk durumu, new_status son durumu, flap_count ara geçiş sayısını taşır.
+    """
+    window = timedelta(minutes=flap_window)
+    by_device = {}
+    for entry in entries:
+        by_device.setdefault(str(entry.get("deviceid")), []).append(entry)
+
+    collapsed = []
+    for device_entries in by_device.values():
+        device_entries.sort(key=lambda e: e["timestamp"])
+        chain = [device_entries[0]]
+
+        for entry in device_entries[1:]:
+            previous_time = parse_timestamp(chain[-1]["timestamp"])
+            current_time = parse_timestamp(entry["timestamp"])
+            if previous_time and current_time and current_time - previous_time <= window:
+                chain.append(entry)
+            else:
+                collapsed.append(merge_chain(chain))
+                chain = [entry]
+        collapsed.append(merge_chain(chain))
+
+    collapsed.sort(key=lambda e: e["timestamp"])
+    return collapsed
+
+
+def merge_chain(chain):
+    """Flap zincirini tek olay olarak birleştirir; birleşen log_id'ler korunur."""
+    event = dict(chain[-1])
+    event["old_status"] = chain[0].get("old_status")
+    event["first_timestamp"] = chain[0]["timestamp"]
+    event["flap_count"] = len(chain) - 1
+    event["log_ids"] = [e.get("log_id") for e in chain]
+    event["site"] = site_of(event.get("hostname"))
+
+    # İlk DOWN olayındaki etki analizi korunur
+    if "impact" not in event:
+        for e in reversed(chain):
+            if "impact" in e:
+                event["impact"] = e["impact"]
+                break
+    return event
+
+
+def group_by_site(events):
+    """Olayları site bazında gruplar; en çok etkilenen site en üstte olur."""
+    groups = {}
+    for event in events:
+        group = groups.setdefault(event["site"], {"site": event["site"], "down": [], "up": [], "flapping": []})
+        if event["flap_count"]:
+            group["flapping"].append(event)
+        if event.get("new_status", "").lower() == "down":
+            group["down"].append(event)
+        else:
+            group["up"].append(event)
+    return sorted(groups.values(), key=lambda g: (-len(g["down"]), g["site"]))
+
+
+def split_settled(entries, now, settle=SETTLE_MINUTES):
+    """Son değişikliği settle süresinden yeni olan cihazların tüm olaylarını bekletir."""
+    cutoff = now - timedelta(minutes=settle)
+    latest = {}
+    for entry in entries:
+        key = str(entry.get("deviceid"))
+        if key not in latest or entry["timestamp"] > latest[key]:
+            latest[key] = entry["timestamp"]
+
+    ready, held = [], []
+    for entry in entries:
+        latest_time = parse_timestamp(latest[str(entry.get("deviceid"))])
+        if latest_time and latest_time > cutoff:
+            held.append(entry)
+        else:
+            ready.append(entry)
+    return ready, held
+
+
+def load_state(state_file):
+    """Rate limit ve son işlenen dosya durumunu yükler."""
+    if os.path.exists(state_file):
+        try:
+            with open(state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+                if isinstance(state, dict):
+                    return state
+        except (json.JSONDecodeError, OSError):
+            pass
+    return {"sent": {}, "logs_mtime": None, "pending": False}
+
+
+def save_state(state_file, state):
+    tmp_path = f"{state_file}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_file)
+
+
+def allow_send(state, recipient, now,
+               window=RATE_LIMIT_WINDOW_MINUTES, max_mails=RATE_LIMIT_MAX_MAILS):
+    """Alıcının pencere içindeki mail sayısı limitin altındaysa True döner."""
+    cutoff = (now - timedelta(minutes=window)).strftime(TIMESTAMP_FORMAT)
+    history = [t for t in state.setdefault("sent", {}).get(recipient, []) if t > cutoff]
+    state["sent"][recipient] = history
+    return len(history) < max_mails
+
+
+def record_send(state, recipient, now):
+    state.setdefault("sent", {}).setdefault(recipient, []).append(now.strftime(TIMESTAMP_FORMAT))
+
+
+def correlate(entries, now=None):
+    """
+    Gönderilmemiş değişiklikleri korelasyon aşamasından geçirir.
+    Dönüş: (site grupları, gönderilecek olaylar, bekletilen kayıtlar)
+    """
+    now = now or datetime.now(TR_TIMEZONE)
+    ready, held = split_settled(entries, now)
+    events = collapse_flaps(ready) if ready else []
+    return group_by_site(events), events, held
@@ -3,13 +3,15 @@ import json
 import pandas as pd
 import logging
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 import io
 import os
 import time
 from functools import lru_cache
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+import endpoint_retry
 
 load_dotenv()
 
@@ -51,42 +53,45 @@ def normalize_interface_name(name):
     return name.replace('GigabitEthernet', 'Gi').replace('TenGigabitEthernet', 'Te')
 
 
-def fetch_device_data(hostname, bearer_token, retry=0):
-    logging.info(f"Cihaz verileri alınıyor: {hostname} (Deneme {retry + 1})")
-    device_url = f"{netdb_base_url}{hostname}/details?device_type=cisco_ios"
-    interfaces_url = f"{netdb_base_url}{hostname}/interfaces?device_type=cisco_ios"
-    vlans_url = f"{netdb_base_url}{hostname}/vlans?device_type=cisco_ios"
-    neighbors_url = f"{netdb_base_url}{hostname}/neighbors?device_type=cisco_ios"
-    headers = {'Authorization': f'Bearer {bearer_token}', 'Accept': 'application/json'}
+def device_endpoint_urls(hostname):
+    return {
+        'device': f"{netdb_base_url}{hostname}/details?device_type=cisco_ios",
+        'interfaces': f"{netdb_base_url}{hostname}/interfaces?device_type=cisco_ios",
+        'vlans': f"{netdb_base_url}{hostname}/vlans?device_type=cisco_ios",
+        'neighbors': f"{netdb_base_url}{hostname}/neighbors?device_type=cisco_ios"
+    }
 
-    try:
-        device_response = requests.get(device_url, headers=headers, timeout=60 + retry * 30)
-        interfaces_response = requests.get(interfaces_url, headers=headers, timeout=60 + retry * 30)
-        vlans_response = requests.get(vlans_url, headers=headers, timeout=60 + retry * 30)
-        neighbors_response = requests.get(neighbors_url, headers=headers, timeout=60 + retry * 30)
-
-        if all(response.status_code == 200 for response in
-               [device_response, interfaces_response, vlans_response, neighbors_response]):
-            logging.info(f"Cihaz verileri başarıyla alındı: {hostname}")
-            return device_response.json(), interfaces_response.json(), vlans_response.json(), neighbors_response.json()
-        else:
-            logging.error(f"Cihaz veri çekme hatası: {hostname}")
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Cihaz verileri alınırken hata oluştu: {hostname}, {e}")
 
-    if retry < 2:
-        time.sleep(10 * (retry + 1))
-        return fetch_device_data(hostname, bearer_token, retry + 1)
-    return None, None, None, None
+def fetch_devices_data(hostnames, bearer_token, on_device_done=None, max_workers=20):
+    """Endpoint bazlı retry: sadece başarısız endpoint tekrar denenir, worker'lar beklemede bloklanmaz."""
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers))
+    session.headers.update({'Authorization': f'Bearer {bearer_token}', 'Accept': 'application/json'})
+    jobs = {hostname: device_endpoint_urls(hostname) for hostname in hostnames}
+    with session:
+        return endpoint_retry.fetch_endpoints(
+            jobs,
+            lambda url: endpoint_retry.get_json(session, url, timeout=60),
+            max_workers=max_workers,
+            on_host_done=on_device_done,
+        )
 
 
-def process_device_data(row, bearer_token):
+def process_device_data(row, fetched):
     device_id = row['deviceid']
     hostname = row['hostname']
 
-    device_data, interfaces_data, vlans_data, neighbors_data = fetch_device_data(hostname, bearer_token)
+    payloads = fetched['results']
+    if fetched['stale']:
+        logging.warning(f"Önceki veriden kullanılan endpoint'ler: {hostname}, {fetched['stale']}")
 
-    if not all([device_data, interfaces_data, vlans_data, neighbors_data]):
+    # Eksik endpoint'ler boş kabul edilir; detay ve interface verisi olmadan cihaz işlenemez
+    device_data = payloads.get('device')
+    interfaces_data = payloads.get('interfaces')
+    vlans_data = payloads.get('vlans') or {}
+    neighbors_data = payloads.get('neighbors') or {}
+
+    if not all([device_data, interfaces_data]):
         logging.warning(f"Veri alınamadı: {hostname}")
         return {hostname: {
             'device_info': {
@@ -161,7 +166,8 @@ def process_device_data(row, bearer_token):
         'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         'active_gigabit_ports': active_gigabit_ports,
         'vlan_info': vlan_info_list,
-        'ports': port_data
+        'ports': port_data,
+        'stale_endpoints': fetched['stale']
     }}
 
 
@@ -183,13 +189,17 @@ def fetch_network_data():
     all_data = {}
     failed_devices = []
 
-    with ThreadPoolExecutor(max_workers=20) as executor:
-        future_to_switch = {executor.submit(process_device_data, row, bearer_token): row for _, row in
-                            switches.iterrows()}
-        for future in tqdm(as_completed(future_to_switch), total=len(switches), desc="Cihaz verileri işleniyor"):
-            result = future.result()
-            if result:
-                all_data.update(result)
+    rows = {row['hostname']: row for _, row in switches.iterrows()}
+    progress = tqdm(total=len(rows), desc="Cihaz verileri işleniyor")
+
+    def on_device_done(hostname, fetched):
+        progress.update(1)
+        result = process_device_data(rows[hostname], fetched)
+        if result:
+            all_data.update(result)
+
+    fetch_devices_data(list(rows), bearer_token, on_device_done=on_device_done)
+    progress.close()
 
     total_active_devices = sum(
         1 for device in all_data.values() if device.get('device_info', {}).get('uptime') != 'N/A')
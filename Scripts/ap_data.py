@@ -14,6 +14,12 @@ from cryptography.fernet import Fernet
 import time
 from dotenv import load_dotenv
 
+import circuit_breaker
+import profiling
+import run_ledger
+import sweep_scheduler
+import topology
+
 load_dotenv()
 
 sys.stdout.reconfigure(encoding='utf-8')
@@ -32,17 +38,43 @@ PROXY = {
 }
 
 # Statseeker API connection details
-statseeker_base_url = 'https://statseeker.emea.fedex.com/api/v2.1/'
+statseeker_base_url = os.environ.get("STATSEEKER_API_URL", "https://statseeker.emea.fedex.com/api/v2.1").rstrip("/") + "/"
 statseeker_user = os.environ.get("STATSEEKER_USERNAME")
 statseeker_password = os.environ.get("STATSEEKER_PASSWORD")
 
+# Circuit breaker durumu (switch_ports ile ayrı dosya; işler paralel çalışabilir)
+BREAKER_STATE_FILE = "D:/INTRANET/Netinfo/Data/circuit_breaker_ap.json"
+
+# Statseeker adı -> NetDB hostname çözümleme önbelleği
+HOSTNAME_MAP_FILE = "D:/INTRANET/Netinfo/Data/ap_hostname_map.json"
+HOSTNAME_REVALIDATE_DAYS = 7   # Bu süredir doğrulanmamış eşleşmeler baştan çözülür
+
+# Tarama planı: sadece zamanı gelen AP'ler NetDB'ye sorulur, diğerleri önceki kaydı korur
+SCHEDULE_STATE_FILE = "D:/INTRANET/Netinfo/Data/sweep_schedule_ap.json"
+BASE_INTERVAL = 15 * 60        # Yeni AP'nin başlangıç sorgu aralığı (eski sabit tarama aralığı)
+# Sadece AP'nin kurulumunu tanımlayan alanlar; istemci sayısı/listesi her turda değiştiğinden dahil edilmez
+AP_FINGERPRINT_FIELDS = ('netdb_hostname', 'serial', 'wireless_ssids', 'connected_switch', 'connected_port')
+
 # NetDB API URLs
-NETDB_AUTH_URL = "https://network-api.npe.fedex.com/v1/authorize"
-NETDB_BASE_URL = "https://network-api.npe.fedex.com/v1/device/"
+NETDB_API_URL = os.environ.get("NETDB_API_URL", "https://network-api.npe.fedex.com/v1").rstrip("/")  # Yerel test: fake_api_server.py
+NETDB_AUTH_URL = f"{NETDB_API_URL}/authorize"
+NETDB_BASE_URL = f"{NETDB_API_URL}/device/"
+
+# AP endpoint'leri ve her tüketicinin ihtiyaç duyduğu alt küme
+AP_ENDPOINT_PATHS = {
+    "facts": "facts?device_type=extreme_wing",
+    "interfaces": "interfaces?device_type=extreme_wing",
+    "wireless_clients": "wireless-clients?device_type=extreme_wing&rf_domain=self",
+    "neighbors": "neighbors?device_type=extreme_wing",
+    "wireless_radios": "wireless-radios?device_type=extreme_wing&rf_domain=self",
+}
+AP_CONSUMERS = {
+    "inventory": ["facts", "interfaces", "wireless_clients", "neighbors"],      # parse_netdb_data
+    "enhanced": ["facts", "wireless_radios", "neighbors", "wireless_clients"],  # parse_enhanced_data_v2
+}
 
 # Log settings
-log_directory = "D:/INTRANET/Netinfo/Logs/Latest_Logs"
-os.makedirs(log_directory, exist_ok=True)
+log_directory = "D:/INTRANET/Netinfo/Logs/Latest_Logs"   # İlk log yazılırken oluşturulur
 
 log_start_date = datetime.now(pytz.timezone("Europe/Istanbul")).strftime("%Y%m%d")
 log_file_path = os.path.join(log_directory, f"access_point_inventory_{log_start_date}.log")
@@ -65,6 +97,7 @@ def log_message(message):
     log_entry = f"{timestamp} [{elapsed:.1f}s] - {message}\n"
 
     try:
+        os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
         with open(log_file_path, 'a', encoding='utf-8') as log_file:
             log_file.write(log_entry)
         print(f"LOG: {message}")
@@ -127,7 +160,8 @@ def get_netdb_bearer_token():
 
     for attempt in range(3):
         try:
-            response = requests.post(NETDB_AUTH_URL, data=auth_data, headers=headers, timeout=60)
+            with run_ledger.timed_request(NETDB_AUTH_URL) as call:
+                response = call["response"] = requests.post(NETDB_AUTH_URL, data=auth_data, headers=headers, timeout=60)
             response.raise_for_status()
             token = response.json().get("access_token")
             if token:
@@ -142,12 +176,13 @@ def get_netdb_bearer_token():
 
 def fetch_statseeker_ap_data():
     """Fetch AP data from Statseeker."""
-    url = f"{statseeker_base_url}cdt_device?fields=id,deviceid,name,ipaddress,sysName,sysDescr,sysObjectID,sysContact,sysLocation&groups=NOC-Turkey&links=none&limit=10000"
+    url = f"{statseeker_base_url}cdt_device?fields=id,deviceid,name,ipaddress,ping_state,sysName,sysDescr,sysObjectID,sysContact,sysLocation&groups=NOC-Turkey&links=none&limit=10000"
 
     try:
         log_message(f"Fetching data from Statseeker: NOC-Turkey group")
-        response = requests.get(url, auth=(statseeker_user, statseeker_password), verify=SSL_VERIFY, timeout=60,
-)
+        with run_ledger.timed_request(url) as call:
+            response = call["response"] = requests.get(url, auth=(statseeker_user, statseeker_password),
+                                                       verify=SSL_VERIFY, timeout=60)
 
         if response.status_code == 200:
             data = response.json()
@@ -198,80 +233,185 @@ def create_smart_hostname_mapping(statseeker_hostname):
     return variations[:2]
 
 
-def fetch_netdb_data_sync(hostname, bearer_token):
-    """Fetch NetDB data synchronously for a single hostname."""
-    if not bearer_token:
-        return create_default_result()
+def load_hostname_map():
+    """Daha önce NetDB'de yanıt veren hostname eşleşmelerini yükler."""
+    if not os.path.exists(HOSTNAME_MAP_FILE):
+        return {}
+    try:
+        with open(HOSTNAME_MAP_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        log_message(f"Hostname map load error: {e}")
+        return {}
 
-    headers = {"Authorization": f"Bearer {bearer_token}", "Accept": "application/json"}
 
-    endpoints = [
-        ("facts", f"{NETDB_BASE_URL}{hostname}/facts?device_type=extreme_wing"),
-        ("interfaces", f"{NETDB_BASE_URL}{hostname}/interfaces?device_type=extreme_wing"),
-        ("wireless_clients", f"{NETDB_BASE_URL}{hostname}/wireless-clients?device_type=extreme_wing&rf_domain=self"),
-        ("neighbors", f"{NETDB_BASE_URL}{hostname}/neighbors?device_type=extreme_wing")
-    ]
+def save_hostname_map(hostname_map):
+    temp_file = HOSTNAME_MAP_FILE + ".tmp"
+    try:
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(hostname_map, f, indent=2, ensure_ascii=False)
+        os.replace(temp_file, HOSTNAME_MAP_FILE)
+    except OSError as e:
+        log_message(f"Hostname map save error: {e}")
+
+
+def resolved_hostname(statseeker_hostname, hostname_map):
+    """Geçerli (süresi dolmamış) eşleşme varsa NetDB hostname'ini döndürür."""
+    entry = (hostname_map or {}).get(statseeker_hostname)
+    if not entry:
+        return None
+    try:
+        verified_at = datetime.strptime(entry['verified_at'], '%Y-%m-%d %H:%M:%S')
+    except (KeyError, ValueError):
+        return None
+    if datetime.now() - verified_at > timedelta(days=HOSTNAME_REVALIDATE_DAYS):
+        return None
+    return entry['netdb_hostname']
+
 
+def hostname_candidates(statseeker_hostname, hostname_map=None):
+    """
+    Çözülmüş hostname varsa önce o denenir; yanıt verirse diğer varyasyonlara hiç istek gitmez.
+    Yanıt vermezse (AP yeniden adlandırılmış olabilir) kalan varyasyonlara düşülür.
+    """
+    variations = create_smart_hostname_mapping(statseeker_hostname)
+    resolved = resolved_hostname(statseeker_hostname, hostname_map)
+    if not resolved:
+        return variations
+    return [resolved] + [h for h in variations if h != resolved]
+
+
+def plan_ap_endpoints(consumers=AP_CONSUMERS):
+    """Tüm tüketicilerin ihtiyaç duyduğu endpoint'lerin birleşimi; her biri bir kez çekilir."""
+    return list(dict.fromkeys(endpoint for endpoints in consumers.values() for endpoint in endpoints))
+
+
+def fetch_ap_endpoints(hostname, bearer_token, endpoints, breaker=None):
+    """
+    Verilen endpoint'leri bir kez çeker ve başarılı olanların results kısmını döndürür.
+    Hostname NetDB'de yoksa (facts 404) None döner.
+    """
+    headers = {"Authorization": f"Bearer {bearer_token}", "Accept": "application/json"}
     results = {}
-    success_count = 0
 
-    for endpoint_name, url in endpoints:
+    for endpoint_name in endpoints:
+        url = f"{NETDB_BASE_URL}{hostname}/{AP_ENDPOINT_PATHS[endpoint_name]}"
         try:
-            response = requests.get(url, headers=headers, timeout=15, verify=SSL_VERIFY)
+            with run_ledger.timed_request(url) as call:
+                response = call["response"] = requests.get(url, headers=headers, timeout=15, verify=SSL_VERIFY)
             if response.status_code == 200:
                 data = response.json()
                 if data.get('success') and 'results' in data:
                     results[endpoint_name] = data['results']
-                    success_count += 1
-                else:
-                    results[endpoint_name] = {}
-            else:
-                results[endpoint_name] = {}
+            elif response.status_code == 404 and endpoint_name == "facts":
+                # NetDB bu hostname'i tanımıyor; diğer endpoint'leri denemeye gerek yok
+                if breaker is not None:
+                    circuit_breaker.mark_not_found(breaker, hostname)
+                return None
         except Exception as e:
-            results[endpoint_name] = {}
             log_message(f"NetDB endpoint {endpoint_name} error for {hostname}: {str(e)[:50]}")
 
+    return results
+
+
+def build_inventory_result(hostname, payloads):
+    """Envanter tüketicisi: en az 2 endpoint yanıt verdiyse parse_netdb_data sonucunu döndürür."""
+    payloads = payloads or {}
+    success_count = sum(1 for endpoint in AP_CONSUMERS["inventory"] if endpoint in payloads)
+
     if success_count >= 2:  # At least 2 successful endpoints
         ap_details = {
             'netdb_hostname': hostname,
             'found': True,
-            'facts': results.get('facts', {}),
-            'interfaces': results.get('interfaces', {}),
-            'wireless_clients': results.get('wireless_clients', []),
-            'neighbors': results.get('neighbors', {})
+            'facts': payloads.get('facts', {}),
+            'interfaces': payloads.get('interfaces', {}),
+            'wireless_clients': payloads.get('wireless_clients', []),
+            'neighbors': payloads.get('neighbors', {})
         }
-        return parse_netdb_data(ap_details)
+        with run_ledger.stage("parse"):
+            return parse_netdb_data(ap_details)
 
     return create_default_result()
 
 
-def process_single_ap_sync(ap_row, bearer_token):
-    """Process single AP synchronously."""
+def build_enhanced_result(hostname, payloads):
+    """Enhanced tüketicisi: aynı payload'lardan radio/client/neighbor analizini üretir."""
+    endpoint_results = {e: payloads[e] for e in AP_CONSUMERS["enhanced"] if e in (payloads or {})}
+    with run_ledger.stage("parse"):
+        enhanced_data = parse_enhanced_data_v2(endpoint_results, hostname)
+    if enhanced_data.get('radio_info') or enhanced_data.get('client_radio_mapping') or enhanced_data.get('device_facts'):
+        return enhanced_data
+    return {}
+
+
+def fetch_netdb_data_sync(hostname, bearer_token, breaker=None):
+    """Fetch NetDB data synchronously for a single hostname."""
+    if not bearer_token:
+        return create_default_result()
+    payloads = fetch_ap_endpoints(hostname, bearer_token, AP_CONSUMERS["inventory"], breaker)
+    return build_inventory_result(hostname, payloads)
+
+
+def process_single_ap_sync(ap_row, bearer_token, breaker=None, hostname_map=None):
+    """
+    Process single AP synchronously.
+    Dönüş: (envanter sonucu, enhanced sonuç) - iki tüketici aynı payload'ları paylaşır.
+    """
     statseeker_hostname = ap_row["name"]
-    hostname_variations = create_smart_hostname_mapping(statseeker_hostname)
+    hostname_variations = hostname_candidates(statseeker_hostname, hostname_map)
+
+    if breaker is not None:
+        # 404 almış varyasyonlar TTL boyunca denenmez
+        hostname_variations = [h for h in hostname_variations if not circuit_breaker.is_not_found(breaker, h)]
+
+    inventory_endpoints = AP_CONSUMERS["inventory"]
+    extra_endpoints = [e for e in plan_ap_endpoints() if e not in inventory_endpoints]
 
     # Try each hostname variation
     for hostname in hostname_variations:
-        result = fetch_netdb_data_sync(hostname, bearer_token)
+        payloads = fetch_ap_endpoints(hostname, bearer_token, inventory_endpoints, breaker)
+        result = build_inventory_result(hostname, payloads)
         if result.get('netdb_responsive'):
-            return result
+            # Sadece yanıt veren hostname için enhanced'a özgü endpoint'ler eklenir
+            payloads.update(fetch_ap_endpoints(hostname, bearer_token, extra_endpoints, breaker) or {})
+            if breaker is not None:
+                circuit_breaker.record_success(breaker, statseeker_hostname)
+            if hostname_map is not None:
+                hostname_map[statseeker_hostname] = {
+                    'netdb_hostname': hostname,
+                    'verified_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                }
+            return result, build_enhanced_result(hostname, payloads)
 
     # No valid hostname found
-    return create_default_result()
+    if breaker is not None:
+        circuit_breaker.record_failure(breaker, statseeker_hostname, "NetDB yanıt vermedi")
+    return create_default_result(), {}
 
 
-def process_aps_with_threading(ap_data, bearer_token, max_workers=10):
+def process_aps_with_threading(ap_data, bearer_token, max_workers=10, breaker=None, hostname_map=None):
     """Process APs using ThreadPoolExecutor."""
     log_message(f"Processing {len(ap_data)} APs with {max_workers} threads")
 
     ap_list = ap_data.to_dict('records')
     netdb_results = {}
+    enhanced_results = {}
+
+    if breaker is not None:
+        # Devresi açık AP'ler cooldown bitene kadar NetDB'ye sorulmaz
+        open_aps = [ap for ap in ap_list if not circuit_breaker.allow(breaker, ap['name'])]
+        for ap in open_aps:
+            netdb_results[str(ap['deviceid'])] = create_default_result()
+        if open_aps:
+            log_message(f"Circuit open, skipping {len(open_aps)} APs")
+        ap_list = [ap for ap in ap_list if circuit_breaker.allow(breaker, ap['name'])]
+        ap_list = circuit_breaker.prioritize(ap_list, lambda ap: ap.get('ping_state') == 'down')
 
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         # Submit all tasks
         future_to_deviceid = {}
         for ap in ap_list:
-            future = executor.submit(process_single_ap_sync, ap, bearer_token)
+            future = executor.submit(process_single_ap_sync, ap, bearer_token, breaker, hostname_map)
             future_to_deviceid[future] = str(ap['deviceid'])
 
         # Process completed tasks with progress
@@ -279,17 +419,20 @@ def process_aps_with_threading(ap_data, bearer_token, max_workers=10):
         for future in as_completed(future_to_deviceid):
             deviceid = future_to_deviceid[future]
             try:
-                result = future.result()
+                result, enhanced_data = future.result()
                 netdb_results[deviceid] = result
+                if enhanced_data:
+                    enhanced_results[deviceid] = enhanced_data
             except Exception as e:
                 log_message(f"Error processing AP {deviceid}: {e}")
                 netdb_results[deviceid] = create_default_result()
+                run_ledger.record_failure("device")
 
             completed += 1
             if completed % 10 == 0:
                 log_message(f"Processed {completed}/{len(ap_list)} APs ({completed / len(ap_list) * 100:.1f}%)")
 
-    return netdb_results
+    return netdb_results, enhanced_results
 
 
 def parse_netdb_data(ap_details):
@@ -466,31 +609,8 @@ def fetch_enhanced_wireless_data_v2(hostname, bearer_token):
     """
     if not bearer_token:
         return {}
-
-    headers = {"Authorization": f"Bearer {bearer_token}", "Accept": "application/json"}
-    base_url = "https://network-api.npe.fedex.com/v1/device/"
-
-    # Çalışan endpoint'ler
-    endpoints = [
-        ("facts", f"{base_url}{hostname}/facts?device_type=extreme_wing"),
-        ("wireless_radios", f"{base_url}{hostname}/wireless-radios?device_type=extreme_wing&rf_domain=self"),
-        ("neighbors", f"{base_url}{hostname}/neighbors?device_type=extreme_wing"),
-        ("wireless_clients", f"{base_url}{hostname}/wireless-clients?device_type=extreme_wing&rf_domain=self")
-    ]
-
-    results = {}
-
-    for endpoint_name, url in endpoints:
-        try:
-            response = requests.get(url, headers=headers, timeout=15, verify=SSL_VERIFY)
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success') and 'results' in data:
-                    results[endpoint_name] = data['results']
-        except Exception as e:
-            log_message(f"Enhanced endpoint {endpoint_name} error for {hostname}: {str(e)[:50]}")
-
-    return parse_enhanced_data_v2(results, hostname)
+    payloads = fetch_ap_endpoints(hostname, bearer_token, AP_CONSUMERS["enhanced"]) or {}
+    return parse_enhanced_data_v2(payloads, hostname)
 
 
 def parse_enhanced_data_v2(endpoint_results, hostname):
@@ -731,54 +851,6 @@ def create_enhanced_wireless_report_v2(enhanced_data_dict):
         log_message(f"Enhanced report save error: {e}")
 
 
-def integrate_enhanced_wireless_data_v2(ap_data, bearer_token, max_workers=8):
-    """V2 enhanced wireless data collection - çalışan endpoint'lerle"""
-    log_message("=== ENHANCED WIRELESS DATA V2 COLLECTION STARTED ===")
-
-    enhanced_results = {}
-    ap_list = ap_data.to_dict('records')
-
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_info = {}
-
-
-        for ap in ap_list:
-            hostname_variations = create_smart_hostname_mapping(ap['name'])
-            for hostname in hostname_variations:
-                future = executor.submit(fetch_enhanced_wireless_data_v2, hostname, bearer_token)
-                future_to_info[future] = {
-                    'deviceid': str(ap['deviceid']),
-                    'hostname': hostname,
-                    'original_name': ap['name']
-                }
-
-        completed = 0
-        for future in as_completed(future_to_info):
-            ap_info = future_to_info[future]
-            try:
-                enhanced_data = future.result()
-                if enhanced_data and (
-                        enhanced_data.get('radio_info') or
-                        enhanced_data.get('client_radio_mapping') or
-                        enhanced_data.get('device_facts')
-                ):
-                    enhanced_results[ap_info['deviceid']] = enhanced_data
-                    log_message(f"Enhanced data: {ap_info['original_name']}")
-
-            except Exception as e:
-                log_message(f"Enhanced error: {ap_info['original_name']} - {e}")
-
-            completed += 1
-            if completed % 5 == 0:
-                log_message(f"Progress: {completed}/{len(future_to_info)}")
-
-    log_message(f"=== V2 COLLECTION COMPLETED: {len(enhanced_results)} successful APs ===")
-
-    if enhanced_results:
-        create_enhanced_wireless_report_v2(enhanced_results)
-
-    return enhanced_results
-
 def save_enhanced_wireless_report(enhanced_data):
     """
     Enhanced wireless verilerini JSON dosyasına kaydet
@@ -829,6 +901,25 @@ def save_enhanced_wireless_report(enhanced_data):
     except Exception as e:
         log_message(f"Enhanced wireless data save error: {e}")
 
+def previous_netdb_result(record):
+    """Bu turda sorgulanmayan AP için NetDB alanlarını önceki kayıttan geri kurar."""
+    result = create_default_result()
+    for field in result:
+        if field in record:
+            result[field] = record[field]
+    result['netdb_responsive'] = record.get('data_source') == 'Statseeker + NetDB'
+    return result
+
+
+def ap_fingerprint(result):
+    values = [result.get(field) for field in AP_FINGERPRINT_FIELDS]
+    # SSID listesi set'ten üretildiği için sırası çalıştırmadan çalıştırmaya değişebilir
+    ssids = result.get('wireless_ssids')
+    if isinstance(ssids, str):
+        values[AP_FINGERPRINT_FIELDS.index('wireless_ssids')] = sorted(ssids.split(', '))
+    return sweep_scheduler.fingerprint(values)
+
+
 def create_default_result():
     """Create default result for when NetDB is not available."""
     return {
@@ -909,14 +1000,29 @@ def load_uuid_mapping():
         return {}, []
 
 
+def polled_in_hour(ap, hour_key):
+    """AP'nin client verisi bu saat diliminde mi sorgulandı (önceki turdan taşınan kayıtlar için)."""
+    if not ap.get('stale'):
+        return True
+    try:
+        return datetime.strptime(ap['last_updated'], '%d-%m-%Y %H:%M:%S').strftime('%Y-%m-%d_%H') == hour_key
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
 def save_hourly_client_stats(updated_aps):
-    """Saatlik client istatistiklerini zenginleştirilmiş formatta kaydet"""
+    """
+    Saatlik client istatistiklerini zenginleştirilmiş formatta kaydet.
+    Client sayıları sadece bu saat içinde NetDB'den sorgulanmış AP'lerden toplanır;
+    önceki saatlerden taşınan (stale) kayıtlar dahil edilmez.
+    """
     try:
         now = datetime.now(pytz.timezone("Europe/Istanbul"))
         hour_key = now.strftime('%Y-%m-%d_%H')
+        polled_aps = [ap for ap in updated_aps if polled_in_hour(ap, hour_key)]
 
         # Detaylı istatistikleri hesapla
-        total_clients = sum(ap.get('wireless_clients_numbers', 0) for ap in updated_aps)
+        total_clients = sum(ap.get('wireless_clients_numbers', 0) for ap in polled_aps)
         online_aps = len([ap for ap in updated_aps if ap.get('is_up', True)])
         total_aps = len(updated_aps)
 
@@ -929,7 +1035,8 @@ def save_hourly_client_stats(updated_aps):
             if location not in location_breakdown:
                 location_breakdown[location] = {'aps': 0, 'clients': 0}
             location_breakdown[location]['aps'] += 1
-            location_breakdown[location]['clients'] += ap.get('wireless_clients_numbers', 0)
+        for ap in polled_aps:
+            location_breakdown[ap.get('city', 'Unknown')]['clients'] += ap.get('wireless_clients_numbers', 0)
 
             # SSID breakdown
             for client in ap.get('wireless_clients', []):
@@ -937,7 +1044,7 @@ def save_hourly_client_stats(updated_aps):
                 ssid_breakdown[ssid] = ssid_breakdown.get(ssid, 0) + 1
 
         # En yoğun AP'ler
-        top_aps = sorted(updated_aps,
+        top_aps = sorted(polled_aps,
                          key=lambda x: x.get('wireless_clients_numbers', 0),
                          reverse=True)[:5]
 
@@ -945,9 +1052,10 @@ def save_hourly_client_stats(updated_aps):
         hour_data = {
             'total_clients': total_clients,
             'total_aps': total_aps,
+            'polled_aps': len(polled_aps),
             'online_aps': online_aps,
             'offline_aps': total_aps - online_aps,
-            'avg_clients_per_ap': round(total_clients / total_aps, 1) if total_aps > 0 else 0,
+            'avg_clients_per_ap': round(total_clients / len(polled_aps), 1) if polled_aps else 0,
             'timestamp': now.isoformat(),
             'top_aps': [
                 {
@@ -1039,38 +1147,19 @@ def station_info():
 
 
 def load_main_data():
-    """Load switch port connection data from main_data.json."""
-    main_data_file = 'D:/INTRANET/Netinfo/Data/main_data.json'
-    if not os.path.exists(main_data_file):
-        return {}
-
+    """Load AP -> switch port connections from the topology index (topology.json)."""
     try:
-        with open(main_data_file, 'r', encoding='utf-8') as f:
-            main_data = json.load(f)
-
-        switch_connections = {}
-        data_section = main_data.get('data', {})
-
-        for switch_name, switch_data in data_section.items():
-            if isinstance(switch_data, dict) and 'ports' in switch_data:
-                for port in switch_data['ports']:
-                    if isinstance(port, dict):
-                        neighbor_hostname = port.get('neighbor_hostname')
-                        if (isinstance(neighbor_hostname, str) and
-                                neighbor_hostname != 'N/A' and
-                                'SEG' in neighbor_hostname):
-                            switch_connections[neighbor_hostname] = {
-                                'connected_switch': switch_name,
-                                'connected_port': port.get('interface_name', 'N/A'),
-                                'neighbor_port': port.get('neighbor_port', 'N/A'),
-                                'link_status': port.get('link_status', 'unknown'),
-                                'is_up': port.get('is_up', False)
-                            }
+        topo = topology.load_topology()
+        if topo is None:
+            # Topoloji henüz oluşturulmadıysa main_data.json'dan kur
+            log_message("topology.json not found, building from main_data.json")
+            topo = topology.update_topology()
 
+        switch_connections = topo.get('ap_uplinks', {})
         log_message(f"Switch connections loaded: {len(switch_connections)} AP connections found")
         return switch_connections
     except Exception as e:
-        log_message(f"main_data.json loading error: {e}")
+        log_message(f"Topology loading error: {e}")
         return {}
 
 
@@ -1092,6 +1181,7 @@ def update_ap_data():
         try:
             with open(json_file, 'r', encoding='utf-8') as f:
                 previous_data = {str(d['deviceid']): d for d in json.load(f)}
+            run_ledger.record_read(json_file)
             log_message(f"Previous data loaded: {len(previous_data)} records")
         except json.JSONDecodeError:
             log_message("ERROR: AP JSON file corrupted, starting fresh!")
@@ -1102,7 +1192,8 @@ def update_ap_data():
     switch_connections = load_main_data()
 
     # Get NetDB token
-    bearer_token = get_netdb_bearer_token()
+    with run_ledger.stage("auth"):
+        bearer_token = get_netdb_bearer_token()
     if bearer_token:
         log_message("NetDB token available - will fetch comprehensive AP data")
     else:
@@ -1110,15 +1201,18 @@ def update_ap_data():
 
     # Fetch Statseeker data
     log_message("Fetching AP device data from Statseeker...")
-    ap_data = fetch_statseeker_ap_data()
+    with run_ledger.stage("fetch"):
+        ap_data = fetch_statseeker_ap_data()
 
     if ap_data.empty:
         log_message("ERROR: No SEG devices found in Statseeker!")
+        run_ledger.record_failure("fetch")
         return
 
     log_message(f"Statseeker: {len(ap_data)} SEG devices found")
 
     # Add hostname and location columns
+    enrich_start = time.perf_counter()
     ap_data['hostname'] = ap_data['name']
     ap_data['location'] = ap_data.apply(
         lambda row: extract_ap_location(row['hostname'], row['deviceid']),
@@ -1141,24 +1235,77 @@ def update_ap_data():
             ap_data.at[index, 'uuid'] = assigned_uuid
         else:
             ap_data.at[index, 'uuid'] = uuid_mapping[deviceid]
+    run_ledger.add_stage("enrich", time.perf_counter() - enrich_start)
 
     # Process APs with NetDB data using threading
     netdb_results = {}
     enhanced_results = {}  # BUNU EKLE
+    stale_aps = {}  # deviceid -> önceki kaydın NetDB sorgu zamanı
 
     if bearer_token:
         log_message("Starting threaded processing...")
         processing_start = time.time()
 
-        # Use threading instead of async
-        netdb_results = process_aps_with_threading(ap_data, bearer_token, max_workers=15)
+        # Cevap vermeyen AP'ler ve 404 alan hostname'ler çalışmalar arası hatırlanır
+        breaker = circuit_breaker.load_state(BREAKER_STATE_FILE)
+        hostname_map = load_hostname_map()
+
+        # Zamanı gelmeyen AP'ler (değişmeyenler daha seyrek) önceki kayıtlarıyla devam eder
+        schedule_state = sweep_scheduler.load_state(SCHEDULE_STATE_FILE)
+        ap_names = ap_data['name'].tolist()
+        triggered = sweep_scheduler.apply_triggers(
+            schedule_state, dict(zip(ap_data['deviceid'].astype(str), ap_names)), ap_names
+        )
+        if triggered:
+            log_message(f"Event-triggered refresh: {len(triggered)} APs")
+        due = set(sweep_scheduler.due_devices(schedule_state, ap_names, BASE_INTERVAL))
+        cached_aps = ap_data[~ap_data['name'].isin(due) & ap_data['deviceid'].astype(str).isin(previous_data)]
+        for _, ap in cached_aps.iterrows():
+            record = previous_data[str(ap['deviceid'])]
+            netdb_results[str(ap['deviceid'])] = previous_netdb_result(record)
+            stale_aps[str(ap['deviceid'])] = record.get('last_updated')
+            if record.get('enhanced_wireless'):
+                enhanced_results[str(ap['deviceid'])] = record['enhanced_wireless']
+        due_aps = ap_data.drop(cached_aps.index)
+        log_message(f"Due for NetDB refresh: {len(due_aps)} APs, reusing previous data: {len(cached_aps)} APs")
+
+        # Envanter ve enhanced tüketicileri tek fetch planıyla beslenir; her endpoint bir kez çekilir
+        # (parse süresi fetch'in içinde, AP'ler bittikçe ölçülür)
+        with run_ledger.stage("fetch"):
+            fresh_results, fresh_enhanced = process_aps_with_threading(due_aps, bearer_token, max_workers=15,
+                                                                       breaker=breaker, hostname_map=hostname_map)
+        run_ledger.count("devices_polled", len(due_aps))
+        netdb_results.update(fresh_results)
+        enhanced_results.update(fresh_enhanced)
+        save_hostname_map(hostname_map)
+
+        changed_count = 0
+        for _, ap in due_aps.iterrows():
+            result = fresh_results.get(str(ap['deviceid']))
+            if result and result.get('netdb_responsive'):
+                changed_count += sweep_scheduler.record_poll(schedule_state, ap['name'], ap_fingerprint(result),
+                                                             BASE_INTERVAL)
+            else:
+                sweep_scheduler.record_failure(schedule_state, ap['name'], BASE_INTERVAL)
+        log_message(f"APs with changed NetDB data: {changed_count}")
+        run_ledger.count("devices_changed", changed_count)
+        try:
+            sweep_scheduler.save_state(schedule_state, SCHEDULE_STATE_FILE, keep=ap_names)
+        except OSError as e:
+            log_message(f"Sweep schedule save error: {e}")
+
+        log_message(f"Enhanced wireless data: {len(enhanced_results)} APs")
+        if enhanced_results:
+            create_enhanced_wireless_report_v2(enhanced_results)
 
-        # ENHANCED DATA COLLECTION - BUNU EKLE
-        log_message("Starting enhanced wireless data collection...")
-        enhanced_results = integrate_enhanced_wireless_data_v2(ap_data, bearer_token, max_workers=8)
+        try:
+            circuit_breaker.save_state(breaker, BREAKER_STATE_FILE)
+        except OSError as e:
+            log_message(f"Circuit breaker state save error: {e}")
 
         processing_time = time.time() - processing_start
         responsive_count = sum(1 for r in netdb_results.values() if r.get('netdb_responsive'))
+        run_ledger.count("devices_responsive", responsive_count)
         log_message(
             f"NetDB processing completed in {processing_time:.1f}s ({len(ap_data) / processing_time:.1f} APs/sec)")
         log_message(
@@ -1173,6 +1320,7 @@ def update_ap_data():
     now = datetime.now(pytz.timezone("Europe/Istanbul")).strftime('%d-%m-%Y %H:%M:%S')
 
     log_message("Creating final AP records...")
+    enrich_start = time.perf_counter()
 
     for _, ap in ap_data.iterrows():
         deviceid = str(ap["deviceid"])
@@ -1223,18 +1371,24 @@ def update_ap_data():
             "neighbor_port": switch_info.get('neighbor_port', 'N/A'),
             "link_status": switch_info.get('link_status', 'unknown'),
             "is_up": switch_info.get('is_up', True),
-            "last_updated": now,
+            # Taşınan kayıtlarda NetDB verisinin gerçek sorgu zamanı korunur
+            "last_updated": stale_aps.get(deviceid) or now,
+            "stale": deviceid in stale_aps,
             "notes": "",
             # ENHANCED WIRELESS DATA EKLE - BUNU EKLE
             "enhanced_wireless": enhanced_data
         }
 
         updated_aps.append(updated_ap)
+    run_ledger.add_stage("enrich", time.perf_counter() - enrich_start)
+    run_ledger.count("devices", len(updated_aps))
 
     # Save data
+    write_start = time.perf_counter()
     try:
         with open(json_file, 'w', encoding='utf-8') as f:
             json.dump(updated_aps, f, indent=2, ensure_ascii=False)
+        run_ledger.record_write(json_file)
 
         log_message(f"AP inventory saved: {len(updated_aps)} records")
 
@@ -1248,6 +1402,7 @@ def update_ap_data():
         uuid_file = 'D:/INTRANET/Netinfo/Data/UUID_Pool.json'
         with open(uuid_file, 'w', encoding='utf-8') as f:
             json.dump(uuid_data, f, indent=2)
+        run_ledger.record_write(uuid_file)
 
         log_message("UUID mapping updated and saved")
 
@@ -1255,6 +1410,7 @@ def update_ap_data():
         responsive_count = sum(1 for ap in updated_aps if ap.get('data_source') == 'Statseeker + NetDB')
         total_clients = sum(ap.get('wireless_clients_numbers', 0) for ap in updated_aps)
         save_hourly_client_stats(updated_aps)
+        run_ledger.add_stage("write", time.perf_counter() - write_start)
 
         # Location summary
         location_stats = {}
@@ -1395,4 +1551,6 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    with run_ledger.job_run("ap_data"):
+        with profiling.profiled("ap_data"):
+            main()
@@ -4,6 +4,8 @@ import logging
 from datetime import datetime
 from filelock import FileLock
 
+import main_data_shards
+
 # Directory paths
 BASE_DIR = "D:/INTRANET/Netinfo/Data"
 LOG_DIR = "D:/INTRANET/Netinfo/Logs/Latest_Logs"
@@ -58,7 +60,14 @@ def load_json_file(file_path):
 def analyze_device_data():
     """Analyze and process network device data."""
     device_inventory = load_json_file(DEVICE_INVENTORY_FILE) or []
-    main_data = load_json_file(MAIN_DATA_FILE) or {}
+
+    # Cihaz başına dosyalar varsa her switch kendi dosyasından okunur; yoksa main_data.json yüklenir
+    if main_data_shards.load_manifest() is not None:
+        load_device = main_data_shards.load_device
+    else:
+        main_data = load_json_file(MAIN_DATA_FILE) or {}
+        main_data = main_data.get("data", main_data)
+        load_device = main_data.get
 
     daily_report = []
 
@@ -70,7 +79,7 @@ def analyze_device_data():
         last_update = device.get("last_status_check", "N/A")
 
         # Count active/inactive ports
-        device_ports = main_data.get(hostname, {}).get("ports", [])
+        device_ports = (load_device(hostname) or {}).get("ports", [])
         total_ports = len(device_ports)
         active_ports = sum(1 for port in device_ports if port["is_up"])
         inactive_ports = total_ports - active_ports
@@ -0,0 +1,680 @@
+import argparse
+import contextlib
+import glob
+import json
+import logging
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Statseeker/NetDB yanıtlarını kaydedilmiş ya da sentetik fixture'lardan tekrar oynatarak
+# parse/enrich/write aşamalarını çevrimdışı ölçer. Sonuçlar commit bazında saklanır ve
+# önceki çalışmayla karşılaştırılır.
+#
+#   python benchmark.py                       # 1x ve 10x filo
+#   python benchmark.py --scale 1 10 100 --stage syslog
+#   python benchmark.py --record              # sunucudaki gerçek yanıtlardan fixture kaydet
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 📂 File paths (depo köküne göre; sunucuda D:/INTRANET/Netinfo/Data, başka makinede çalışma kopyasının Data dizini)
+DATA_DIR = os.path.join(os.path.dirname(SCRIPTS_DIR), "Data")
+FIXTURE_DIR = os.path.join(DATA_DIR, "benchmark_fixtures")
+HISTORY_FILE = os.path.join(DATA_DIR, "benchmark_history.json")
+
+# 📌 1x = bugünkü filo (yaklaşık); --scale bununla çarpılır
+FLEET = {
+    "switches": 250,
+    "routers": 30,
+    "aps": 600,
+    "syslog_entries": 20000,
+}
+
+# 📌 Benchmark Settings
+DEFAULT_SCALES = [1, 10]
+REPEAT = 3
+REGRESSION_THRESHOLD = 0.20      # Medyan bu oranın üzerinde yavaşlarsa regresyon sayılır
+MIN_REGRESSION_SECONDS = 0.05    # Çok kısa aşamalarda ölçüm gürültüsünü regresyon saymamak için
+HISTORY_KEEP = 200
+RECORD_SYSLOG_ENTRIES = 5000
+
+# Kayıtlı fixture dosyaları; eksik olanlar için sentetik veri kullanılır
+FIXTURE_FILES = {
+    "statseeker_device": "statseeker_device.json",        # cdt_device ham API yanıtı
+    "statseeker_inventory": "statseeker_inventory.json",  # cdt_inventory ham API yanıtı
+    "station_info": "station-info.json",
+    "netdb_switch": "netdb_switch.json",                  # {endpoint: NetDB yanıtı} tek switch
+    "netdb_ap": "netdb_ap.json",                          # {endpoint: results} tek AP
+    "syslog": "syslog_data.json",
+}
+
+SWITCH_ENDPOINT_PATHS = {
+    "interfaces": "interfaces",
+    "vlans": "vlans",
+    "neighbors": "neighbors",
+    "mac-address-table": "mac_address_table",
+}
+AP_ENDPOINT_NAMES = {
+    "facts": "facts",
+    "interfaces": "interfaces",
+    "wireless-clients": "wireless_clients",
+    "neighbors": "neighbors",
+    "wireless-radios": "wireless_radios",
+}
+
+SYSLOG_TEMPLATES = [
+    "%LINK-3-UPDOWN: Interface {port}, changed state to down",
+    "%LINK-3-UPDOWN: Interface {port}, changed state to up",
+    "%LINEPROTO-5-UPDOWN: Line protocol on Interface {port}, changed state to down",
+    "%PM-4-ERR_DISABLE: psecure-violation error detected on {port}, putting {port} in err-disable state",
+    "%PORT_SECURITY-2-PSECURE_VIOLATION: Security violation occurred, caused by MAC address 0050.56ab.12cd on port {port}.",
+    "%SPANTREE-2-BLOCK_BPDUGUARD: Received BPDU on port {port} with BPDU Guard enabled. Disabling port.",
+    "%ILPOWER-5-POWER_GRANTED: Interface {port}: Power granted",
+    "%CDP-4-DUPLEX_MISMATCH: duplex mismatch discovered on {port} (not half duplex)",
+    "%SYS-5-CONFIG_I: Configured from console by admin on vty0",
+    "%SYS-6-LOGOUT: User admin has exited tty session 2",
+    "%PLATFORM_ENV-1-FAN: Faulty fan detected",
+    "%SEC_LOGIN-5-LOGIN_SUCCESS: Login Success [user: admin]",
+]
+MAC_PREFIXES = ["00:50:56", "3c:52:82", "00:1b:21", "f4:8e:38", "b8:27:eb", "00:0c:29", "a4:4c:c8", "70:10:6f"]
+SITES = ["IST01", "IST02", "ANK01", "IZM01", "BUR01", "ADA01", "ANT01", "KOC01"]
+
+
+def log_message(message):
+    print(message, file=sys.stderr)
+
+
+def load_json(path, default=None):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def write_json(path, data, indent=None):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+# 📌 Fixtures
+
+def statseeker_response(rows):
+    return {"success": True, "data": {"objects": [{"type": "cdt_device", "data": rows}]}}
+
+
+def synthetic_switch_payloads(rng):
+    interfaces = {}
+    for index in range(1, 49):
+        up = rng.random() < 0.7
+        interfaces[f"GigabitEthernet1/0/{index}"] = {
+            "description": f"User port {index}" if up else "",
+            "link_status": "up" if up else "down",
+            "is_up": up,
+            "protocol_status": "up" if up else "down",
+            "switchport_mode": "access",
+            "access_vlan": rng.choice([10, 20, 30, 40]),
+            "speed": "1000Mb/s" if up else "Auto-speed",
+            "duplex": "Full-duplex" if up else "Auto-duplex",
+            "input_rate": rng.randint(0, 50_000_000) if up else 0,
+            "output_rate": rng.randint(0, 50_000_000) if up else 0,
+            "input_packets": rng.randint(0, 10 ** 9),
+            "output_packets": rng.randint(0, 10 ** 9),
+            "last_input": "00:00:01" if up else "never",
+            "last_output": "00:00:00" if up else "never",
+            "last_output_hang": "never",
+        }
+    for index in range(1, 5):
+        interfaces[f"TenGigabitEthernet1/1/{index}"] = {
+            "description": "Uplink" if index <= 2 else "",
+            "link_status": "up" if index <= 2 else "down",
+            "is_up": index <= 2,
+            "protocol_status": "up" if index <= 2 else "down",
+            "switchport_mode": "trunk",
+            "speed": "10Gb/s",
+            "duplex": "Full-duplex",
+            "input_rate": rng.randint(0, 900_000_000),
+            "output_rate": rng.randint(0, 900_000_000),
+            "input_packets": rng.randint(0, 10 ** 10),
+            "output_packets": rng.randint(0, 10 ** 10),
+            "last_input": "00:00:00",
+            "last_output": "00:00:00",
+            "last_output_hang": "never",
+        }
+
+    vlans = []
+    for position, (vlan_id, name) in enumerate(((10, "USERS"), (20, "VOICE"), (30, "PRINTERS"),
+                                                (40, "WIRELESS"), (1140, "AP_MGMT"))):
+        members = [f"Gi1/0/{index}" for index in range(1, 49) if index % 5 == position]
+        vlans.append({"vlan_id": vlan_id, "name": name, "status": "active", "interfaces": members})
+
+    neighbors = {
+        "TenGigabitEthernet1/1/1": {"hostname": "TrIST01csw01", "remote_port": "TenGigabitEthernet1/0/1",
+                                    "management_ip": "10.34.0.1", "platform": "cisco C9500-24Y4C",
+                                    "software_version": "Cisco IOS XE Software, Version 17.09.04a"},
+        "GigabitEthernet1/0/48": {"hostname": "TrIST01SEG0001", "remote_port": "ge1",
+                                  "management_ip": "10.34.40.11", "platform": "AP-410C",
+                                  "software_version": "7.9.2.1"},
+    }
+
+    mac_table = []
+    for index in range(1, 49):
+        for _ in range(rng.choice([0, 1, 1, 2, 3])):
+            mac = f"{rng.choice(MAC_PREFIXES)}:{rng.randint(0, 255):02x}:{rng.randint(0, 255):02x}:{rng.randint(0, 255):02x}"
+            mac_table.append({"vlan_id": rng.choice([10, 20, 30]), "destination_address": mac,
+                              "destination_port": f"GigabitEthernet1/0/{index}", "type": "DYNAMIC"})
+
+    return {
+        "interfaces": {"success": True, "results": interfaces},
+        "vlans": {"success": True, "results": vlans},
+        "neighbors": {"success": True, "results": neighbors},
+        "mac_address_table": {"success": True, "results": mac_table},
+    }
+
+
+def synthetic_ap_payloads(rng):
+    clients = []
+    for index in range(12):
+        radio = "R1" if index % 3 else "R2"
+        clients.append({
+            "hostname": f"LT{rng.randint(10000, 99999)}",
+            "ip_address": f"10.34.41.{index + 10}",
+            "mac_address": f"{rng.choice(MAC_PREFIXES)}:00:00:{index:02x}".upper(),
+            "username": f"user{index}",
+            "wlan": rng.choice(["CORP", "GUEST", "SCANNER"]),
+            "radio": radio,
+            "radio_type": "11ac" if radio == "R1" else "11bgn",
+            "vlan_id": 40,
+            "activity": "active",
+            "state": "Data-Ready",
+            "vendor": "Intel",
+            "rssi": -rng.randint(45, 80),
+            "snr": rng.randint(15, 45),
+            "data_rate": rng.choice([144, 300, 866]),
+        })
+    return {
+        "facts": {"serial_number": "B0123456789", "model": "AP-410C", "uptime": 1234567,
+                  "uptime_string": "14 days, 6:56:07", "vendor": "Extreme Networks", "os_version": "7.9.2.1",
+                  "operation_mode": "standalone", "fqdn": "ap.example.local",
+                  "interface_list": ["ge1", "ge2", "vlan40", "vlan1140"]},
+        "interfaces": {
+            "ge1": {"is_up": True, "speed": "1000", "duplex": "full", "mtu": 1500, "mac_address": "00:11:22:33:44:55",
+                    "input_packets": 123456, "output_packets": 654321, "input_errors": 0, "output_errors": 0},
+            "vlan40": {"is_up": True, "ip_address": "10.34.40.11"},
+            "vlan1140": {"is_up": True, "ip_address": "10.114.0.11"},
+        },
+        "wireless_clients": clients,
+        "neighbors": {"ge1": {"hostname": "TrIST01sw01", "remote_port": "GigabitEthernet1/0/48",
+                              "management_ip": "10.34.0.21", "platform": "cisco C9300-48P",
+                              "software_version": "Cisco IOS XE Software, Version 17.09.04a"}},
+        "wireless_radios": [
+            {"radio": "R1", "mac_address": "00:11:22:33:44:60", "rf_mode": "5GHz", "state": "On",
+             "channel": "36", "power": "17 dBm"},
+            {"radio": "R2", "mac_address": "00:11:22:33:44:70", "rf_mode": "2.4GHz", "state": "On",
+             "channel": "6", "power": "14 dBm"},
+        ],
+    }
+
+
+def synthetic_fixtures(seed=42):
+    """Gerçek yanıtlarla aynı yapıda, 1x filo için deterministik veri."""
+    rng = random.Random(seed)
+    devices, inventory = [], []
+    for index in range(FLEET["switches"] + FLEET["routers"]):
+        site = SITES[index % len(SITES)]
+        is_switch = index < FLEET["switches"]
+        hostname = f"Tr{site}{'csw' if is_switch and index < len(SITES) else 'sw' if is_switch else 'ttr'}{index:03d}"
+        deviceid = 1000 + index
+        devices.append({"id": deviceid, "deviceid": deviceid, "hostname": hostname,
+                        "ipaddress": f"10.{30 + index % len(SITES)}.{index // 250}.{index % 250 + 1}",
+                        "ping_state": "down" if rng.random() < 0.03 else "up"})
+        model = rng.choice(["C9300-48P", "WS-C2960X-48FPD-L", "C9300L-48P-4X"]) if is_switch else "ISR4351/K9"
+        inventory.append({"deviceid": deviceid, "serial": f"FOC{rng.randint(10 ** 7, 10 ** 8)}", "model": model})
+
+    syslog = []
+    for index in range(FLEET["syslog_entries"]):
+        device = devices[index % FLEET["switches"]]
+        port = f"GigabitEthernet1/0/{rng.randint(1, 48)}"
+        syslog.append({"deviceid": device["deviceid"], "entity": device["hostname"],
+                       "time": "", "text": rng.choice(SYSLOG_TEMPLATES).format(port=port)})
+
+    return {
+        "statseeker_device": statseeker_response(devices),
+        "statseeker_inventory": statseeker_response(inventory),
+        "station_info": [{"code": site, "alternate_code": site.lower(), "town": site[:3].title()} for site in SITES],
+        "netdb_switch": synthetic_switch_payloads(rng),
+        "netdb_ap": synthetic_ap_payloads(rng),
+        "syslog": syslog,
+    }
+
+
+def load_fixtures(fixture_dir):
+    """Dizinde kayıtlı fixture varsa onu, yoksa sentetik veriyi kullanır. Dönüş: (fixtures, kaydedilmiş isimler)"""
+    fixtures = synthetic_fixtures()
+    recorded = []
+    for name, file_name in FIXTURE_FILES.items():
+        data = load_json(os.path.join(fixture_dir, file_name)) if fixture_dir else None
+        if data:
+            fixtures[name] = data
+            recorded.append(name)
+    return fixtures, recorded
+
+
+def response_rows(response):
+    try:
+        return response["data"]["objects"][0]["data"]
+    except (KeyError, IndexError, TypeError):
+        return []
+
+
+def scale_fixtures(fixtures, scale):
+    """
+    Tek cihazlık / 1x fixture'ları filonun scale katına çoğaltır.
+    Hostname ve deviceid'ler benzersiz yapılır; payload'lar cihazlar arasında paylaşılır.
+    """
+    device_rows = response_rows(fixtures["statseeker_device"])
+    inventory_by_id = {str(row.get("deviceid")): row for row in response_rows(fixtures["statseeker_inventory"])}
+    devices, inventory = [], []
+    for index in range(len(device_rows) * scale):
+        template = device_rows[index % len(device_rows)]
+        copy = index // len(device_rows)
+        deviceid = 1_000_000 + index
+        hostname = template["hostname"] if copy == 0 else f"{template['hostname']}-{copy}"
+        devices.append({**template, "id": deviceid, "deviceid": deviceid, "hostname": hostname})
+        inventory_row = inventory_by_id.get(str(template.get("deviceid")))
+        if inventory_row:
+            inventory.append({**inventory_row, "deviceid": deviceid})
+
+    switches = [row for row in devices if "sw" in row["hostname"].lower()]
+    aps = [f"TrIST01SEG{index:05d}" for index in range(FLEET["aps"] * scale)]
+
+    # Syslog kayıtları ölçeklenmiş switch'lere dağıtılır, son 24 saate yayılır
+    templates = fixtures["syslog"]
+    now = datetime.utcnow()
+    count = FLEET["syslog_entries"] * scale
+    syslog = []
+    for index in range(count):
+        device = switches[(index * 7919) % len(switches)]
+        logged_at = now - timedelta(seconds=86400 * index / count)
+        syslog.append({**templates[index % len(templates)], "deviceid": device["deviceid"],
+                       "entity": device["hostname"], "time": logged_at.strftime("%Y-%m-%d %H:%M:%S UTC")})
+
+    return {
+        "devices": devices,
+        "inventory": inventory,
+        "switches": switches,
+        "aps": aps,
+        "syslog": syslog,
+    }
+
+
+def record_fixtures(fixture_dir):
+    """Sunucudaki gerçek yanıtlardan fixture kaydeder (Statseeker canlı, NetDB broker önbelleğinden)."""
+    import netdb_broker
+    import statseeker_base
+    import syslog_metrics_json
+
+    os.makedirs(fixture_dir, exist_ok=True)
+
+    for name in ("device", "inventory"):
+        data = statseeker_base.fetch_data(statseeker_base.urls[name])
+        if data:
+            write_json(os.path.join(fixture_dir, FIXTURE_FILES[f"statseeker_{name}"]), data)
+            log_message(f"Kaydedildi: statseeker_{name} ({len(response_rows(data))} satır)")
+        else:
+            log_message(f"⚠️ Statseeker {name} verisi alınamadı")
+
+    station = load_json(statseeker_base.STATION_INFO_FILE)
+    if station:
+        write_json(os.path.join(fixture_dir, FIXTURE_FILES["station_info"]), station)
+
+    # Broker önbelleğindeki yanıtlar hostname bazında gruplanır; en dolu switch ve AP seçilir
+    switches, aps = {}, {}
+    for path in glob.glob(os.path.join(netdb_broker.BROKER_DIR, "*.json")):
+        entry = load_json(path)
+        if not entry or not isinstance(entry.get("payload"), dict):
+            continue
+        url = entry.get("url", "")
+        if "/device/" in url:
+            hostname, _, rest = url.split("/device/", 1)[1].partition("/")
+            endpoint, _, query = rest.partition("?")
+            if "device_type=cisco_ios" in query and endpoint in SWITCH_ENDPOINT_PATHS:
+                switches.setdefault(hostname, {})[SWITCH_ENDPOINT_PATHS[endpoint]] = entry["payload"]
+            elif "device_type=extreme_wing" in query and endpoint in AP_ENDPOINT_NAMES:
+                aps.setdefault(hostname, {})[AP_ENDPOINT_NAMES[endpoint]] = entry["payload"].get("results")
+
+    def richest(candidates, size_of):
+        return max(candidates.values(), key=lambda p: (len(p), size_of(p)), default=None)
+
+    switch = richest(switches, lambda p: len((p.get("interfaces") or {}).get("results") or {}))
+    if switch:
+        write_json(os.path.join(fixture_dir, FIXTURE_FILES["netdb_switch"]), switch)
+        log_message(f"Kaydedildi: netdb_switch ({len(switches)} switch arasından)")
+    ap = richest(aps, lambda p: len(p.get("wireless_clients") or []))
+    if ap:
+        write_json(os.path.join(fixture_dir, FIXTURE_FILES["netdb_ap"]), ap)
+        log_message(f"Kaydedildi: netdb_ap ({len(aps)} AP arasından)")
+    if not switch or not ap:
+        log_message("⚠️ Broker önbelleğinde NetDB yanıtı yok; önce switch_ports/ap_data çalışmalı")
+
+    syslog = load_json(syslog_metrics_json.SYSLOG_RAW_FILE, [])
+    if syslog:
+        write_json(os.path.join(fixture_dir, FIXTURE_FILES["syslog"]), syslog[-RECORD_SYSLOG_ENTRIES:])
+        log_message(f"Kaydedildi: syslog ({min(len(syslog), RECORD_SYSLOG_ENTRIES)} kayıt)")
+
+
+# 📌 Stages
+# Her benchmark fonksiyonu (aşama adı, öğe sayısı, setup, run) üretir; setup süresi ölçülmez.
+# Modüllerin dosya yolları çalışma dizinine yönlendirilir, canlı dosyalara dokunulmaz.
+
+def redirect_logging(workdir):
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    handler = logging.FileHandler(os.path.join(workdir, "benchmark_modules.log"), encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+def bench_statseeker_base(workdir, fixtures, data):
+    import statseeker_base
+    import status_events
+    import topology
+
+    statseeker_base.log_directory = workdir
+    statseeker_base.log_file_path = os.path.join(workdir, "statseeker_base.log")
+    statseeker_base.INVENTORY_FILE = os.path.join(workdir, "network_device_inventory.json")
+    statseeker_base.uuid_file = os.path.join(workdir, "UUID_Pool.json")
+    statseeker_base.STATION_INFO_FILE = os.path.join(workdir, "station-info.json")
+    statseeker_base.STATUS_LOG_FILE = os.path.join(workdir, "device_status_changes.json")
+    status_events.EVENTS_FILE = os.path.join(workdir, "status_events.ndjson")
+    topology.TOPOLOGY_FILE = os.path.join(workdir, "topology.json")
+
+    responses = {
+        statseeker_base.urls["device"]: statseeker_response(data["devices"]),
+        statseeker_base.urls["inventory"]: statseeker_response(data["inventory"]),
+    }
+    statseeker_base.fetch_data = responses.get
+    write_json(statseeker_base.STATION_INFO_FILE, fixtures["station_info"])
+
+    # Önceki turda cihazların %5'i ters durumdaydı; her tekrarda aynı değişiklikler loglanır
+    previous = [{"deviceid": row["deviceid"], "hostname": row["hostname"],
+                 "ping_state": ("up" if row["ping_state"] == "down" else "down") if index % 20 == 0
+                 else row["ping_state"]}
+                for index, row in enumerate(data["devices"])]
+
+    def setup():
+        write_json(statseeker_base.INVENTORY_FILE, previous)
+        write_json(statseeker_base.uuid_file, {"deviceid_uuid_mapping": {},
+                                               "available_uuids": [f"uuid-{i}" for i in range(len(previous))]})
+        for path in (statseeker_base.STATUS_LOG_FILE, status_events.EVENTS_FILE):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def parse():
+        for response in responses.values():
+            statseeker_base.process_data(response)
+
+    yield "statseeker_base.parse", len(data["devices"]), None, parse
+    yield "statseeker_base.update_data", len(data["devices"]), setup, statseeker_base.update_data
+
+
+def bench_switch_ports(workdir, fixtures, data):
+    import main_data_shards
+    import switch_ports
+    import topology
+
+    redirect_logging(workdir)
+    switch_ports.OUTPUT_JSON_FILE = os.path.join(workdir, "main_data.json")
+    main_data_shards.SHARD_DIR = os.path.join(workdir, "main_data_shards")
+
+    payloads = fixtures["netdb_switch"]
+    fetched = {"results": payloads, "stale": [], "failed": [], "status": {key: 200 for key in payloads}}
+    rows = [{"hostname": row["hostname"], "deviceid": row["deviceid"], "ping_state": row["ping_state"]}
+            for row in data["switches"]]
+    all_data = {}
+
+    def parse():
+        all_data.clear()
+        for row in rows:
+            result = switch_ports.process_device_data(row, fetched)
+            if result:
+                switch_ports.port_fingerprint(result[row["hostname"]]["ports"])
+                all_data.update(result)
+
+    def setup_write():
+        for path in glob.glob(os.path.join(main_data_shards.SHARD_DIR, "*")):
+            os.remove(path)
+
+    def write():
+        switch_ports.save_main_data(all_data)
+
+    def build_topology():
+        topology.build_topology(main_data={"data": all_data}, device_inventory=data["devices"])
+
+    yield "switch_ports.parse", len(rows), None, parse
+    yield "switch_ports.write", len(rows), setup_write, write
+    yield "switch_ports.write_unchanged", len(rows), None, write
+    yield "switch_ports.topology", len(rows), None, build_topology
+
+
+def bench_ap_data(workdir, fixtures, data):
+    import ap_data
+
+    ap_data.log_directory = workdir
+    ap_data.log_file_path = os.path.join(workdir, "ap_data.log")
+    payloads = fixtures["netdb_ap"]
+
+    def parse():
+        for hostname in data["aps"]:
+            result = ap_data.build_inventory_result(hostname, payloads)
+            ap_data.ap_fingerprint(result)
+            ap_data.build_enhanced_result(hostname, payloads)
+
+    yield "ap_data.parse", len(data["aps"]), None, parse
+
+
+def bench_syslog_analysis(workdir, fixtures, data):
+    import syslog_analysis
+
+    syslog_analysis.SYSLOG_RAW_FILE = os.path.join(workdir, "syslog_data.json")
+    syslog_analysis.MAIN_DATA_FILE = os.path.join(workdir, "syslog_main_data.json")
+    syslog_analysis.SUMMARY_LOG_FILE = os.path.join(workdir, "syslog_summary.json")
+    write_json(syslog_analysis.SYSLOG_RAW_FILE, data["syslog"])
+
+    yield "syslog_analysis.summary", len(data["syslog"]), None, syslog_analysis.process_syslog_data
+
+
+def bench_syslog_metrics_json(workdir, fixtures, data):
+    import syslog_metrics_json
+
+    syslog_metrics_json.SYSLOG_RAW_FILE = os.path.join(workdir, "syslog_data.json")
+    syslog_metrics_json.SYSLOG_METRICS_FILE = os.path.join(workdir, "syslog_metrics.json")
+    syslog_metrics_json.SYSLOG_HOURLY_FILE = os.path.join(workdir, "syslog_hourly_stats.json")
+    syslog_metrics_json.SYSLOG_DAILY_FILE = os.path.join(workdir, "syslog_daily_stats.json")
+    write_json(syslog_metrics_json.SYSLOG_RAW_FILE, data["syslog"])
+
+    def setup_hourly():
+        for path in (syslog_metrics_json.SYSLOG_METRICS_FILE, syslog_metrics_json.SYSLOG_HOURLY_FILE,
+                     syslog_metrics_json.SYSLOG_DAILY_FILE):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def summaries():
+        syslog_metrics_json.generate_hourly_summary()
+        syslog_metrics_json.generate_daily_summary()
+
+    yield "syslog_metrics_json.hourly", len(data["syslog"]), setup_hourly, \
+        syslog_metrics_json.process_raw_logs_to_hourly_metrics
+    yield "syslog_metrics_json.summaries", len(data["syslog"]), None, summaries
+
+
+BENCHMARKS = [
+    ("statseeker_base", bench_statseeker_base),
+    ("switch_ports", bench_switch_ports),
+    ("ap_data", bench_ap_data),
+    ("syslog_analysis", bench_syslog_analysis),
+    ("syslog_metrics_json", bench_syslog_metrics_json),
+]
+
+
+def time_stage(setup, run, repeat):
+    """Her tekrarın süresi (saniye). Modüllerin cihaz başına print'leri ölçüme dahil, ekrana basılmaz."""
+    samples = []
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        for _ in range(repeat):
+            if setup:
+                setup()
+            with contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                run()
+                samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run_benchmarks(fixtures, scales, repeat, stage_filter=None):
+    """Dönüş: ({"aşama@Nx": sonuç}, {modül: atlanma sebebi})"""
+    results, skipped = {}, {}
+    for scale in scales:
+        data = scale_fixtures(fixtures, scale)
+        for module_name, bench in BENCHMARKS:
+            if stage_filter and not any(f in module_name for f in stage_filter):
+                continue
+            with tempfile.TemporaryDirectory(prefix=f"bench_{module_name}_", ignore_cleanup_errors=True) as workdir:
+                try:
+                    for stage, items, setup, run in bench(workdir, fixtures, data):
+                        samples = time_stage(setup, run, repeat)
+                        key = f"{stage}@{scale}x"
+                        results[key] = {
+                            "stage": stage,
+                            "scale": scale,
+                            "items": items,
+                            "median": statistics.median(samples),
+                            "min": min(samples),
+                            "samples": [round(s, 6) for s in samples],
+                        }
+                        log_message(f"{key}: {results[key]['median'] * 1000:.1f} ms ({items} öğe)")
+                except (ImportError, OSError) as e:
+                    # pandas/macarna yoksa ya da secret.key bulunamazsa modül ölçülemez
+                    skipped[module_name] = f"{type(e).__name__}: {e}"
+                    log_message(f"⚠️ {module_name} atlandı: {skipped[module_name]}")
+    return results, skipped
+
+
+# 📌 History / regression
+
+def git_revision():
+    repo_dir = os.path.dirname(SCRIPTS_DIR)
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo_dir, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=repo_dir,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def pick_baseline(history, commit, host, baseline=None):
+    """--baseline verilmişse o commit'in son kaydı; yoksa aynı hosttaki son farklı commit (yoksa son kayıt)."""
+    if baseline:
+        matches = [entry for entry in history if entry["commit"].startswith(baseline)]
+        return matches[-1] if matches else None
+    same_host = [entry for entry in history if entry.get("host") == host] or history
+    others = [entry for entry in same_host if entry["commit"] != commit]
+    return (others or same_host or [None])[-1]
+
+
+def compare(results, baseline_entry):
+    """Dönüş: [(anahtar, önceki medyan, şimdiki medyan, oran, regresyon mu)]"""
+    rows = []
+    previous = (baseline_entry or {}).get("results", {})
+    for key, result in results.items():
+        before = previous.get(key, {}).get("median")
+        if not before:
+            rows.append((key, None, result["median"], None, False))
+            continue
+        ratio = result["median"] / before
+        regressed = ratio > 1 + REGRESSION_THRESHOLD and result["median"] - before > MIN_REGRESSION_SECONDS
+        rows.append((key, before, result["median"], ratio, regressed))
+    return rows
+
+
+def print_report(results, rows, baseline_entry, skipped):
+    if baseline_entry:
+        print(f"Karşılaştırma: {baseline_entry['commit'][:10]} ({baseline_entry['recorded_at']})")
+    print(f"{'aşama':<42}{'öğe':>9}{'medyan ms':>12}{'µs/öğe':>10}{'önceki ms':>12}{'fark':>9}")
+    for key, before, median, ratio, regressed in rows:
+        items = results[key]["items"]
+        per_item = median / items * 1_000_000 if items else 0
+        before_text = f"{before * 1000:.1f}" if before else "-"
+        ratio_text = f"{(ratio - 1) * 100:+.0f}%" if ratio else "-"
+        flag = "  ⚠️ REGRESYON" if regressed else ""
+        print(f"{key:<42}{items:>9}{median * 1000:>12.1f}{per_item:>10.1f}{before_text:>12}{ratio_text:>9}{flag}")
+    for module_name, reason in skipped.items():
+        print(f"{module_name:<42} atlandı → {reason}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Statseeker/NetDB işleme aşamaları için çevrimdışı benchmark.")
+    parser.add_argument("--scale", type=int, nargs="+", default=DEFAULT_SCALES,
+                        help="Filo çarpanları (1 = bugünkü filo)")
+    parser.add_argument("--stage", action="append", help="Sadece adı bu metni içeren modüller (tekrarlanabilir)")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="Kayıtlı fixture dizini")
+    parser.add_argument("--record", action="store_true", help="Sunucudaki gerçek yanıtlardan fixture kaydeder")
+    parser.add_argument("--history", default=HISTORY_FILE)
+    parser.add_argument("--baseline", help="Karşılaştırılacak commit (varsayılan: önceki commit'in son çalışması)")
+    parser.add_argument("--no-save", action="store_true", help="Sonucu geçmişe yazmaz")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Regresyon varsa çıkış kodu 1")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(args.fixtures)
+        return 0
+
+    fixtures, recorded = load_fixtures(args.fixtures)
+    log_message(f"Fixture: {', '.join(recorded) if recorded else 'sentetik'}")
+    results, skipped = run_benchmarks(fixtures, args.scale, args.repeat, args.stage)
+
+    commit, dirty = git_revision()
+    host = socket.gethostname()
+    history = load_json(args.history, [])
+    if not isinstance(history, list):
+        history = []
+    baseline_entry = pick_baseline(history, commit, host, args.baseline)
+    rows = compare(results, baseline_entry)
+    print_report(results, rows, baseline_entry, skipped)
+
+    if not args.no_save and results:
+        history.append({
+            "commit": commit,
+            "dirty": dirty,
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+            "host": host,
+            "python": platform.python_version(),
+            "fixtures": recorded,
+            "repeat": args.repeat,
+            "results": results,
+        })
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        write_json(args.history, history[-HISTORY_KEEP:], indent=2)
+
+    if args.fail_on_regression and any(row[4] for row in rows):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
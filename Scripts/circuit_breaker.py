@@ -0,0 +1,86 @@
+import json
+import os
+import threading
+import time
+
+# 📂 Çalışmalar arası kalıcı durum
+STATE_FILE = "D:/INTRANET/Netinfo/Data/circuit_breaker.json"
+
+# 📌 Breaker Settings
+FAILURE_THRESHOLD = 3          # Ardışık bu kadar hatadan sonra cihaz atlanmaya başlar
+BASE_COOLDOWN = 15 * 60        # İlk atlama süresi (saniye); her yeni hatada iki katına çıkar
+MAX_COOLDOWN = 12 * 60 * 60
+NOT_FOUND_TTL = 24 * 60 * 60   # NetDB'de olmayan (404) hostname bu süre boyunca denenmez
+
+_lock = threading.Lock()
+
+
+def load_state(state_file=STATE_FILE):
+    state = {"devices": {}, "not_found": {}}
+    if os.path.exists(state_file):
+        try:
+            with open(state_file, "r", encoding="utf-8") as f:
+                state.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+    return state
+
+
+def save_state(state, state_file=STATE_FILE):
+    now = time.time()
+    with _lock:
+        # Süresi dolmuş negatif kayıtlar ve toparlanmış cihazlar dosyada tutulmaz
+        state["not_found"] = {k: v for k, v in state["not_found"].items() if v["until"] > now}
+        state["devices"] = {k: v for k, v in state["devices"].items() if v["failures"]}
+        temp_file = state_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2, ensure_ascii=False)
+        os.replace(temp_file, state_file)
+
+
+def cooldown_seconds(failures, threshold=FAILURE_THRESHOLD):
+    return min(MAX_COOLDOWN, BASE_COOLDOWN * (2 ** max(0, failures - threshold)))
+
+
+def allow(state, key, now=None):
+    """
+    Devre açıksa (cooldown sürüyorsa) False döner.
+    Cooldown dolduğunda cihaz bir kez denenir (half-open); hata alırsa daha uzun süre atlanır.
+    """
+    entry = state["devices"].get(key)
+    if not entry or entry["failures"] < FAILURE_THRESHOLD:
+        return True
+    return (now or time.time()) >= entry.get("open_until", 0)
+
+
+def record_success(state, key):
+    with _lock:
+        state["devices"].pop(key, None)
+
+
+def record_failure(state, key, error=None, now=None):
+    now = now or time.time()
+    with _lock:
+        entry = state["devices"].setdefault(key, {"failures": 0})
+        entry["failures"] += 1
+        entry["last_failure"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+        if error:
+            entry["last_error"] = str(error)[:200]
+        if entry["failures"] >= FAILURE_THRESHOLD:
+            entry["open_until"] = now + cooldown_seconds(entry["failures"])
+
+
+def mark_not_found(state, hostname, now=None):
+    with _lock:
+        state["not_found"][hostname] = {"until": (now or time.time()) + NOT_FOUND_TTL}
+
+
+def is_not_found(state, hostname, now=None):
+    entry = state["not_found"].get(hostname)
+    return bool(entry) and entry["until"] > (now or time.time())
+
+
+def prioritize(items, is_down):
+    """Erişilemeyen (ping_state=down) cihazları sona alır; sağlıklı cihazlar bekletilmez."""
+    return sorted(items, key=lambda item: bool(is_down(item)))
+
@@ -1,6 +1,6 @@
-import subprocess
 import json
-import concurrent.futures
+
+import reachability
 
 # IP adresleri
 ip_addresses = [
@@ -14,27 +14,30 @@ ip_addresses = [
 ]
 
 
-def ping(ip):
-    """Belirtilen IP adresine ping atar ve sonucu döner."""
-    try:
-        # Windows için 'ping' komutu
-        result = subprocess.run(['ping', '-n', '4', ip], capture_output=True, text=True, timeout=10)
-
-        if "TTL=" in result.stdout:
-            return {"ip": ip, "status": "Aktif", "latency": result.stdout.split("Average =")[1].split("ms")[0].strip()}
-        else:
-            return {"ip": ip, "status": "Pasif", "latency": "N/A"}
-    except subprocess.TimeoutExpired:
-        return {"ip": ip, "status": "Zaman Aşımı", "latency": "N/A"}
-    except Exception as e:
-        return {"ip": ip, "status": "Hata", "latency": str(e)}
+def format_result(ip, probe):
+    """Prober sonucunu eski ping_results.json formatına (status/latency) çevirir."""
+    if probe["received"]:
+        status, latency = "Aktif", str(round(probe["rtt_avg"]))
+    else:
+        status, latency = "Pasif", "N/A"
+    return {
+        "ip": ip,
+        "status": status,
+        "latency": latency,
+        "method": probe["method"],
+        "loss": probe["loss"],
+        "rtt_min": probe["rtt_min"],
+        "rtt_max": probe["rtt_max"],
+    }
 
 
 def ping_all(ip_list):
-    """Tüm IP adreslerine eşzamanlı olarak ping atar."""
-    with concurrent.futures.ThreadPoolExecutor(max_workers=50) as executor:
-        results = list(executor.map(ping, ip_list))
-    return results
+    """Tüm IP adreslerine tek asyncio taramasıyla ICMP (gerekirse TCP) probe gönderir."""
+    try:
+        probes = reachability.probe_hosts(ip_list)
+    except Exception as e:
+        return [{"ip": ip, "status": "Hata", "latency": str(e)} for ip in ip_list]
+    return [format_result(ip, probes[ip]) for ip in dict.fromkeys(ip_list)]
 
 
 # Ping işlemlerini gerçekleştir
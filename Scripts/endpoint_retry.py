@@ -0,0 +1,174 @@
+import heapq
+import logging
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+import requests
+
+import netdb_broker
+import run_ledger
+
+logger = logging.getLogger(__name__)
+
+# 📌 Retry Settings
+MAX_ATTEMPTS = 4
+BASE_DELAY = 2          # saniye; her denemede iki katına çıkar
+MAX_DELAY = 60
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class EndpointError(Exception):
+    def __init__(self, message, retryable=True, retry_after=None, status=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+        self.status = status
+
+
+def backoff_delay(attempt, base=BASE_DELAY, cap=MAX_DELAY):
+    """Full jitter: 0 ile min(cap, base * 2^attempt) arasında rastgele bekleme."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def get_json(session, url, headers=None, timeout=60):
+    """Tek endpoint isteği; hata türüne göre tekrar denenebilir olup olmadığını işaretler."""
+    try:
+        with run_ledger.timed_request(url) as call:
+            response = call["response"] = session.get(url, headers=headers, timeout=timeout)
+    except (requests.ConnectionError, requests.Timeout) as e:
+        raise EndpointError(str(e)) from e
+    except requests.RequestException as e:
+        raise EndpointError(str(e), retryable=False) from e
+
+    if response.status_code != 200:
+        retry_after = response.headers.get("Retry-After")
+        raise EndpointError(
+            f"HTTP {response.status_code}",
+            retryable=response.status_code in RETRYABLE_STATUS,
+            retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            status=response.status_code,
+        )
+    try:
+        return response.json()
+    except ValueError as e:
+        raise EndpointError(f"Geçersiz JSON: {e}") from e
+
+
+# 📂 Stale yedek: son başarılı yanıtlar netdb_broker'ın istek başına dosyalarında tutulur
+def apply_cache(result, urls, fresh, store_fresh):
+    """
+    Başarısız endpoint'ler için önbellekteki son başarılı yanıtı kullanır ve stale olarak işaretler.
+    store_fresh: fetch broker üzerinden yapılmadıysa taze yanıtlar da önbelleğe yazılır
+    (broker üzerinden yapıldıysa zaten yazılmıştır; aynı yanıt iki kez yazılmaz).
+    """
+    for endpoint in list(result["failed"]):
+        cached = netdb_broker.latest_entry(urls[endpoint])
+        if cached:
+            result["results"][endpoint] = cached["payload"]
+            result["stale"][endpoint] = datetime.fromtimestamp(cached["fetched_at"]).strftime("%Y-%m-%d %H:%M:%S")
+            del result["failed"][endpoint]
+
+    if store_fresh:
+        for endpoint, payload in fresh.items():
+            netdb_broker.store(urls[endpoint], payload)
+
+
+def fetch_endpoints(jobs, fetch, max_workers=20, max_attempts=MAX_ATTEMPTS, use_cache=True, on_host_done=None,
+                    store_fresh=True):
+    """
+    jobs: {hostname: {endpoint: url}}
+    fetch: fetch(url) -> payload, hata durumunda EndpointError fırlatır;
+           netdb_broker.PeerPending fırlatırsa endpoint deneme sayılmadan bekleme kuyruğuna alınır
+    store_fresh: fetch zaten netdb_broker.fetch ise False (yanıtı broker yazar)
+
+    Her endpoint ayrı iş olarak havuza verilir ve yalnız başarısız olan endpoint tekrar denenir.
+    Bekleme worker thread'lerinde değil, bu fonksiyonun bekleme kuyruğunda yapılır.
+    Tüm denemeler tükenirse önceki başarılı yanıt kullanılır ve stale olarak işaretlenir.
+    Önbellek okuma/yazma da havuzda yapılır; dağıtıcı döngü dosya I/O'su için beklemez.
+
+    Dönüş: {hostname: {"results": {endpoint: payload}, "stale": {endpoint: fetched_at},
+                       "failed": {endpoint: hata}, "status": {endpoint: http_status}}}
+    on_host_done(hostname, result) verilirse cihazın tüm endpoint'leri bittiği anda çağrılır.
+    """
+    results = {hostname: {"results": {}, "stale": {}, "failed": {}, "status": {}} for hostname in jobs}
+    remaining = {hostname: len(endpoints) for hostname, endpoints in jobs.items()}
+    fresh = {hostname: {} for hostname in jobs}
+
+    delayed = []     # (hazır_olma_zamanı, sıra, hostname, endpoint, deneme)
+    sequence = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+
+        def submit(hostname, endpoint, attempt):
+            future = executor.submit(fetch, jobs[hostname][endpoint])
+            running[future] = (hostname, endpoint, attempt)
+
+        def finish_endpoint(hostname):
+            remaining[hostname] -= 1
+            if remaining[hostname]:
+                return
+            if use_cache:
+                # Cihazın tüm endpoint'leri bitti; önbellek işi havuzda yapılır, bitince host_done çağrılır
+                future = executor.submit(apply_cache, results[hostname], jobs[hostname], fresh.pop(hostname),
+                                         store_fresh)
+                running[future] = (hostname, None, None)
+            elif on_host_done:
+                on_host_done(hostname, results[hostname])
+
+        for hostname, endpoints in jobs.items():
+            if not endpoints:
+                remaining[hostname] = 1
+                finish_endpoint(hostname)
+
+        for hostname, endpoints in jobs.items():
+            for endpoint in endpoints:
+                submit(hostname, endpoint, 0)
+
+        while running or delayed:
+            now = time.monotonic()
+            while delayed and delayed[0][0] <= now:
+                _, _, hostname, endpoint, attempt = heapq.heappop(delayed)
+                submit(hostname, endpoint, attempt)
+
+            timeout = max(0.0, delayed[0][0] - now) if delayed else None
+            if not running:
+                time.sleep(timeout)
+                continue
+
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                hostname, endpoint, attempt = running.pop(future)
+                if endpoint is None:
+                    if future.exception():
+                        logger.warning("Önbellek işlenemedi: %s, %s", hostname, future.exception())
+                    if on_host_done:
+                        on_host_done(hostname, results[hostname])
+                    continue
+                try:
+                    payload = future.result()
+                except Exception as e:
+                    if getattr(e, "pending", False):
+                        # Aynı istek başka bir işte sürüyor; sonucu broker'a düşünce tekrar sorulur
+                        sequence += 1
+                        heapq.heappush(delayed, (time.monotonic() + e.retry_after, sequence, hostname, endpoint, attempt))
+                        continue
+                    retryable = getattr(e, "retryable", True)
+                    if retryable and attempt + 1 < max_attempts:
+                        delay = getattr(e, "retry_after", None) or backoff_delay(attempt)
+                        logger.info("%s/%s tekrar denenecek (%d), %.1f sn sonra: %s",
+                                    hostname, endpoint, attempt + 1, delay, e)
+                        sequence += 1
+                        heapq.heappush(delayed, (time.monotonic() + delay, sequence, hostname, endpoint, attempt + 1))
+                        continue
+                    logger.warning("%s/%s alınamadı (%d deneme): %s", hostname, endpoint, attempt + 1, e)
+                    results[hostname]["failed"][endpoint] = str(e)
+                    results[hostname]["status"][endpoint] = getattr(e, "status", None)
+                else:
+                    results[hostname]["results"][endpoint] = payload
+                    fresh[hostname][endpoint] = payload
+                finish_endpoint(hostname)
+
+    return results
+
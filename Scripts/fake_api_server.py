@@ -0,0 +1,303 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from collections import Counter, deque
+from datetime import datetime
+from urllib.parse import parse_qs
+
+import benchmark
+
+# NetDB ve Statseeker API'lerinin yerel taklidi. Collector'lar NETDB_API_URL / STATSEEKER_API_URL
+# ile buraya yönlendirilerek eşzamanlılık ve retry davranışı çevrimdışı yük altında denenir.
+#
+#   python fake_api_server.py --scale 10 --latency-ms 120 --error-rate 0.02 --throttle-rate 0.01
+#   set NETDB_API_URL=http://127.0.0.1:5002/v1
+#   set STATSEEKER_API_URL=http://127.0.0.1:5002/api/v2.1
+#   python switch_ports.py --workers 4
+#
+# Yanıtlar benchmark.py fixture'larından üretilir (kayıtlı varsa onlar, yoksa sentetik).
+
+# 📌 Server Settings (komut satırından değiştirilebilir)
+SETTINGS = {
+    "scale": 1,                 # Filo çarpanı (benchmark.FLEET)
+    "latency": "lognormal",     # fixed | uniform | exponential | lognormal
+    "latency_ms": 80,           # Ortalama yanıt süresi
+    "latency_sigma": 0.6,       # lognormal dağılımın yayılımı
+    "error_rate": 0.0,          # Rastgele 500/502/503 oranı
+    "throttle_rate": 0.0,       # Rastgele 429 oranı
+    "max_rps": 0,               # Saniyedeki istek sınırı; aşılınca 429 (0 = sınırsız)
+    "retry_after": 1,           # 429/503 yanıtlarındaki Retry-After (saniye)
+    "ping_loss": 0.02,          # tshoot/ping'de up cihazların yanıt vermeme oranı
+    "seed": None,
+}
+
+SWITCH_ENDPOINTS = {"interfaces", "vlans", "neighbors", "mac-address-table"}
+AP_ENDPOINTS = {"facts", "interfaces", "wireless-clients", "neighbors", "wireless-radios"}
+ACCESS_TOKEN = "fake-netdb-token"
+
+rng = random.Random()
+stats = Counter()               # "rota status" -> istek sayısı
+recent_requests = deque()       # max_rps için son bir saniyedeki istek zamanları
+fleet = {}
+
+
+def build_fleet(scale):
+    """Statseeker satırları ve NetDB payload'ları; tüm istekler bu tek kopyadan yanıtlanır."""
+    fixtures, recorded = benchmark.load_fixtures(benchmark.FIXTURE_DIR)
+    data = benchmark.scale_fixtures(fixtures, scale)
+    inventory = {row["deviceid"]: row for row in data["inventory"]}
+
+    devices = []
+    for row in data["devices"]:
+        devices.append({**inventory.get(row["deviceid"], {}), **row, "name": row["hostname"],
+                        "sysName": row["hostname"]})
+    for index, hostname in enumerate(data["aps"]):
+        deviceid = 2_000_000 + index
+        devices.append({"id": deviceid, "deviceid": deviceid, "hostname": hostname, "name": hostname,
+                        "sysName": hostname, "ipaddress": f"10.34.{40 + index // 250}.{index % 250 + 1}",
+                        "ping_state": "up", "model": "AP-410C", "serial": f"B0{deviceid}",
+                        "sysDescr": "Extreme Networks AP-410C", "sysLocation": "Warehouse"})
+
+    switch_payloads = fixtures["netdb_switch"]
+    ports = []
+    for row in data["switches"]:
+        interfaces = (switch_payloads.get("interfaces") or {}).get("results") or {}
+        for index, (name, details) in enumerate(interfaces.items()):
+            ports.append({"id": row["deviceid"] * 1000 + index, "deviceid": row["deviceid"], "name": name,
+                          "ifTitle": name, "ifDescr": details.get("description", ""),
+                          "ifSpeed": 10_000_000_000 if name.startswith("Ten") else 1_000_000_000,
+                          "ifAdminStatus": "up", "ifOperStatus": details.get("link_status", "down"),
+                          "if90day": 1 if details.get("is_up") else 0})
+
+    # Statseeker syslog zamanı epoch olarak döner
+    syslog = []
+    for index, entry in enumerate(data["syslog"]):
+        logged_at = datetime.strptime(entry["time"], "%Y-%m-%d %H:%M:%S UTC")
+        syslog.append({**entry, "id": index + 1, "time": int((logged_at - datetime(1970, 1, 1)).total_seconds())})
+
+    return {
+        "recorded": recorded,
+        "cdt_device": devices,
+        "cdt_inventory": [{"deviceid": row["deviceid"], "serial": row.get("serial"), "model": row.get("model")}
+                          for row in devices],
+        "cdt_port": ports,
+        "syslog": syslog,
+        "switches": {row["hostname"].lower() for row in data["switches"]},
+        "routers": {row["hostname"].lower() for row in data["devices"] if "ttr" in row["hostname"].lower()},
+        "aps": {hostname.lower() for hostname in data["aps"]},
+        "ping_state": {row["ipaddress"]: row.get("ping_state") for row in devices if row.get("ipaddress")},
+        "switch_payloads": switch_payloads,
+        "ap_payloads": fixtures["netdb_ap"],
+    }
+
+
+def sample_latency():
+    mean = SETTINGS["latency_ms"] / 1000
+    kind = SETTINGS["latency"]
+    if mean <= 0 or kind == "fixed":
+        return max(mean, 0)
+    if kind == "uniform":
+        return rng.uniform(0, 2 * mean)
+    if kind == "exponential":
+        return rng.expovariate(1 / mean)
+    sigma = SETTINGS["latency_sigma"]
+    # Ortalaması latency_ms olacak şekilde (mu = ln(ortalama) - sigma²/2)
+    return rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+
+
+def injected_failure():
+    """Rastgele ya da hız sınırından kaynaklanan hata: (status, mesaj) veya None"""
+    now = time.monotonic()
+    recent_requests.append(now)
+    while recent_requests and recent_requests[0] < now - 1:
+        recent_requests.popleft()
+    if SETTINGS["max_rps"] and len(recent_requests) > SETTINGS["max_rps"]:
+        return 429, "Rate limit exceeded"
+    roll = rng.random()
+    if roll < SETTINGS["throttle_rate"]:
+        return 429, "Too many requests"
+    if roll < SETTINGS["throttle_rate"] + SETTINGS["error_rate"]:
+        return rng.choice((500, 502, 503)), "Injected upstream error"
+    return None
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def project(rows, query):
+    """Statseeker fields/deviceid/limit/offset parametrelerini uygular."""
+    ids = query.get("deviceid", [None])[0]
+    id_filter = query.get("deviceid_filter", [None])[0]
+    if ids:
+        wanted = {ids}
+    elif id_filter and id_filter.upper().startswith("IN(") and id_filter.endswith(")"):
+        wanted = {value.strip() for value in id_filter[3:-1].split(",")}
+    else:
+        wanted = None
+    if wanted is not None:
+        rows = [row for row in rows if str(row.get("deviceid")) in wanted]
+
+    total = len(rows)
+    offset = int(query.get("offset", ["0"])[0] or 0)
+    limit = int(query.get("limit", [str(total)])[0] or total)
+    rows = rows[offset:offset + limit]
+
+    fields = [f for f in query.get("fields", [""])[0].split(",") if f]
+    if fields:
+        rows = [{field: row.get(field) for field in fields} for row in rows]
+    return rows, total
+
+
+def statseeker_response(name, query):
+    if name not in ("cdt_device", "cdt_inventory", "cdt_port", "syslog"):
+        raise HttpError(404, f"Unknown object {name}")
+    rows, total = project(fleet[name], query)
+    return {"version": "2.1", "revision": "fake", "info": "Local stand-in",
+            "data": {"success": True, "errmsg": "ok", "time": int(time.time()),
+                     "objects": [{"type": name, "sequence": 0, "status": {"success": True, "errcode": 0},
+                                  "data_total": total, "data": rows}]}}
+
+
+def netdb_device_response(hostname, endpoint):
+    host = hostname.lower()
+    if endpoint in SWITCH_ENDPOINTS and (host in fleet["switches"] or host in fleet["routers"]):
+        key = endpoint.replace("-", "_")
+        payload = fleet["switch_payloads"].get(key)
+        if payload is None:
+            raise HttpError(404, f"No {endpoint} data for {hostname}")
+        return payload
+    # ap_data NetDB hostname'ini birkaç varyasyonla dener; SEG içeren her isim AP sayılır
+    if endpoint in AP_ENDPOINTS and (host in fleet["aps"] or "seg" in host):
+        return {"success": True, "results": fleet["ap_payloads"].get(endpoint.replace("-", "_"))}
+    raise HttpError(404, f"Device {hostname} not found")
+
+
+def ping_response(query):
+    hosts = [h for h in query.get("hosts", [""])[0].split(",") if h]
+    count = int(query.get("count", ["1"])[0])
+    timeout = int(query.get("timeout", ["1500"])[0])
+    results = {}
+    for host in hosts:
+        state = fleet["ping_state"].get(host)
+        success = state == "up" and rng.random() >= SETTINGS["ping_loss"]
+        results[host] = {"success": success, "count": count, "timeout": timeout}
+    return {"permalink": f"fake://tshoot/ping/{int(time.time() * 1000)}", "results": results}
+
+
+def stats_key(path):
+    """İstatistikler hostname yerine endpoint bazında tutulur."""
+    parts = [p for p in path.split("/") if p]
+    if parts[:2] == ["api", "v2.1"] and len(parts) == 3:
+        return f"statseeker/{parts[2]}"
+    if parts[:2] == ["v1", "device"] and len(parts) == 4:
+        return f"netdb/device/{parts[3]}"
+    return "netdb/" + "/".join(parts[1:]) if parts[:1] == ["v1"] else "other"
+
+
+def route(method, path, query, headers):
+    parts = [p for p in path.split("/") if p]
+    if parts[:2] == ["api", "v2.1"] and len(parts) == 3 and method == "GET":
+        return statseeker_response(parts[2], query)
+    if parts[:1] != ["v1"]:
+        raise HttpError(404, "Not found")
+    if parts[1:] == ["authorize"] and method == "POST":
+        return {"access_token": ACCESS_TOKEN, "token_type": "bearer", "expires_in": 3600}
+    if headers.get("authorization") != f"Bearer {ACCESS_TOKEN}":
+        raise HttpError(401, "Missing or invalid bearer token")
+    if parts[1:] == ["tshoot", "ping"] and method == "GET":
+        return ping_response(query)
+    if len(parts) == 4 and parts[1] == "device" and method == "GET":
+        return netdb_device_response(parts[2], parts[3])
+    raise HttpError(404, "Not found")
+
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def send_json(send_fn, status, payload, extra_headers=()):
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    headers += [(k.encode("latin-1"), v.encode("latin-1")) for k, v in extra_headers]
+    await send_fn({"type": "http.response.start", "status": status, "headers": headers})
+    await send_fn({"type": "http.response.body", "body": body})
+
+
+async def app(scope, receive, send_fn):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send_fn({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send_fn({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    await read_body(receive)
+    path = scope["path"]
+    if path == "/_stats":
+        return await send_json(send_fn, 200, {"settings": SETTINGS, "fixtures": fleet["recorded"],
+                                              "requests": dict(sorted(stats.items()))})
+
+    query = parse_qs(scope["query_string"].decode("latin-1"))
+    headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+    await asyncio.sleep(sample_latency())
+
+    key = stats_key(path)
+    try:
+        payload = route(scope["method"], path, query, headers)
+    except HttpError as e:
+        stats[f"{key} {e.status}"] += 1
+        return await send_json(send_fn, e.status, {"success": False, "error": str(e)})
+
+    failure = injected_failure()
+    if failure:
+        status, message = failure
+        stats[f"{key} {status}"] += 1
+        extra = [("retry-after", str(SETTINGS["retry_after"]))] if status in (429, 503) else []
+        return await send_json(send_fn, status, {"success": False, "error": message}, extra)
+
+    stats[f"{key} 200"] += 1
+    await send_json(send_fn, 200, payload)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="NetDB/Statseeker API'lerinin yerel taklidi.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5002)
+    parser.add_argument("--scale", type=int, default=SETTINGS["scale"])
+    parser.add_argument("--latency", choices=("fixed", "uniform", "exponential", "lognormal"),
+                        default=SETTINGS["latency"])
+    parser.add_argument("--latency-ms", type=float, default=SETTINGS["latency_ms"])
+    parser.add_argument("--latency-sigma", type=float, default=SETTINGS["latency_sigma"])
+    parser.add_argument("--error-rate", type=float, default=SETTINGS["error_rate"])
+    parser.add_argument("--throttle-rate", type=float, default=SETTINGS["throttle_rate"])
+    parser.add_argument("--max-rps", type=int, default=SETTINGS["max_rps"])
+    parser.add_argument("--retry-after", type=int, default=SETTINGS["retry_after"])
+    parser.add_argument("--ping-loss", type=float, default=SETTINGS["ping_loss"])
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    for name in SETTINGS:
+        SETTINGS[name] = getattr(args, name)
+    rng.seed(args.seed)
+    fleet.update(build_fleet(args.scale))
+    print(f"Filo: {len(fleet['switches'])} switch, {len(fleet['aps'])} AP, {len(fleet['syslog'])} syslog "
+          f"(fixture: {', '.join(fleet['recorded']) or 'sentetik'})")
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -10,6 +10,8 @@ from mac_vendor_lookup import MacLookup
 import os
 from dotenv import load_dotenv
 
+import netdb_broker
+
 load_dotenv()
 
 # API ve dosya yolları
@@ -45,15 +47,19 @@ def get_netdb_bearer_token():
         logging.error(f"NetDB Bearer token alma hatası: {e}")
     return None
 
+def get_json(url, headers, timeout=30):
+    response = requests.get(url, headers=headers, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
 # MAC adres tablosunu çekme
 def get_mac_address_table(hostname, bearer_token):
     url = f"{netdb_base_url}{hostname}/mac-address-table?device_type=cisco_ios"
     headers = {'Authorization': f'Bearer {bearer_token}', 'Accept': 'application/json'}
     try:
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
+        mac_table = netdb_broker.fetch(url, lambda: get_json(url, headers))
         logging.info(f"MAC adres tablosu başarıyla alındı: {hostname}")
-        return response.json()
+        return mac_table
     except requests.RequestException as e:
         logging.error(f"MAC adres tablosu alınırken hata oluştu: {e}")
     return None
@@ -65,10 +71,9 @@ def get_device_data(hostname, bearer_token):
     headers = {'Authorization': f'Bearer {bearer_token}', 'Accept': 'application/json'}
 
     try:
-        response = requests.get(interfaces_url, headers=headers, timeout=30)
-        response.raise_for_status()
+        device_data = netdb_broker.fetch(interfaces_url, lambda: get_json(interfaces_url, headers))
         logging.info(f"Cihaz verileri başarıyla alındı: {hostname}")
-        return response.json()
+        return device_data
     except requests.RequestException as e:
         logging.error(f"Cihaz verileri alınırken hata oluştu: {e}")
     return None
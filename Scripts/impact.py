@@ -0,0 +1,120 @@
+from collections import deque
+
+import topology
+
+
+def reachable_from_cores(topo, failed):
+    """Arızalı node'lar çıkarılmış grafikte core'lardan tek geçişlik BFS yapar."""
+    adjacency = topo.get("adjacency", {})
+    reachable = set()
+    queue = deque()
+
+    for core in topo.get("cores", []):
+        if core in adjacency and core not in failed:
+            reachable.add(core)
+            queue.append(core)
+
+    while queue:
+        current = queue.popleft()
+        for neighbor in adjacency[current]:
+            if neighbor not in reachable and neighbor not in failed:
+                reachable.add(neighbor)
+                queue.append(neighbor)
+
+    return reachable
+
+
+def compute_impact(topo, failed_hosts):
+    """
+    Bir durum değişikliği grubundaki tüm DOWN cihazlar için etki analizini tek geçişte yapar.
+    Arızalı cihazlar kaldırılınca core'dan erişilemeyen her cihaz, uplink zincirindeki
+    arızalı cihazların hepsine atanır; kök nedenin sayıları alttaki DOWN cihazları ve onların
+    arkasındakileri de içerir. Dönüş: {hostname: impact_dict}
+    """
+    if not topo or not failed_hosts:
+        return {}
+
+    nodes = topo.get("nodes", {})
+    parents = topo.get("parents", {})
+    failed = {topology.normalize_hostname(h) for h in failed_hosts} - {None}
+    failed &= set(nodes)
+
+    reachable = reachable_from_cores(topo, failed)
+
+    impact = {
+        host: {
+            "root_cause": host,
+            "affected_devices": [],
+            "affected_aps": [],
+            "affected_ports": []
+        }
+        for host in failed
+    }
+
+    # f(x): x'in kendisi veya üstündeki en yakın arızalı cihaz (memo ile O(N))
+    nearest_failed = {}
+
+    def failed_at_or_above(host):
+        chain = []
+        current = host
+        while current is not None and current not in nearest_failed:
+            if current in failed:
+                nearest_failed[current] = current
+                break
+            chain.append(current)
+            parent = parents.get(current)
+            current = parent[0] if parent else None
+        result = nearest_failed.get(current) if current is not None else None
+        for item in chain:
+            nearest_failed[item] = result
+        return result
+
+    def failed_above(host):
+        parent = parents.get(host)
+        return failed_at_or_above(parent[0]) if parent else None
+
+    # Erişilemeyen her cihaz (kendisi de DOWN olanlar dahil) uplink zincirindeki tüm arızalı cihazlara eklenir;
+    # site router'ı düşünce Statseeker arkasındaki switch'leri de DOWN gösterir, kök neden hepsini kapsamalıdır
+    for host in nodes:
+        if host in reachable:
+            continue
+        owner = failed_above(host)
+        if owner is None:
+            continue
+        bucket = "affected_aps" if nodes[host]["type"] == "Access Point" else "affected_devices"
+        parent, _, parent_port = parents[host]
+        while owner is not None:
+            impact[owner][bucket].append(host)
+            impact[owner]["affected_ports"].append(f"{parent} {parent_port}")
+            owner = failed_above(owner)
+
+    # Zincirleme arızalarda kök neden, uplink zincirindeki en üst arızalı cihazdır
+    for host in failed:
+        upstream = failed_above(host)
+        while upstream is not None:
+            impact[host]["root_cause"] = upstream
+            upstream = failed_above(upstream)
+
+    for data in impact.values():
+        for key in ("affected_devices", "affected_aps", "affected_ports"):
+            data[key].sort()
+        data["affected_count"] = len(data["affected_devices"]) + len(data["affected_aps"])
+
+    return impact
+
+
+def attach_impact(events, failed_hosts, topo=None):
+    """DOWN olaylarına impact alanını ekler; topoloji yoksa olaylar değişmeden döner."""
+    if topo is None:
+        topo = topology.load_topology(topology.TOPOLOGY_FILE)
+    if not topo:
+        return events
+
+    impact = compute_impact(topo, failed_hosts)
+    for event in events:
+        if event.get("new_status") != "down":
+            continue
+        host = topology.normalize_hostname(event.get("hostname"))
+        if host in impact:
+            event["impact"] = impact[host]
+    return events
@@ -2,6 +2,9 @@ import os
 import json
 import datetime
 
+import profiling
+import run_ledger
+
 # 📍 Dosya yolları
 DATA_DIR = "D:\\INTRANET\\Netinfo\\Data"
 LOGS_DIR = "D:\\INTRANET\\Netinfo\\logs\\Latest_Logs"
@@ -169,20 +172,26 @@ def generate_insight():
     return summary
 
 # 📍 JSON çıktısını kaydet
-insight = generate_insight()
-try:
-    if os.path.exists(OUTPUT_PATH):
-        with open(OUTPUT_PATH, "r", encoding="utf-8") as f:
-            existing = json.load(f)
-        if isinstance(existing, list):
-            existing.append(insight)
+def save_insight(insight):
+    try:
+        if os.path.exists(OUTPUT_PATH):
+            with open(OUTPUT_PATH, "r", encoding="utf-8") as f:
+                existing = json.load(f)
+            if isinstance(existing, list):
+                existing.append(insight)
+            else:
+                existing = [existing, insight]
         else:
-            existing = [existing, insight]
-    else:
-        existing = [insight]
-
-    with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
-        json.dump(existing, f, ensure_ascii=False, indent=4)
-    print(f"✅ Türkçe zengin özet başarıyla eklendi → {OUTPUT_PATH}")
-except Exception as e:
-    print(f"❌ Özet kaydedilirken hata oluştu: {e}")
+            existing = [insight]
+
+        with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
+            json.dump(existing, f, ensure_ascii=False, indent=4)
+        print(f"✅ Türkçe zengin özet başarıyla eklendi → {OUTPUT_PATH}")
+    except Exception as e:
+        print(f"❌ Özet kaydedilirken hata oluştu: {e}")
+
+
+if __name__ == "__main__":
+    with run_ledger.job_run("insights"):
+        with profiling.profiled("insights"):
+            save_insight(generate_insight())
@@ -0,0 +1,202 @@
+import datetime
+import json
+import os
+import random
+import smtplib
+import uuid
+
+# 📌 SMTP Server Settings (mail_sender ile aynı)
+SMTP_SERVERS = ["10.205.176.110", "10.205.235.73"]
+SMTP_PORT = 25
+SMTP_TIMEOUT = 10
+
+# 📌 File Paths
+OUTBOX_FILE = "D:/INTRANET/Netinfo/logs/Latest_Logs/mail_outbox.json"
+METRICS_FILE = "D:/INTRANET/Netinfo/logs/Latest_Logs/mail_queue_metrics.json"
+
+# 📌 Retry Settings
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 60
+BACKOFF_MAX_SECONDS = 3600
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def now_str():
+    return datetime.datetime.now().strftime(TIMESTAMP_FORMAT)
+
+
+# 📌 Outbox persistence
+def load_outbox():
+    if not os.path.exists(OUTBOX_FILE):
+        return {"queue": [], "dead": [], "sent_total": 0, "failed_total": 0}
+    try:
+        with open(OUTBOX_FILE, "r", encoding="utf-8") as f:
+            outbox = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        # Bozuk dosyayı kaybetmemek için kenara al
+        os.replace(OUTBOX_FILE, f"{OUTBOX_FILE}.corrupt-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}")
+        outbox = {}
+    outbox.setdefault("queue", [])
+    outbox.setdefault("dead", [])
+    outbox.setdefault("sent_total", 0)
+    outbox.setdefault("failed_total", 0)
+    return outbox
+
+
+def save_outbox(outbox):
+    tmp_path = f"{OUTBOX_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(outbox, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, OUTBOX_FILE)
+
+
+def enqueue(from_address, to_address, subject, message_string):
+    """Mesajı outbox'a kalıcı olarak ekler; gönderim flush ile yapılır."""
+    outbox = load_outbox()
+    item = {
+        "id": str(uuid.uuid4()),
+        "created": now_str(),
+        "from": from_address,
+        "to": to_address,
+        "subject": subject,
+        "message": message_string,
+        "attempts": 0,
+        "next_attempt": now_str(),
+        "last_error": None
+    }
+    outbox["queue"].append(item)
+    save_outbox(outbox)
+    return item["id"]
+
+
+def backoff_seconds(attempts):
+    """Jitter'lı üstel bekleme süresi."""
+    delay = min(BACKOFF_BASE_SECONDS * (2 ** (attempts - 1)), BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+# 📌 SMTP connection
+def open_connection():
+    """Birincil, olmazsa yedek SMTP sunucusuna bağlanır."""
+    last_error = None
+    for server in SMTP_SERVERS:
+        try:
+            return smtplib.SMTP(server, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        except (smtplib.SMTPException, OSError) as e:
+            last_error = e
+    raise ConnectionError(f"No SMTP server reachable: {last_error}")
+
+
+def close_connection(connection):
+    try:
+        connection.quit()
+    except (smtplib.SMTPException, OSError):
+        connection.close()
+
+
+def flush(log=print):
+    """
+    Zamanı gelen tüm mesajları tek SMTP bağlantısı üzerinden gönderir.
+    Başarısız mesajlar backoff ile yeniden planlanır, MAX_ATTEMPTS sonrası 'dead' listesine taşınır.
+    Dönüş: (gönderilen, başarısız)
+    """
+    if not os.path.exists(OUTBOX_FILE):
+        return 0, 0
+
+    outbox = load_outbox()
+    current = now_str()
+    due = [item for item in outbox["queue"] if item["next_attempt"] <= current]
+    if not due:
+        write_metrics(outbox)
+        return 0, 0
+
+    sent_ids = set()
+    failed = 0
+    connection = None
+    unreachable_error = None
+
+    for item in due:
+        try:
+            if unreachable_error is not None:
+                # Sunucuya ulaşılamıyorsa kalan mesajlar için tekrar timeout bekleme
+                raise unreachable_error
+            if connection is None:
+                connection = open_connection()
+            try:
+                connection.sendmail(item["from"], item["to"], item["message"].encode("utf-8"))
+            except smtplib.SMTPServerDisconnected:
+                # Sunucu bağlantıyı kapattıysa bir kez yeniden bağlan
+                connection = open_connection()
+                connection.sendmail(item["from"], item["to"], item["message"].encode("utf-8"))
+            sent_ids.add(item["id"])
+            log(f"Email sent to: {item['to']} ({item['subject']})")
+        except (smtplib.SMTPException, OSError) as e:
+            failed += 1
+            item["attempts"] += 1
+            item["last_error"] = str(e)[:200]
+            next_attempt = datetime.datetime.now() + datetime.timedelta(seconds=backoff_seconds(item["attempts"]))
+            item["next_attempt"] = next_attempt.strftime(TIMESTAMP_FORMAT)
+            log(f"Email could not be sent (attempt {item['attempts']}): {e}")
+
+            if isinstance(e, ConnectionError):
+                unreachable_error = e
+                connection = None
+            elif isinstance(e, smtplib.SMTPServerDisconnected):
+                connection = None
+
+    if connection is not None:
+        close_connection(connection)
+
+    remaining = []
+    for item in outbox["queue"]:
+        if item["id"] in sent_ids:
+            continue
+        if item["attempts"] >= MAX_ATTEMPTS:
+            outbox["dead"].append(item)
+            continue
+        remaining.append(item)
+
+    outbox["queue"] = remaining
+    outbox["sent_total"] += len(sent_ids)
+    outbox["failed_total"] += failed
+    outbox["last_flush"] = now_str()
+    save_outbox(outbox)
+    write_metrics(outbox)
+    return len(sent_ids), failed
+
+
+# 📌 Metrics
+def queue_metrics(outbox=None):
+    """Kuyruk derinliği ve gönderim sayaçlarını döndürür."""
+    if outbox is None:
+        outbox = load_outbox()
+    queue = outbox["queue"]
+    current = now_str()
+    oldest = min((item["created"] for item in queue), default=None)
+    oldest_age = 0
+    if oldest:
+        oldest_age = int((datetime.datetime.now() - datetime.datetime.strptime(oldest, TIMESTAMP_FORMAT)).total_seconds())
+    return {
+        "timestamp": current,
+        "queue_depth": len(queue),
+        "due": sum(1 for item in queue if item["next_attempt"] <= current),
+        "retrying": sum(1 for item in queue if item["attempts"] > 0),
+        "dead_letter": len(outbox["dead"]),
+        "oldest_age_seconds": oldest_age,
+        "sent_total": outbox["sent_total"],
+        "failed_total": outbox["failed_total"],
+        "last_flush": outbox.get("last_flush")
+    }
+
+
+def write_metrics(outbox=None):
+    try:
+        with open(METRICS_FILE, "w", encoding="utf-8") as f:
+            json.dump(queue_metrics(outbox), f, indent=2)
+    except OSError:
+        pass
+
+
+if __name__ == "__main__":
+    print(json.dumps(queue_metrics(), indent=2))
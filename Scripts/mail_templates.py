@@ -0,0 +1,57 @@
+import datetime
+import os
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+import alert_correlation
+
+# 📌 Template Settings
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "mail")
+NETINFO_LOGO_URL = "https://tr.eu.fedex.com/Horizon/images/ANKA_transparent.png"
+
+# Şablonlar modül yüklenirken bir kez derlenir; her mail sadece render maliyeti öder
+env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(enabled_extensions=("html",), default_for_string=False),
+    trim_blocks=True,
+    lstrip_blocks=True,
+    auto_reload=False,
+)
+
+TEMPLATES = {
+    name: env.get_template(name)
+    for name in ("status.html", "status.txt", "digest.html", "digest.txt")
+}
+
+
+def render(name, **context):
+    context.setdefault("logo_url", NETINFO_LOGO_URL)
+    context.setdefault("now", datetime.datetime.now().strftime('%d %B %Y - %H:%M'))
+    return TEMPLATES[name].render(**context)
+
+
+def render_status_mail(newly_offline, newly_online):
+    """Durum değişikliği maili için (html, text) döndürür."""
+    context = {
+        "title": "Cihaz Durum Bildirimi",
+        "newly_offline": newly_offline,
+        "newly_online": newly_online,
+    }
+    return render("status.html", **context), render("status.txt", **context)
+
+
+def render_digest(entries, period_label):
+    """
+    Saatlik özet maili: dönemdeki tüm değişiklikler flap/site korelasyonundan geçirilir,
+    her cihazın dönem sonundaki durumu listelenir.
+    """
+    events = alert_correlation.collapse_flaps(entries) if entries else []
+    sites = alert_correlation.group_by_site(events)
+    context = {
+        "title": f"Saatlik Durum Ozeti ({period_label})",
+        "events": events,
+        "sites": sites,
+        "still_down": [e for e in events if e.get("new_status", "").lower() == "down"],
+        "recovered": [e for e in events if e.get("new_status", "").lower() != "down"],
+    }
+    return render("digest.html", **context), render("digest.txt", **context)
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+
+# 📂 main_data.json'un cihaz başına bölünmüş hali
+SHARD_DIR = "D:/INTRANET/Netinfo/Data/main_data_shards"
+MANIFEST_FILE = os.path.join(SHARD_DIR, "manifest.json")
+
+# Her sorguda değişen üst bilgiler cihaz dosyasına yazılmaz, sadece manifest'te tutulur
+MANIFEST_FIELDS = ("last_updated", "stale")
+
+
+def shard_name(hostname):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", hostname) + ".json"
+
+
+def write_json_atomic(path, data, indent=None):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def load_manifest(manifest_file=MANIFEST_FILE):
+    if not os.path.exists(manifest_file):
+        return None
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_shards(devices, summary=None, shard_dir=None):
+    """
+    devices: {hostname: {"last_updated", "ports", ...}} (main_data.json'daki "data")
+    summary: manifest'e eklenecek genel alanlar (toplam trafik, son güncelleme vb.)
+
+    Sadece içeriği değişen cihaz dosyaları yeniden yazılır; manifest en son yazılır.
+    MANIFEST_FIELDS cihaz dosyasına girmez, değişmeleri dosyayı yeniden yazdırmaz.
+    Envanterden çıkan cihazların dosyaları silinir.
+    Dönüş: (yeniden yazılan cihaz sayısı, silinen cihaz sayısı)
+    """
+    shard_dir = shard_dir or SHARD_DIR
+    os.makedirs(shard_dir, exist_ok=True)
+    manifest_file = os.path.join(shard_dir, "manifest.json")
+    previous = (load_manifest(manifest_file) or {}).get("devices", {})
+    now = datetime.now().isoformat(timespec="seconds")
+
+    entries = {}
+    written = 0
+    for hostname, device in devices.items():
+        shard = {key: value for key, value in device.items() if key not in MANIFEST_FIELDS}
+        body = json.dumps(shard, ensure_ascii=False, sort_keys=True)
+        digest = hashlib.sha1(body.encode("utf-8")).hexdigest()
+        entry = previous.get(hostname)
+        path = os.path.join(shard_dir, shard_name(hostname))
+        if not entry or entry.get("sha1") != digest or not os.path.exists(path):
+            write_json_atomic(path, shard)
+            entry = {"file": shard_name(hostname), "sha1": digest, "written_at": now}
+            written += 1
+        entry["last_updated"] = device.get("last_updated")
+        entry["stale"] = bool(device.get("stale"))
+        entry["port_count"] = len(device.get("ports", []))
+        entries[hostname] = entry
+
+    removed = 0
+    for hostname, entry in previous.items():
+        if hostname not in entries:
+            removed += 1
+            try:
+                os.remove(os.path.join(shard_dir, entry["file"]))
+            except OSError:
+                pass
+
+    manifest = dict(summary or {})
+    manifest["generated_at"] = now
+    manifest["devices"] = entries
+    write_json_atomic(manifest_file, manifest, indent=2)
+    return written, removed
+
+
+def load_device(hostname, shard_dir=SHARD_DIR):
+    """Tek switch'in port verisi (last_updated ve stale manifest'tedir); yoksa None."""
+    path = os.path.join(shard_dir, shard_name(hostname))
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
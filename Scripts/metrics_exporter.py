@@ -0,0 +1,481 @@
+import argparse
+import hmac
+import ipaddress
+import json
+import os
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import run_ledger
+import work_queue
+
+# 📌 Exporter Settings
+METRICS_HOST = os.environ.get("METRICS_HOST", "0.0.0.0")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9108"))
+LEDGER_OVERLAP = 300            # Ledger'a geç yazılan satırlar kaçmasın diye her okumada geriye bakılan süre (sn)
+SEEN_KEEP_SECONDS = 24 * 60 * 60
+
+# 📌 Push Settings
+# /push: token tanımlıysa "Authorization: Bearer <token>" zorunlu; tanımlı değilse sadece localhost'tan kabul edilir
+PUSH_TOKEN = os.environ.get(run_ledger.PUSH_TOKEN_ENV, "")
+# Sadece bilinen işlerin satırları kabul edilir (job etiketi sınırsız büyümesin)
+PUSH_JOBS = {"statseeker_base", "switch_ports", "switch_ports.worker", "ap_data", "router_ports",
+             "syslog_extract", "syslog_analysis", "syslog_metrics", "insights"}
+PUSH_ENDPOINT_PREFIXES = ("netdb/", "statseeker/")
+PUSH_STATUSES = {"ok", "failed", "interrupted"}
+PUSH_NUMBER_FIELDS = ("started_at", "finished_at", "duration", "peak_rss", "bytes_read", "bytes_written",
+                      "requests", "failures")
+MAX_ENDPOINTS = 200             # endpoint etiketinin alabileceği en fazla değer
+MAX_COUNTERS = 500              # (iş, sayaç) çiftlerinin en fazla sayısı
+MAX_PUSH_BYTES = 1024 * 1024
+
+# 📂 Tazeliği izlenen çıktı dosyaları
+DATA_DIR = "D:/INTRANET/Netinfo/Data"
+OUTPUT_FILES = {
+    "network_device_inventory": f"{DATA_DIR}/network_device_inventory.json",
+    "main_data": f"{DATA_DIR}/main_data.json",
+    "main_data_manifest": f"{DATA_DIR}/main_data_shards/manifest.json",
+    "main_router_data": f"{DATA_DIR}/main_router_data.json",
+    "access_point_inventory": f"{DATA_DIR}/access_point_inventory.json",
+    "topology": f"{DATA_DIR}/topology.json",
+    "snmp_metrics": f"{DATA_DIR}/snmp_metrics.json",
+    "syslog_data": f"{DATA_DIR}/syslog_data.json",
+    "syslog_metrics": f"{DATA_DIR}/syslog_metrics.json",
+    "syslog_summary": "D:/INTRANET/Netinfo/Logs/Syslog_AI/syslog_summary.json",
+}
+MAIL_METRICS_FILE = "D:/INTRANET/Netinfo/logs/Latest_Logs/mail_queue_metrics.json"
+
+# Ledger'daki iş sayaçlarından önbellek isabet oranı üretilenler: önbellek -> (isabet, ıskalama)
+CACHE_COUNTERS = {
+    "netdb_broker": ("broker_hits", "broker_misses"),
+}
+
+# Scheduler'ın kendi gözlemleri (script başına) ve ledger/push ile gelen iş çalıştırmalarının birikimi.
+# Sayaçlar exporter başladığından beri birikir; Prometheus yeniden başlamayı sıfırlanma olarak görür.
+_state = {
+    "scheduler": {},        # script -> {"in_flight", "runs": {result: n}, "duration", "last_success", "last_run"}
+    "latest": {},           # job -> son çalıştırmanın ledger satırı
+    "last_success": {},     # job -> son başarılı çalıştırmanın bitiş zamanı
+    "runs": {},             # (job, status) -> n
+    "endpoints": {},        # endpoint -> {"count", "errors", "seconds", "buckets"}
+    "counters": {},         # (job, sayaç) -> toplam
+    "seen": {},             # run id -> finished_at (tekrar sayılmasın)
+    "watermark": None,
+}
+_lock = threading.Lock()
+
+
+# 📌 Scheduler kancaları (sch.py run_script)
+def job_started(script):
+    with _lock:
+        entry = _state["scheduler"].setdefault(
+            script, {"in_flight": 0, "runs": {}, "duration": None, "last_success": None, "last_run": None})
+        entry["in_flight"] += 1
+
+
+def job_finished(script, seconds, ok):
+    now = time.time()
+    with _lock:
+        entry = _state["scheduler"][script]
+        entry["in_flight"] -= 1
+        result = "success" if ok else "failure"
+        entry["runs"][result] = entry["runs"].get(result, 0) + 1
+        entry["duration"] = seconds
+        entry["last_run"] = now
+        if ok:
+            entry["last_success"] = now
+
+
+# 📌 Ledger satırlarının birikimi
+def ingest(row):
+    """Ledger satırını (yerel ledger'dan ya da push ile) sayaçlara bir kez ekler."""
+    # Artışlar önce hesaplanır; satır beklenmedik yapıdaysa durum yarım güncellenmez
+    bucket_count = len(run_ledger.LATENCY_BUCKETS) + 1
+    endpoint_increments = {
+        name: (entry.get("count", 0), entry.get("errors", 0), entry.get("seconds", 0.0),
+               list(entry.get("buckets", []))[:bucket_count])
+        for name, entry in (row.get("endpoints") or {}).items()
+    }
+    counter_increments = {
+        (row["job"], name): value for name, value in (row.get("counters") or {}).items() if is_number(value)
+    }
+
+    with _lock:
+        if row["id"] in _state["seen"]:
+            return
+        _state["seen"][row["id"]] = row.get("finished_at") or time.time()
+
+        job = row["job"]
+        latest = _state["latest"].get(job)
+        if latest is None or (row.get("started_at") or 0) >= (latest.get("started_at") or 0):
+            _state["latest"][job] = row
+        if row.get("status") == "ok":
+            _state["last_success"][job] = max(_state["last_success"].get(job, 0), row.get("finished_at") or 0)
+        key = (job, row.get("status") or "unknown")
+        _state["runs"][key] = _state["runs"].get(key, 0) + 1
+
+        for name, (count, errors, seconds, buckets) in endpoint_increments.items():
+            total = _state["endpoints"].setdefault(
+                name, {"count": 0, "errors": 0, "seconds": 0.0, "buckets": [0] * bucket_count})
+            total["count"] += count
+            total["errors"] += errors
+            total["seconds"] += seconds
+            for i, n in enumerate(buckets):
+                total["buckets"][i] += n
+
+        for key, value in counter_increments.items():
+            _state["counters"][key] = _state["counters"].get(key, 0) + value
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def push_error(row):
+    """Push ile gelen satırın reddedilme nedeni; kabul edilebilirse None."""
+    if not isinstance(row, dict) or not row.get("id") or not row.get("job"):
+        return "id ve job alanları gerekli"
+    if not isinstance(row["id"], str):
+        return "id metin olmalı"
+    if row["job"] not in PUSH_JOBS:
+        return f"bilinmeyen iş: {row['job']}"
+    if row.get("status") not in PUSH_STATUSES:
+        return f"bilinmeyen durum: {row.get('status')}"
+    for field in PUSH_NUMBER_FIELDS:
+        if row.get(field) is not None and not is_number(row[field]):
+            return f"{field} sayı olmalı"
+    endpoints = row.get("endpoints") or {}
+    counters = row.get("counters") or {}
+    stages = row.get("stages") or {}
+    if not all(isinstance(value, dict) for value in (endpoints, counters, stages)):
+        return "endpoints, counters ve stages nesne olmalı"
+    for name, entry in endpoints.items():
+        if (not isinstance(entry, dict)
+                or not all(is_number(entry.get(key, 0)) for key in ("count", "errors", "seconds"))
+                or not isinstance(entry.get("buckets", []), list)
+                or not all(isinstance(n, int) and not isinstance(n, bool) for n in entry.get("buckets", []))):
+            return f"geçersiz endpoint kaydı: {name}"
+    for name, entry in stages.items():
+        if not isinstance(entry, dict) or not is_number(entry.get("seconds")):
+            return f"geçersiz stage kaydı: {name}"
+    with _lock:
+        known = set(_state["endpoints"])
+        known_counters = set(_state["counters"])
+    if len(known_counters | {(row["job"], name) for name in counters}) > MAX_COUNTERS:
+        return "sayaç sayısı sınırı aşıldı"
+    for name in endpoints:
+        if not str(name).startswith(PUSH_ENDPOINT_PREFIXES):
+            return f"bilinmeyen endpoint: {name}"
+        if name not in known:
+            known.add(name)
+            if len(known) > MAX_ENDPOINTS:
+                return "endpoint sayısı sınırı aşıldı"
+    return None
+
+
+def push_allowed(handler):
+    """Token tanımlıysa token'ı, değilse isteğin localhost'tan geldiğini kontrol eder."""
+    if PUSH_TOKEN:
+        header = handler.headers.get("Authorization", "")
+        return hmac.compare_digest(header.encode("utf-8"), f"Bearer {PUSH_TOKEN}".encode("utf-8"))
+    try:
+        return ipaddress.ip_address(handler.client_address[0]).is_loopback
+    except ValueError:
+        return False
+
+
+def sync_ledger(db_path=run_ledger.LEDGER_DB):
+    """
+    Yerel ledger'daki yeni satırları ekler.
+    İlk çağrıda sadece iş başına son çalıştırma ve son başarı zamanı alınır; geçmiş sayaçlara eklenmez.
+    """
+    if not os.path.exists(db_path):
+        return
+    try:
+        conn = run_ledger.connect(db_path)
+    except sqlite3.Error:
+        return
+    try:
+        if _state["watermark"] is None:
+            rows = conn.execute(
+                "SELECT * FROM runs r WHERE started_at = (SELECT MAX(started_at) FROM runs WHERE job = r.job)"
+            ).fetchall()
+            successes = conn.execute(
+                "SELECT job, MAX(finished_at) AS finished_at FROM runs WHERE status = 'ok' GROUP BY job"
+            ).fetchall()
+            with _lock:
+                for row in rows:
+                    run = ledger_row(row)
+                    _state["latest"][run["job"]] = run
+                    _state["seen"][run["id"]] = run["finished_at"]
+                for row in successes:
+                    _state["last_success"][row["job"]] = row["finished_at"]
+                _state["watermark"] = max((row["finished_at"] or 0 for row in rows), default=time.time())
+                # Bir sonraki okumanın geriye baktığı aralıktaki eski satırlar da sayılmış kabul edilir
+                for row in conn.execute("SELECT id, finished_at FROM runs WHERE finished_at > ?",
+                                        (_state["watermark"] - LEDGER_OVERLAP,)):
+                    _state["seen"][row["id"]] = row["finished_at"]
+            return
+
+        rows = conn.execute("SELECT * FROM runs WHERE finished_at > ? ORDER BY finished_at",
+                            (_state["watermark"] - LEDGER_OVERLAP,)).fetchall()
+    except sqlite3.Error:
+        return
+    finally:
+        conn.close()
+
+    for row in rows:
+        ingest(ledger_row(row))
+    with _lock:
+        if rows:
+            _state["watermark"] = max(_state["watermark"], max(row["finished_at"] or 0 for row in rows))
+        cutoff = time.time() - SEEN_KEEP_SECONDS
+        _state["seen"] = {run_id: at for run_id, at in _state["seen"].items() if (at or 0) > cutoff}
+
+
+def ledger_row(row):
+    run = dict(row)
+    for field in ("stages", "endpoints", "counters"):
+        run[field] = json.loads(run[field] or "{}")
+    return run
+
+
+# 📌 Prometheus text formatı
+def label_text(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+class Metrics:
+    """Aynı metriğin örneklerini HELP/TYPE başlığı altında toplar."""
+
+    def __init__(self):
+        self.families = {}
+
+    def add(self, name, kind, help_text, value, labels=None):
+        family = self.families.setdefault(name, {"type": kind, "help": help_text, "samples": []})
+        family["samples"].append((name, labels or {}, value))
+
+    def add_histogram(self, name, help_text, bounds, buckets, total, count, labels):
+        family = self.families.setdefault(name, {"type": "histogram", "help": help_text, "samples": []})
+        cumulative = 0
+        for bound, n in zip(list(bounds) + [float("inf")], buckets):
+            cumulative += n
+            family["samples"].append((f"{name}_bucket", dict(labels, le=number(float(bound))), cumulative))
+        family["samples"].append((f"{name}_sum", labels, total))
+        family["samples"].append((f"{name}_count", labels, count))
+
+    def render(self):
+        lines = []
+        for name, family in self.families.items():
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            for sample_name, labels, value in family["samples"]:
+                if value is not None:
+                    lines.append(f"{sample_name}{label_text(labels)} {number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def collect():
+    """Scrape anında tüm metrikleri üretir."""
+    sync_ledger()
+    now = time.time()
+    metrics = Metrics()
+
+    with _lock:
+        scheduler = {script: dict(entry, runs=dict(entry["runs"])) for script, entry in _state["scheduler"].items()}
+        latest = dict(_state["latest"])
+        last_success = dict(_state["last_success"])
+        runs = dict(_state["runs"])
+        endpoints = {name: dict(entry, buckets=list(entry["buckets"])) for name, entry in _state["endpoints"].items()}
+        counters = dict(_state["counters"])
+
+    # Scheduler
+    for script, entry in sorted(scheduler.items()):
+        labels = {"script": script}
+        metrics.add("netinfo_scheduler_jobs_in_flight", "gauge", "Şu an çalışan script sayısı.",
+                    entry["in_flight"], labels)
+        for result, n in sorted(entry["runs"].items()):
+            metrics.add("netinfo_scheduler_job_runs_total", "counter", "Scheduler'ın başlattığı script çalıştırmaları.",
+                        n, dict(labels, result=result))
+        metrics.add("netinfo_scheduler_job_duration_seconds", "gauge", "Script'in son çalıştırma süresi.",
+                    entry["duration"], labels)
+        metrics.add("netinfo_scheduler_job_last_success_timestamp_seconds", "gauge",
+                    "Script'in son başarılı bitiş zamanı.", entry["last_success"], labels)
+
+    # İş çalıştırmaları (ledger / push)
+    for (job, status), n in sorted(runs.items()):
+        metrics.add("netinfo_job_runs_total", "counter", "Ledger'a yazılan iş çalıştırmaları.",
+                    n, {"job": job, "status": status})
+    for job, run in sorted(latest.items()):
+        labels = {"job": job}
+        metrics.add("netinfo_job_duration_seconds", "gauge", "İşin son çalıştırma süresi.", run.get("duration"), labels)
+        metrics.add("netinfo_job_last_run_timestamp_seconds", "gauge", "İşin son çalıştırmasının bitiş zamanı.",
+                    run.get("finished_at"), labels)
+        metrics.add("netinfo_job_peak_rss_bytes", "gauge", "Son çalıştırmanın en yüksek bellek kullanımı.",
+                    run.get("peak_rss"), labels)
+        metrics.add("netinfo_job_bytes_read", "gauge", "Son çalıştırmada okunan byte (ağ + dosya).",
+                    run.get("bytes_read"), labels)
+        metrics.add("netinfo_job_bytes_written", "gauge", "Son çalıştırmada yazılan byte.",
+                    run.get("bytes_written"), labels)
+        metrics.add("netinfo_job_failures", "gauge", "Son çalıştırmadaki başarısızlık sayısı.",
+                    run.get("failures"), labels)
+        for stage, entry in (run.get("stages") or {}).items():
+            metrics.add("netinfo_job_stage_seconds", "gauge", "Son çalıştırmanın stage süreleri.",
+                        entry["seconds"], dict(labels, stage=stage))
+        for name, value in (run.get("counters") or {}).items():
+            if name.startswith("devices") and isinstance(value, (int, float)):
+                metrics.add("netinfo_job_devices", "gauge", "Son çalıştırmadaki cihaz sayıları.",
+                            value, dict(labels, kind=name))
+    for job, finished_at in sorted(last_success.items()):
+        metrics.add("netinfo_job_last_success_timestamp_seconds", "gauge", "İşin son başarılı bitiş zamanı.",
+                    finished_at, {"job": job})
+    for (job, name), value in sorted(counters.items()):
+        if name in ("devices", "devices_polled"):
+            metrics.add("netinfo_devices_processed_total", "counter", "İşlerin işlediği cihazlar.",
+                        value, {"job": job, "kind": name})
+
+    # Upstream istekleri
+    for name, entry in sorted(endpoints.items()):
+        labels = {"service": name.split("/", 1)[0], "endpoint": name}
+        metrics.add_histogram("netinfo_upstream_request_duration_seconds", "NetDB/Statseeker istek süreleri.",
+                              run_ledger.LATENCY_BUCKETS, entry["buckets"], entry["seconds"], entry["count"], labels)
+        metrics.add("netinfo_upstream_request_errors_total", "counter", "Hata ile biten upstream istekleri.",
+                    entry["errors"], labels)
+
+    # Önbellek isabeti
+    for cache, (hit_name, miss_name) in CACHE_COUNTERS.items():
+        hits = sum(value for (job, name), value in counters.items() if name == hit_name)
+        misses = sum(value for (job, name), value in counters.items() if name == miss_name)
+        labels = {"cache": cache}
+        metrics.add("netinfo_cache_hits_total", "counter", "Önbellekten karşılanan istekler.", hits, labels)
+        metrics.add("netinfo_cache_misses_total", "counter", "Upstream'e giden istekler.", misses, labels)
+        metrics.add("netinfo_cache_hit_ratio", "gauge", "Exporter başından beri isabet oranı.",
+                    hits / (hits + misses) if hits + misses else None, labels)
+
+    # Veri tazeliği
+    for name, path in OUTPUT_FILES.items():
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue
+        labels = {"file": name}
+        metrics.add("netinfo_output_file_mtime_seconds", "gauge", "Çıktı dosyasının son yazılma zamanı.",
+                    mtime, labels)
+        metrics.add("netinfo_output_file_age_seconds", "gauge", "Çıktı dosyasının yaşı.", round(now - mtime, 1), labels)
+
+    # Kuyruklar
+    collect_work_queue(metrics)
+    collect_mail_queue(metrics)
+    return metrics.render()
+
+
+def collect_work_queue(metrics, db_path=work_queue.QUEUE_DB):
+    if not os.path.exists(db_path):
+        return
+    try:
+        conn = sqlite3.connect(db_path, timeout=5)
+        try:
+            rows = conn.execute("SELECT job, status, COUNT(*) FROM items GROUP BY job, status").fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return
+    for job, status, n in rows:
+        metrics.add("netinfo_work_queue_items", "gauge", "Kuyruktaki işler (leased: worker'da sürüyor).",
+                    n, {"job": job, "status": status})
+
+
+def collect_mail_queue(metrics, metrics_file=MAIL_METRICS_FILE):
+    try:
+        with open(metrics_file, "r", encoding="utf-8") as f:
+            mail = json.load(f)
+    except (OSError, ValueError):
+        return
+    for key in ("queue_depth", "due", "retrying", "dead_letter", "oldest_age_seconds"):
+        metrics.add(f"netinfo_mail_queue_{key}", "gauge", f"mail_queue {key}.", mail.get(key))
+    for key in ("sent_total", "failed_total"):
+        metrics.add(f"netinfo_mail_{key}", "counter", f"mail_queue {key}.", mail.get(key))
+
+
+# 📌 HTTP
+class MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics: Prometheus scrape; POST /push: kısa ömürlü işlerin ledger satırı."""
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        try:
+            body = collect().encode("utf-8")
+        except Exception as e:
+            self.send_error(500, explain=str(e))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path.split("?")[0] != "/push":
+            self.send_error(404)
+            return
+        if not push_allowed(self):
+            self.send_error(403, explain=f"{run_ledger.PUSH_TOKEN_ENV} token'ı gerekli")
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if length > MAX_PUSH_BYTES:
+                self.send_error(413)
+                return
+            row = json.loads(self.rfile.read(length))
+            error = push_error(row)
+            if error:
+                raise ValueError(error)
+        except ValueError as e:
+            self.send_error(400, explain=str(e))
+            return
+        ingest(row)
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Exporter'ı arka plan thread'inde başlatır (sch.py servisi içinden)."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Netinfo Prometheus exporter'ı (sch.py dışında tek başına).")
+    parser.add_argument("--host", default=METRICS_HOST)
+    parser.add_argument("--port", type=int, default=METRICS_PORT)
+    parser.add_argument("--once", action="store_true", help="Metrikleri bir kez yazdırıp çıkar")
+    args = parser.parse_args()
+
+    if args.once:
+        print(collect(), end="")
+    else:
+        print(f"Exporter: http://{args.host}:{args.port}/metrics")
+        ThreadingHTTPServer((args.host, args.port), MetricsHandler).serve_forever()
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import run_ledger
+
+logger = logging.getLogger(__name__)
+
+# 📂 İşler arası paylaşılan yanıtlar (istek başına bir dosya)
+BROKER_DIR = "D:/INTRANET/Netinfo/Data/netdb_broker"
+
+# 📌 Broker Settings
+FRESHNESS_SECONDS = 5 * 60      # Bu süreden yeni yanıt başka bir işte de tekrar kullanılır
+LOCK_TIMEOUT = 150              # Bu süreden eski kilit, çöken bir işten kalmış sayılır
+POLL_INTERVAL = 0.2
+PENDING_RETRY = 1.0             # wait=False: istek başka yerde sürüyorsa çağıranın tekrar deneyeceği süre (sn)
+
+# switch_ports, vlan_info, fetch_netdb_port_data ve new_main_script ayrı process'ler olarak
+# çalışır; aynı (cihaz, endpoint) isteği dosya kilidiyle tek upstream çağrısına indirilir.
+_key_locks = {}
+_key_locks_guard = threading.Lock()
+
+
+class PeerPending(Exception):
+    """
+    Aynı istek başka bir thread'de ya da işte sürüyor (wait=False).
+    endpoint_retry.fetch_endpoints bunu deneme saymadan bekleme kuyruğuna alır; havuz thread'i beklemez.
+    """
+    pending = True
+    retryable = True
+
+    def __init__(self, url, retry_after=PENDING_RETRY):
+        super().__init__(f"İstek başka bir işte sürüyor: {url}")
+        self.retry_after = retry_after
+
+
+def request_key(url):
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+def entry_path(key):
+    return os.path.join(BROKER_DIR, f"{key}.json")
+
+
+def lock_path(key):
+    return os.path.join(BROKER_DIR, f"{key}.lock")
+
+
+def key_lock(key):
+    with _key_locks_guard:
+        return _key_locks.setdefault(key, threading.Lock())
+
+
+def read_entry(key, max_age):
+    path = entry_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - entry.get("fetched_at", 0) > max_age:
+        return None
+    return entry
+
+
+def latest_entry(url):
+    """url'nin yaşından bağımsız son başarılı yanıtı (stale yedek); yoksa None."""
+    return read_entry(request_key(url), float("inf"))
+
+
+def store(url, payload):
+    """Broker dışından alınan yanıtı da diğer işler ve stale yedek için yazar."""
+    write_entry(request_key(url), url, payload)
+
+
+def write_entry(key, url, payload):
+    path = entry_path(key)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(BROKER_DIR, exist_ok=True)
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "fetched_at": time.time(), "payload": payload}, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+    except OSError as e:
+        # Windows'ta dosya o anda okunuyorsa replace başarısız olabilir; paylaşım sadece atlanır
+        logger.debug("Broker yanıtı yazılamadı: %s, %s", url, e)
+
+
+def acquire_lock(key):
+    path = lock_path(key)
+    try:
+        os.makedirs(BROKER_DIR, exist_ok=True)
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            if time.time() - os.path.getmtime(path) > LOCK_TIMEOUT:
+                os.remove(path)
+                return acquire_lock(key)
+        except OSError:
+            pass
+        return False
+    except OSError as e:
+        logger.debug("Broker kilidi alınamadı: %s", e)
+        return False
+    with os.fdopen(fd, "w") as f:
+        f.write(f"{os.getpid()} {time.time()}")
+    return True
+
+
+def release_lock(key):
+    try:
+        os.remove(lock_path(key))
+    except OSError:
+        pass
+
+
+def wait_for_peer(key, max_age):
+    """Aynı isteği yapan diğer işin bitmesini bekler; yanıtı yazdıysa onu döndürür."""
+    deadline = time.time() + LOCK_TIMEOUT
+    while os.path.exists(lock_path(key)) and time.time() < deadline:
+        time.sleep(POLL_INTERVAL)
+    return read_entry(key, max_age)
+
+
+def fetch(url, fetch_fn, max_age=FRESHNESS_SECONDS, wait=True):
+    """
+    url için taze (max_age saniyeden yeni) yanıt varsa onu döndürür.
+    Aynı istek başka bir thread'de ya da işte sürüyorsa wait=True iken onun sonucunu bekler;
+    wait=False iken beklemeden PeerPending fırlatır (havuz thread'lerinde kullanılır).
+    Aksi halde fetch_fn() çağrılır ve sonucu diğer işler için yazılır.
+    Hatalar paylaşılmaz; fetch_fn'in fırlattığı hata çağırana aynen iletilir.
+    """
+    key = request_key(url)
+    lock = key_lock(key)
+    if not lock.acquire(blocking=wait):
+        raise PeerPending(url)
+    try:
+        entry = read_entry(key, max_age)
+        if entry:
+            logger.debug("Broker paylaşılan yanıtı kullandı: %s", url)
+            run_ledger.count("broker_hits")
+            return entry["payload"]
+
+        locked = acquire_lock(key)
+        if not locked and not wait:
+            raise PeerPending(url)
+        if not locked:
+            entry = wait_for_peer(key, max_age)
+            if entry:
+                logger.debug("Broker diğer işin yanıtını kullandı: %s", url)
+                run_ledger.count("broker_hits")
+                return entry["payload"]
+            # Diğer iş hata aldıysa istek burada tekrar yapılır
+            locked = acquire_lock(key)
+
+        run_ledger.count("broker_misses")
+        try:
+            payload = fetch_fn()
+            write_entry(key, url, payload)
+            return payload
+        finally:
+            if locked:
+                release_lock(key)
+    finally:
+        lock.release()
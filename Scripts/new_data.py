@@ -3,7 +3,6 @@ import json
 import pandas as pd
 import logging
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 from macarna import mac_lookup
 from functools import lru_cache
@@ -11,6 +10,9 @@ import time
 import io
 import os
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+import endpoint_retry
 
 load_dotenv()
 
@@ -65,40 +67,42 @@ def process_mac_table(mac_table):
         processed_mac_table.setdefault(port, []).append(f"{mac_address} ({vendor})")
     return processed_mac_table
 
-def fetch_device_data(hostname, bearer_token, retry=0):
-    logging.info(f"Cihaz verileri alınıyor: {hostname} (Deneme {retry + 1})")
-    headers = {'Authorization': f'Bearer {bearer_token}', 'Accept': 'application/json'}
-    urls = {
+def device_endpoint_urls(hostname):
+    return {
         'device': f"{netdb_base_url}{hostname}/details?device_type=cisco_ios",
         'interfaces': f"{netdb_base_url}{hostname}/interfaces?device_type=cisco_ios",
         'vlans': f"{netdb_base_url}{hostname}/vlans?device_type=cisco_ios",
         'neighbors': f"{netdb_base_url}{hostname}/neighbors?device_type=cisco_ios",
         'mac_address_table': f"{netdb_base_url}{hostname}/mac-address-table?device_type=cisco_ios"
     }
-    try:
-        responses = {key: requests.get(url, headers=headers, timeout=60) for key, url in urls.items()}
-        if all(response.status_code == 200 for response in responses.values()):
-            logging.info(f"Cihaz verileri başarıyla alındı: {hostname}")
-            return {key: response.json() for key, response in responses.items()}
-        else:
-            logging.error(f"Cihaz veri çekme hatası: {hostname}")
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Cihaz verileri alınırken hata oluştu: {hostname}, {e}")
-    if retry < 2:
-        time.sleep(10 * (retry + 1))
-        return fetch_device_data(hostname, bearer_token, retry + 1)
-    return None
 
 
-def process_device_data(row, bearer_token):
+def fetch_devices_data(hostnames, bearer_token, on_device_done=None, max_workers=10):
+    """Endpoint bazlı retry: sadece başarısız endpoint tekrar denenir, worker'lar beklemede bloklanmaz."""
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers))
+    session.headers.update({'Authorization': f'Bearer {bearer_token}', 'Accept': 'application/json'})
+    jobs = {hostname: device_endpoint_urls(hostname) for hostname in hostnames}
+    with session:
+        return endpoint_retry.fetch_endpoints(
+            jobs,
+            lambda url: endpoint_retry.get_json(session, url, timeout=60),
+            max_workers=max_workers,
+            on_host_done=on_device_done,
+        )
+
+
+def process_device_data(row, fetched):
     hostname = row['hostname']
-    device_data = fetch_device_data(hostname, bearer_token)
-    if not device_data:
+    device_data = fetched['results']
+    if fetched['stale']:
+        logging.warning(f"Önceki veriden kullanılan endpoint'ler: {hostname}, {fetched['stale']}")
+    if 'interfaces' not in device_data:
         logging.warning(f"Veri alınamadı: {hostname}")
         return {hostname: {'status': 'Ulaşılamadı', 'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}}
 
     interfaces_data = device_data['interfaces'].get('results', {})
-    mac_address_table = device_data['mac_address_table'].get('results', [])
+    mac_address_table = device_data.get('mac_address_table', {}).get('results', [])
 
     processed_mac_table = process_mac_table({'results': mac_address_table})
 
@@ -127,10 +131,13 @@ def process_device_data(row, bearer_token):
             'output_packets': interface_details.get('output_packets', '')
         })
 
-    return {hostname: {
+    device_entry = {
         'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         'ports': port_data
-    }}
+    }
+    if fetched['stale']:
+        device_entry['stale_endpoints'] = fetched['stale']
+    return {hostname: device_entry}
 
 def fetch_network_data():
     start_time = time.time()
@@ -146,12 +153,17 @@ def fetch_network_data():
         return
 
     all_data = {}
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_switch = {executor.submit(process_device_data, row, bearer_token): row for _, row in switches.iterrows()}
-        for future in tqdm(as_completed(future_to_switch), total=len(switches), desc="Cihaz verileri işleniyor"):
-            result = future.result()
-            if result:
-                all_data.update(result)
+    rows = {row['hostname']: row for _, row in switches.iterrows()}
+    progress = tqdm(total=len(rows), desc="Cihaz verileri işleniyor")
+
+    def on_device_done(hostname, fetched):
+        progress.update(1)
+        result = process_device_data(rows[hostname], fetched)
+        if result:
+            all_data.update(result)
+
+    fetch_devices_data(list(rows), bearer_token, on_device_done=on_device_done)
+    progress.close()
 
     with open(output_file, 'w') as f:
         json.dump(all_data, f, indent=2)
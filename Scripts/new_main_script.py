@@ -12,6 +12,8 @@ from functools import lru_cache
 from mac_vendor_lookup import MacLookup
 from dotenv import load_dotenv
 
+import netdb_broker
+
 load_dotenv()
 
 # API ve dosya yolları
@@ -74,18 +76,21 @@ def fetch_device_data(hostname, bearer_token, retry=0):
     }
     headers = {'Authorization': f'Bearer {bearer_token}', 'Accept': 'application/json'}
 
+    def get(url):
+        response = requests.get(url, headers=headers, timeout=60 + retry * 30)
+        response.raise_for_status()
+        return response.json()
+
     results = {}
     with ThreadPoolExecutor(max_workers=4) as executor:
-        future_to_url = {executor.submit(requests.get, url, headers=headers, timeout=60 + retry * 30): key for key, url
+        future_to_url = {executor.submit(netdb_broker.fetch, url, lambda url=url: get(url)): key for key, url
                          in urls.items()}
         for future in as_completed(future_to_url):
             key = future_to_url[future]
             try:
-                response = future.result()
-                if response.status_code == 200:
-                    results[key] = response.json()
-                else:
-                    logging.error(f"{key.capitalize()} veri çekme hatası: {hostname}")
+                results[key] = future.result()
+            except requests.exceptions.HTTPError:
+                logging.error(f"{key.capitalize()} veri çekme hatası: {hostname}")
             except requests.exceptions.RequestException as e:
                 logging.error(f"{key.capitalize()} verileri alınırken hata oluştu: {hostname}, {e}")
 
@@ -0,0 +1,171 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+import run_ledger
+
+# 📂 Profil çıktıları log dizininin altında, çalıştırma kimliğiyle yazılır
+PROFILE_DIR = "D:/INTRANET/Netinfo/Logs/Latest_Logs/profiles"
+
+# 📌 Profiling Settings
+PROFILE_FLAG = "--profile"
+PROFILE_ENV = "NETINFO_PROFILE"                 # 1 / cprofile / pyinstrument
+PROFILE_SAMPLE_ENV = "NETINFO_PROFILE_SAMPLE"   # N: zamanlanmış çalıştırmaların ~1/N'i profillenir
+PROFILE_DIR_ENV = "NETINFO_PROFILE_DIR"
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+TRACEMALLOC_FRAMES = 5
+
+
+def requested_mode(argv=None):
+    """
+    Profil istenmiş mi: komut satırında --profile, ortamda NETINFO_PROFILE ya da 1/N örnekleme.
+    --profile argv'den çıkarılır; script'in kendi argüman ayrıştırması etkilenmez.
+    Dönüş: "cprofile" (varsayılan; thread havuzlarını da kapsar), "pyinstrument" (yüklüyse) ya da None
+    """
+    argv = sys.argv if argv is None else argv
+    mode = os.environ.get(PROFILE_ENV, "").strip().lower()
+    if PROFILE_FLAG in argv:
+        argv.remove(PROFILE_FLAG)
+        mode = mode or "1"
+    if not mode or mode == "0":
+        sample = os.environ.get(PROFILE_SAMPLE_ENV, "")
+        if sample.isdigit() and int(sample) > 0 and random.randrange(int(sample)) == 0:
+            mode = "1"
+    if not mode or mode == "0":
+        return None
+    if mode == "pyinstrument" and pyinstrument is not None:
+        return "pyinstrument"
+    return "cprofile"
+
+
+def start_thread_profiles(profiles):
+    """
+    cProfile sadece etkinleştirildiği thread'i ölçer; Python 3.12 öncesinde havuz thread'lerinin
+    (NetDB istekleri, AP parse) her biri için ayrı profil açılır ve sonunda birleştirilir.
+    3.12+ sürümlerinde cProfile sys.monitoring ile tüm thread'leri zaten kapsar.
+    """
+    if sys.version_info >= (3, 12):
+        return
+
+    def start(frame, event, arg):
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        profiles.append(profile)
+        profile.enable()
+
+    threading.setprofile(start)
+
+
+def write_cprofile(profiles, base_path):
+    stats = None
+    for profile in profiles:
+        profile.disable()
+        if stats is None:
+            stats = pstats.Stats(profile)
+        else:
+            stats.add(profile)
+    stats.dump_stats(f"{base_path}.prof")
+
+    text = io.StringIO()
+    stats.stream = text
+    text.write("=== cumulative ===\n")
+    stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+    text.write("\n=== tottime ===\n")
+    stats.sort_stats("tottime").print_stats(TOP_FUNCTIONS)
+    with open(f"{base_path}.profile.txt", "w", encoding="utf-8") as f:
+        f.write(text.getvalue())
+    return [f"{base_path}.prof", f"{base_path}.profile.txt"]
+
+
+def write_pyinstrument(profiler, base_path):
+    with open(f"{base_path}.profile.txt", "w", encoding="utf-8") as f:
+        f.write(profiler.output_text(unicode=True, color=False))
+    with open(f"{base_path}.profile.html", "w", encoding="utf-8") as f:
+        f.write(profiler.output_html())
+    return [f"{base_path}.profile.txt", f"{base_path}.profile.html"]
+
+
+def write_tracemalloc(snapshot, peak, base_path):
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ))
+    lines = [f"peak traced: {peak / 1048576:.1f} MB", ""]
+    for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size / 1024:10.1f} KiB {stat.count:8} blok  {frame.filename}:{frame.lineno}")
+    lines += ["", f"=== traceback (ilk {TOP_ALLOCATIONS // 5}) ==="]
+    for stat in snapshot.statistics("traceback")[:TOP_ALLOCATIONS // 5]:
+        lines.append(f"{stat.size / 1024:.1f} KiB, {stat.count} blok")
+        lines += [f"    {line}" for line in stat.traceback.format()]
+    with open(f"{base_path}.memory.txt", "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return f"{base_path}.memory.txt"
+
+
+@contextmanager
+def profiled(job, mode=None):
+    """
+    Blok istenmişse (bkz. requested_mode) cProfile/pyinstrument ve tracemalloc altında çalışır.
+    run_ledger.job_run içinde kullanılırsa dosyalar çalıştırma kimliğiyle adlandırılır:
+        profiles/<run_id>.profile.txt, .prof / .profile.html, .memory.txt
+    """
+    mode = mode or requested_mode()
+    if not mode:
+        yield None
+        return
+
+    run = run_ledger.current_run()
+    run_id = run["id"] if run else f"{job}-{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}"
+    profile_dir = os.environ.get(PROFILE_DIR_ENV, PROFILE_DIR)
+    base_path = os.path.join(profile_dir, run_id)
+
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    profiles = []
+    if mode == "pyinstrument":
+        # pyinstrument örnekleyici profiler'dır ve sadece ana thread'i izler
+        profiler = pyinstrument.Profiler()
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiles.append(profiler)
+        start_thread_profiles(profiles)
+        profiler.enable()
+
+    try:
+        yield base_path
+    finally:
+        if mode == "pyinstrument":
+            profiler.stop()
+        else:
+            threading.setprofile(None)
+            profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        try:
+            os.makedirs(profile_dir, exist_ok=True)
+            if mode == "pyinstrument":
+                files = write_pyinstrument(profiler, base_path)
+            else:
+                files = write_cprofile(profiles, base_path)
+            files.append(write_tracemalloc(snapshot, peak, base_path))
+            run_ledger.count("profiled")
+            print(f"Profil yazıldı: {', '.join(files)}", file=sys.stderr)
+        except OSError as e:
+            print(f"Profil yazılamadı: {e}", file=sys.stderr)
@@ -0,0 +1,266 @@
+import asyncio
+import ipaddress
+import itertools
+import logging
+import os
+import socket
+import struct
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# 📌 Probe Settings
+PROBE_COUNT = 4                 # Host başına echo sayısı (ping -n 4 ile aynı)
+PROBE_INTERVAL = 0.2            # Aynı hosta ardışık echo'lar arası (saniye)
+PROBE_TIMEOUT = 1.0             # Son echo'dan sonra yanıt bekleme süresi
+SEND_BURST = 64                 # Bu kadar paketten sonra yanıtlar okunur
+RECV_BUFFER = 4 * 1024 * 1024
+TCP_PORTS = (22, 443)           # ICMP kullanılamazsa/yanıt yoksa denenecek portlar
+TCP_TIMEOUT = 1.5
+TCP_CONCURRENCY = 500
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMP6_ECHO_REQUEST = 128
+ICMP6_ECHO_REPLY = 129
+
+
+def checksum(data):
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack("!%dH" % (len(data) // 2), data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def build_echo(family, identifier, sequence, payload):
+    echo_type = ICMP_ECHO_REQUEST if family == socket.AF_INET else ICMP6_ECHO_REQUEST
+    header = struct.pack("!BBHHH", echo_type, 0, 0, identifier, sequence)
+    if family == socket.AF_INET6:
+        # ICMPv6 checksum'ı çekirdek hesaplar
+        return header + payload
+    csum = checksum(header + payload)
+    return struct.pack("!BBHHH", echo_type, 0, csum, identifier, sequence) + payload
+
+
+def parse_echo_reply(family, data):
+    """Echo reply ise (identifier, sequence) döndürür, değilse None."""
+    # Raw IPv4 soketi IP başlığını da verir; datagram soketi vermez
+    if family == socket.AF_INET and len(data) >= 20 and data[0] >> 4 == 4:
+        data = data[(data[0] & 0x0F) * 4:]
+    if len(data) < 8:
+        return None
+    echo_type, _, _, identifier, sequence = struct.unpack("!BBHHH", data[:8])
+    expected = ICMP_ECHO_REPLY if family == socket.AF_INET else ICMP6_ECHO_REPLY
+    return (identifier, sequence) if echo_type == expected else None
+
+
+def open_icmp_socket(family):
+    """
+    Önce yetkisiz datagram ICMP soketi (Linux ping_group_range, macOS), olmazsa raw soket denenir.
+    Hiçbiri açılamazsa None döner ve o ailedeki hostlar TCP ile kontrol edilir.
+    """
+    proto = socket.IPPROTO_ICMP if family == socket.AF_INET else socket.IPPROTO_ICMPV6
+    for sock_type in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+        try:
+            sock = socket.socket(family, sock_type, proto)
+        except (OSError, PermissionError) as e:
+            logger.debug("ICMP socket %s/%s açılamadı: %s", family, sock_type, e)
+            continue
+        sock.setblocking(False)
+        try:
+            # Binlerce yanıt aynı anda gelir; küçük buffer'da paketler düşer
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER)
+        except OSError:
+            pass
+        return sock
+    return None
+
+
+def empty_result(host, method):
+    return {"host": host, "method": method, "sent": 0, "received": 0, "loss": 100.0,
+            "rtt_min": None, "rtt_avg": None, "rtt_max": None}
+
+
+def summarize(result, rtts):
+    result["received"] = len(rtts)
+    if result["sent"]:
+        result["loss"] = round(100.0 * (result["sent"] - len(rtts)) / result["sent"], 1)
+    if rtts:
+        result["rtt_min"] = round(min(rtts), 2)
+        result["rtt_avg"] = round(sum(rtts) / len(rtts), 2)
+        result["rtt_max"] = round(max(rtts), 2)
+    return result
+
+
+class IcmpSweep:
+    """Bir aile (IPv4/IPv6) için tek soket üzerinden tüm hostlara echo gönderir."""
+
+    def __init__(self, sock, family, hosts):
+        self.sock = sock
+        self.family = family
+        self.hosts = hosts
+        self.identifier = os.getpid() & 0xFFFF
+        # Raw soket sistemdeki tüm ICMP trafiğini görür; datagram sokette çekirdek identifier'ı değiştirir
+        self.check_identifier = sock.type == socket.SOCK_RAW
+        self.pending = {}      # sequence -> (host, send_time)
+        self.rtts = {host: [] for host in hosts}
+        self.sent = dict.fromkeys(hosts, 0)
+        self.sequence = itertools.count(1)
+
+    def on_readable(self):
+        while True:
+            try:
+                data, address = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.debug("ICMP recv hatası: %s", e)
+                return
+            received_at = time.perf_counter()
+            reply = parse_echo_reply(self.family, data)
+            if reply is None or (self.check_identifier and reply[0] != self.identifier):
+                continue
+            entry = self.pending.get(reply[1])
+            # Eşleştirme sequence + kaynak adresle yapılır
+            if entry and ipaddress.ip_address(address[0]) == ipaddress.ip_address(entry[0]):
+                del self.pending[reply[1]]
+                self.rtts[entry[0]].append((received_at - entry[1]) * 1000)
+
+    def send(self, host, payload):
+        sequence = next(self.sequence) & 0xFFFF
+        packet = build_echo(self.family, self.identifier, sequence, payload)
+        try:
+            self.sock.sendto(packet, (host, 0) if self.family == socket.AF_INET else (host, 0, 0, 0))
+        except OSError as e:
+            logger.debug("%s için ICMP gönderilemedi: %s", host, e)
+            return
+        self.pending[sequence] = (host, time.perf_counter())
+        self.sent[host] += 1
+
+    async def run(self, count, interval, timeout):
+        loop = asyncio.get_running_loop()
+        loop.add_reader(self.sock.fileno(), self.on_readable)
+        payload = b"netinfo-probe".ljust(32, b"\0")
+        try:
+            for round_no in range(count):
+                round_start = loop.time()
+                for i, host in enumerate(self.hosts, 1):
+                    self.send(host, payload)
+                    if i % SEND_BURST == 0:
+                        await asyncio.sleep(0)
+                if round_no < count - 1:
+                    await asyncio.sleep(max(0.0, interval - (loop.time() - round_start)))
+
+            deadline = loop.time() + timeout
+            while self.pending and loop.time() < deadline:
+                await asyncio.sleep(0.02)
+        finally:
+            loop.remove_reader(self.sock.fileno())
+
+        results = {}
+        for host in self.hosts:
+            result = empty_result(host, "icmp")
+            result["sent"] = self.sent[host]
+            results[host] = summarize(result, self.rtts[host])
+        return results
+
+
+async def tcp_probe(host, ports=TCP_PORTS, timeout=TCP_TIMEOUT, semaphore=None):
+    """
+    TCP bağlantısı ile erişilebilirlik; sadece tamamlanan bağlantı hostu ayakta sayar.
+    Connection refused sayılmaz: yoldaki bir firewall da RST/ICMP unreachable ile reddedebilir.
+    """
+    result = empty_result(host, "tcp")
+    rtts = []
+    async with semaphore or asyncio.Semaphore(1):
+        for port in ports:
+            result["sent"] += 1
+            started = time.perf_counter()
+            try:
+                _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+                rtts.append((time.perf_counter() - started) * 1000)
+                writer.close()
+                result["port"] = port
+                break
+            except (asyncio.TimeoutError, OSError):
+                continue
+    summarize(result, rtts)
+    # Tek başarılı bağlantı hostun erişilebilir olduğunu gösterir
+    result["loss"] = 0.0 if rtts else 100.0
+    return result
+
+
+def host_family(host):
+    try:
+        return socket.AF_INET6 if ipaddress.ip_address(host).version == 6 else socket.AF_INET
+    except ValueError:
+        return None
+
+
+async def probe_hosts_async(hosts, count=PROBE_COUNT, interval=PROBE_INTERVAL, timeout=PROBE_TIMEOUT,
+                            tcp_fallback=True, tcp_ports=TCP_PORTS):
+    hosts = list(dict.fromkeys(hosts))
+    results = {}
+    by_family = {socket.AF_INET: [], socket.AF_INET6: []}
+    tcp_hosts = []
+
+    for host in hosts:
+        family = host_family(host)
+        if family is None:
+            tcp_hosts.append(host)      # Hostname: ICMP için çözümleme yapılmaz, TCP bağlantısı çözer
+        else:
+            by_family[family].append(host)
+
+    sockets = []
+    sweeps = []
+    for family, family_hosts in by_family.items():
+        if not family_hosts:
+            continue
+        sock = open_icmp_socket(family)
+        if sock is None:
+            logger.warning("ICMP soketi açılamadı, %d host TCP ile kontrol edilecek.", len(family_hosts))
+            tcp_hosts.extend(family_hosts)
+            continue
+        sockets.append(sock)
+        sweeps.append(IcmpSweep(sock, family, family_hosts).run(count, interval, timeout))
+
+    try:
+        for sweep_results in await asyncio.gather(*sweeps):
+            results.update(sweep_results)
+    finally:
+        for sock in sockets:
+            sock.close()
+
+    # ICMP'ye hiç yanıt vermeyenler (filtreli olabilir) TCP ile tekrar denenir
+    if tcp_fallback:
+        tcp_hosts.extend(h for h, r in results.items() if not r["received"])
+    if tcp_hosts:
+        semaphore = asyncio.Semaphore(TCP_CONCURRENCY)
+        tcp_results = await asyncio.gather(*(tcp_probe(h, tcp_ports, semaphore=semaphore) for h in tcp_hosts))
+        for result in tcp_results:
+            if result["received"] or result["host"] not in results:
+                results[result["host"]] = result
+
+    return results
+
+
+def probe_hosts(hosts, **kwargs):
+    """Senkron giriş noktası: {host: {method, sent, received, loss, rtt_min, rtt_avg, rtt_max}}"""
+    # Windows'taki Proactor loop add_reader desteklemez
+    loop = asyncio.SelectorEventLoop() if sys.platform == "win32" else asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(probe_hosts_async(hosts, **kwargs))
+    finally:
+        loop.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    targets = sys.argv[1:] or ["127.0.0.1"]
+    started = time.perf_counter()
+    for host, res in probe_hosts(targets).items():
+        print(host, res)
+    print(f"{len(targets)} host {time.perf_counter() - started:.2f} sn")
@@ -11,6 +11,9 @@ import time
 from cryptography.fernet import Fernet
 from dotenv import load_dotenv
 
+import profiling
+import run_ledger
+
 load_dotenv()
 
 SSL_VERIFY = os.environ.get("SSL_CERT_PATH", True)
@@ -21,8 +24,9 @@ KEY_FILE = "D:/INTRANET/Netinfo/Config/secret.key"
 LOG_DIR = "D:/INTRANET/Netinfo/Logs/Latest_Logs"
 
 # API and input/output paths
-NETDB_AUTH_URL = "https://network-api.npe.fedex.com/v1/authorize"
-NETDB_BASE_URL = "https://network-api.npe.fedex.com/v1/device/"
+NETDB_API_URL = os.environ.get("NETDB_API_URL", "https://network-api.npe.fedex.com/v1").rstrip("/")  # Yerel test: fake_api_server.py
+NETDB_AUTH_URL = f"{NETDB_API_URL}/authorize"
+NETDB_BASE_URL = f"{NETDB_API_URL}/device/"
 INPUT_FILE = "D:/INTRANET/Netinfo/Data/network_device_inventory.json"
 OUTPUT_JSON_FILE = "D:/INTRANET/Netinfo/Data/main_router_data.json"
 OUTPUT_EXCEL_FILE = "D:/INTRANET/Netinfo/Data/main_router_data.xlsx"
@@ -92,7 +96,8 @@ def get_netdb_bearer_token():
 
     for attempt in range(3):
         try:
-            response = requests.post(NETDB_AUTH_URL, data=auth_data, headers=headers, timeout=60)
+            with run_ledger.timed_request(NETDB_AUTH_URL) as call:
+                response = call["response"] = requests.post(NETDB_AUTH_URL, data=auth_data, headers=headers, timeout=60)
             response.raise_for_status()
             token = response.json().get("access_token")
             if token:
@@ -121,7 +126,8 @@ def fetch_device_data(hostname, bearer_token, max_retries=3):
         for attempt in range(max_retries):
             try:
                 log_message("info", f"Attempt {attempt + 1} for {key} data: {url}")
-                response = requests.get(url, headers=headers, timeout=30, verify=SSL_VERIFY)
+                with run_ledger.timed_request(url) as call:
+                    response = call["response"] = requests.get(url, headers=headers, timeout=30, verify=SSL_VERIFY)
                 response.raise_for_status()
                 results[key] = response.json().get('results', {})
                 break  # Break out of the retry loop on success
@@ -169,10 +175,12 @@ def fetch_network_data():
     # Router modellerine göre filtreleme
     df_routers = [device for device in data if any(rt in device.get('model', '') for rt in ROUTER_MODELS)]
 
-    bearer_token = get_netdb_bearer_token()
+    with run_ledger.stage("auth"):
+        bearer_token = get_netdb_bearer_token()
     all_data = []
     failed_devices = []  # Datası alınamayan cihazları tutacak liste
 
+    fetch_start = time.perf_counter()
     with ThreadPoolExecutor(max_workers=3) as executor:
         future_to_device = {
             executor.submit(process_device_data, row, bearer_token): row
@@ -189,6 +197,9 @@ def fetch_network_data():
                 row = future_to_device[future]
                 failed_devices.append(row['hostname'])
                 log_message("error", f"Error processing device {row['hostname']}: {e}")
+    run_ledger.add_stage("fetch", time.perf_counter() - fetch_start)
+    run_ledger.count("devices", len(all_data))
+    run_ledger.record_failure("device", len(failed_devices))
 
     # Çalışma sonunda alınamayan cihazları logla
     if failed_devices:
@@ -197,8 +208,10 @@ def fetch_network_data():
         log_message("info", "All device data fetched successfully.")
 
     # Sonuçları dosyalara yaz
-    with open(OUTPUT_JSON_FILE, 'w', encoding='utf-8') as f:
-        json.dump(all_data, f, indent=2)
+    with run_ledger.stage("write"):
+        with open(OUTPUT_JSON_FILE, 'w', encoding='utf-8') as f:
+            json.dump(all_data, f, indent=2)
+    run_ledger.record_write(OUTPUT_JSON_FILE)
 
     # Excel yerine JSON çıktısını güncelledik
     log_message("info", "Network data fetch complete.")
@@ -211,4 +224,6 @@ def read_json_file(file_path):
         return json.load(file)
 
 if __name__ == "__main__":
-    fetch_network_data()
+    with run_ledger.job_run("router_ports"):
+        with profiling.profiled("router_ports"):
+            fetch_network_data()
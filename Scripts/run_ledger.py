@@ -0,0 +1,417 @@
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlsplit
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 📂 Tüm işlerin çalışma kayıtları (iş başına her çalıştırma tek satır)
+LEDGER_DB = "D:/INTRANET/Netinfo/Data/run_ledger.db"
+
+# 📌 Ledger Settings
+KEEP_DAYS = 90
+RUN_ID_ENV = "NETINFO_RUN_ID"      # Alt process'ler (ör. switch_ports worker'ları) üst işin kimliğini buradan alır
+# Ledger'ı görmeyen hostlardaki işler satırı exporter'a da gönderir (ör. http://sch-host:9108/push)
+PUSH_URL_ENV = "METRICS_PUSH_URL"
+PUSH_TOKEN_ENV = "METRICS_PUSH_TOKEN"  # Exporter'daki ile aynı paylaşılan token (localhost dışından push için)
+PUSH_TIMEOUT = 3
+STAGES = ("auth", "fetch", "parse", "enrich", "write")
+# İstek süresi histogram sınırları (saniye); son kova bunların üstündeki istekleri sayar
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    job TEXT NOT NULL,
+    parent TEXT,
+    host TEXT,
+    pid INTEGER,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    duration REAL,
+    status TEXT,
+    error TEXT,
+    peak_rss INTEGER,
+    bytes_read INTEGER,
+    bytes_written INTEGER,
+    requests INTEGER,
+    failures INTEGER,
+    stages TEXT,
+    endpoints TEXT,
+    counters TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_job_time ON runs (job, started_at);
+"""
+
+# Süreç başına tek aktif çalıştırma; kayıt fonksiyonları aktif çalıştırma yoksa hiçbir şey yapmaz
+_run = None
+_lock = threading.Lock()
+
+
+def connect(db_path=LEDGER_DB):
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def current_run():
+    return _run
+
+
+def start_run(job, now=None):
+    """İşin çalıştırma kaydını başlatır; sonraki stage/istek/sayaç kayıtları bu kayda eklenir."""
+    global _run
+    now = now or time.time()
+    run_id = f"{job}-{time.strftime('%Y%m%d%H%M%S', time.localtime(now))}-{os.getpid()}"
+    _run = {
+        "id": run_id,
+        "job": job,
+        "parent": os.environ.get(RUN_ID_ENV),
+        "host": socket.gethostname(),
+        "pid": os.getpid(),
+        "started_at": now,
+        "clock": time.perf_counter(),
+        "bytes_read": 0,
+        "bytes_written": 0,
+        "stages": {},
+        "endpoints": {},
+        "counters": {},
+        "failures": {},
+    }
+    os.environ[RUN_ID_ENV] = run_id
+    return _run
+
+
+def add_stage(name, seconds):
+    """
+    Stage'e (auth, fetch, parse, enrich, write) süre ekler.
+    Aynı stage birden çok kez (ör. her cihaz için parse) ya da thread'lerde çalışabilir;
+    süreler toplanır. Stage'ler iç içe olabilir; fetch süresi içindeki parse'ı da kapsar.
+    """
+    if _run is None:
+        return
+    with _lock:
+        entry = _run["stages"].setdefault(name, {"seconds": 0.0, "calls": 0})
+        entry["seconds"] += seconds
+        entry["calls"] += 1
+
+
+@contextmanager
+def stage(name):
+    """Bloğun süresini stage'e ekler."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_stage(name, time.perf_counter() - start)
+
+
+def endpoint_name(url):
+    """
+    URL'yi cihazdan bağımsız endpoint adına indirger:
+    .../device/<hostname>/interfaces?... -> netdb/interfaces, .../api/v2.1/cdt_port/... -> statseeker/cdt_port
+    """
+    parts = [part for part in urlsplit(url).path.split("/") if part]
+    if "device" in parts:
+        rest = parts[parts.index("device") + 1:]
+        return "netdb/" + ("/".join(rest[1:]) or "device")
+    if "tshoot" in parts:
+        return "netdb/" + "/".join(parts[parts.index("tshoot"):])
+    if parts[-1:] == ["authorize"]:
+        return "netdb/authorize"
+    if "api" in parts and len(parts) > parts.index("api") + 2:
+        return "statseeker/" + parts[parts.index("api") + 2]
+    return "/".join(parts[-2:]) or urlsplit(url).netloc
+
+
+def record_request(endpoint, seconds, status=None, nbytes=0):
+    """
+    Tek upstream isteğini endpoint'in sayaç ve süre histogramına ekler.
+    status: HTTP kodu; bağlantı hatası/zaman aşımında None
+    """
+    if _run is None:
+        return
+    bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+    with _lock:
+        entry = _run["endpoints"].get(endpoint)
+        if entry is None:
+            entry = _run["endpoints"][endpoint] = {
+                "count": 0, "errors": 0, "seconds": 0.0, "max": 0.0, "bytes": 0,
+                "buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+            }
+        entry["count"] += 1
+        entry["seconds"] += seconds
+        entry["max"] = max(entry["max"], seconds)
+        entry["bytes"] += nbytes
+        entry["buckets"][bucket] += 1
+        if status is None or status >= 400:
+            entry["errors"] += 1
+            key = str(status or "connection")
+            statuses = entry.setdefault("status", {})
+            statuses[key] = statuses.get(key, 0) + 1
+        _run["bytes_read"] += nbytes
+
+
+@contextmanager
+def timed_request(url):
+    """
+    requests çağrısını sarar: with timed_request(url) as call: call["response"] = session.get(...)
+    Yanıt atanmadan çıkılırsa (istisna) bağlantı hatası olarak sayılır.
+    """
+    call = {"response": None}
+    start = time.perf_counter()
+    try:
+        yield call
+    finally:
+        response = call["response"]
+        record_request(
+            endpoint_name(url),
+            time.perf_counter() - start,
+            response.status_code if response is not None else None,
+            len(response.content) if response is not None else 0,
+        )
+
+
+def count(name, n=1):
+    if _run is None:
+        return
+    with _lock:
+        _run["counters"][name] = _run["counters"].get(name, 0) + n
+
+
+def record_failure(kind, n=1):
+    """Cihaz, dosya, stage vb. başarısızlıklar; türüne göre sayılır."""
+    if _run is None or not n:
+        return
+    with _lock:
+        _run["failures"][kind] = _run["failures"].get(kind, 0) + n
+
+
+def record_read(path):
+    if _run is None:
+        return
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return
+    with _lock:
+        _run["bytes_read"] += size
+
+
+def record_write(path):
+    if _run is None:
+        return
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return
+    with _lock:
+        _run["bytes_written"] += size
+
+
+def peak_rss():
+    """Process'in en yüksek bellek kullanımı (byte); ölçülemezse None."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    if psutil is not None:
+        # Windows'ta resource yok; peak_wset process ömrü boyunca en yüksek working set'tir
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", None) or info.rss
+    return None
+
+
+def finish_run(status="ok", error=None, db_path=LEDGER_DB):
+    """
+    Aktif çalıştırmayı kapatır ve ledger'a yazar.
+    Ledger yazılamazsa iş başarısız sayılmaz; kayıt sadece kaybolur.
+    Dönüş: ledger satırı (dict)
+    """
+    global _run
+    run, _run = _run, None
+    if run is None:
+        return None
+
+    row = {
+        "id": run["id"],
+        "job": run["job"],
+        "parent": run["parent"],
+        "host": run["host"],
+        "pid": run["pid"],
+        "started_at": run["started_at"],
+        "finished_at": time.time(),
+        "duration": round(time.perf_counter() - run["clock"], 3),
+        "status": status,
+        "error": str(error)[:500] if error else None,
+        "peak_rss": peak_rss(),
+        "bytes_read": run["bytes_read"],
+        "bytes_written": run["bytes_written"],
+        "requests": sum(entry["count"] for entry in run["endpoints"].values()),
+        "failures": sum(run["failures"].values()),
+        "stages": {name: {"seconds": round(entry["seconds"], 3), "calls": entry["calls"]}
+                   for name, entry in run["stages"].items()},
+        "endpoints": {name: dict(entry, seconds=round(entry["seconds"], 3), max=round(entry["max"], 3))
+                      for name, entry in run["endpoints"].items()},
+        "counters": dict(run["counters"], failures=run["failures"]) if run["failures"] else run["counters"],
+    }
+    try:
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = connect(db_path)
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (row["id"], row["job"], row["parent"], row["host"], row["pid"], row["started_at"],
+                 row["finished_at"], row["duration"], row["status"], row["error"], row["peak_rss"],
+                 row["bytes_read"], row["bytes_written"], row["requests"], row["failures"],
+                 json.dumps(row["stages"]), json.dumps(row["endpoints"]), json.dumps(row["counters"])),
+            )
+            conn.execute("DELETE FROM runs WHERE started_at < ?", (row["finished_at"] - KEEP_DAYS * 86400,))
+        finally:
+            conn.close()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Run ledger yazılamadı: {e}", file=sys.stderr)
+    push_run(row)
+    return row
+
+
+def push_run(row, url=None):
+    """Ledger satırını metrics_exporter'ın /push adresine gönderir; adres tanımlı değilse bir şey yapmaz."""
+    url = url or os.environ.get(PUSH_URL_ENV)
+    if not url:
+        return
+    headers = {"Content-Type": "application/json"}
+    token = os.environ.get(PUSH_TOKEN_ENV)
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    request = urllib.request.Request(url, data=json.dumps(row).encode("utf-8"), headers=headers, method="POST")
+    try:
+        urllib.request.urlopen(request, timeout=PUSH_TIMEOUT).close()
+    except (OSError, ValueError) as e:
+        print(f"Run ledger satırı gönderilemedi: {e}", file=sys.stderr)
+
+
+@contextmanager
+def job_run(job):
+    """
+    İşin ana akışını sarar: with run_ledger.job_run("switch_ports"): fetch_network_data()
+    İstisna ledger'a "failed" (Ctrl+C/sonlandırmada "interrupted") olarak yazılır ve tekrar fırlatılır.
+    """
+    start_run(job)
+    try:
+        yield current_run()
+    except BaseException as e:
+        finish_run("failed" if isinstance(e, Exception) else "interrupted", error=str(e) or type(e).__name__)
+        raise
+    finish_run()
+
+
+def query_runs(job=None, since=None, until=None, limit=50, db_path=LEDGER_DB):
+    """
+    Ledger'daki çalıştırmalar, yeniden eskiye.
+    since/until: epoch saniye
+    """
+    clauses, params = [], []
+    if job:
+        clauses.append("job = ?")
+        params.append(job)
+    if since:
+        clauses.append("started_at >= ?")
+        params.append(since)
+    if until:
+        clauses.append("started_at < ?")
+        params.append(until)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(f"SELECT * FROM runs {where} ORDER BY started_at DESC LIMIT ?", (*params, limit)).fetchall()
+    finally:
+        conn.close()
+    runs = []
+    for row in rows:
+        run = dict(row)
+        for field in ("stages", "endpoints", "counters"):
+            run[field] = json.loads(run[field] or "{}")
+        runs.append(run)
+    return runs
+
+
+def parse_time(value):
+    """'2025-03-01', '2025-03-01 14:00' ya da '30m'/'6h'/'2d' (şu andan geriye)."""
+    units = {"m": 60, "h": 3600, "d": 86400}
+    if value[-1:] in units and value[:-1].isdigit():
+        return time.time() - int(value[:-1]) * units[value[-1]]
+    return datetime.fromisoformat(value).timestamp()
+
+
+def print_runs(runs):
+    stage_names = list(STAGES)
+    for run in runs:
+        for name in run["stages"]:
+            if name not in stage_names:
+                stage_names.append(name)
+    stage_names = [name for name in stage_names if any(name in run["stages"] for run in runs)]
+    header = f"{'başlangıç':<19} {'iş':<22} {'durum':<7} {'süre':>8} " + \
+             " ".join(f"{name:>8}" for name in stage_names) + f" {'istek':>7} {'hata':>5} {'peak MB':>8}"
+    print(header)
+    for run in runs:
+        started = datetime.fromtimestamp(run["started_at"]).strftime("%Y-%m-%d %H:%M:%S")
+        stages = " ".join(
+            f"{run['stages'][name]['seconds']:>8.1f}" if name in run["stages"] else f"{'-':>8}" for name in stage_names
+        )
+        rss = f"{run['peak_rss'] / 1048576:.0f}" if run["peak_rss"] else "-"
+        print(f"{started:<19} {run['job']:<22} {run['status'] or '-':<7} {run['duration'] or 0:>8.1f} {stages} "
+              f"{run['requests'] or 0:>7} {run['failures'] or 0:>5} {rss:>8}")
+
+
+def print_endpoints(run):
+    print(f"\n{run['id']} endpoint'leri:")
+    for name, entry in sorted(run["endpoints"].items(), key=lambda item: -item[1]["seconds"]):
+        average = entry["seconds"] / entry["count"] if entry["count"] else 0
+        print(f"  {name:<32} {entry['count']:>6} istek  ort {average:6.2f} sn  max {entry['max']:6.2f} sn  "
+              f"{entry['errors']:>4} hata  {entry['bytes'] / 1048576:8.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="İş çalıştırma kayıtlarını listeler.")
+    parser.add_argument("job", nargs="?", help="Sadece bu işin kayıtları (ör. switch_ports)")
+    parser.add_argument("--since", help="Başlangıç: '2025-03-01', '2025-03-01 14:00', '30m', '6h' ya da '2d'")
+    parser.add_argument("--until", help="Bitiş (since ile aynı biçim)")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--endpoints", action="store_true", help="Her çalıştırmanın endpoint istatistiklerini de yazar")
+    parser.add_argument("--json", action="store_true", help="Kayıtları JSON olarak yazar")
+    parser.add_argument("--db", default=LEDGER_DB)
+    args = parser.parse_args()
+
+    runs = query_runs(
+        args.job,
+        since=parse_time(args.since) if args.since else None,
+        until=parse_time(args.until) if args.until else None,
+        limit=args.limit,
+        db_path=args.db,
+    )
+    if args.json:
+        print(json.dumps(runs, indent=2, ensure_ascii=False))
+    elif not runs:
+        print("Kayıt bulunamadı.")
+    else:
+        print_runs(runs)
+        if args.endpoints:
+            for run in runs:
+                print_endpoints(run)
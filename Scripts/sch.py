@@ -10,9 +10,21 @@ import logging
 from datetime import datetime
 import pytz  # TR saatine göre zamanlama için eklendi
 
+import metrics_exporter
+import profiling
+
 # 📌 Türkiye saat dilimi
 TR_TIMEZONE = pytz.timezone("Europe/Istanbul")
 
+# 📌 switch_ports worker sayısı (0: tek process, >0: cihazlar kuyruk üzerinden worker'lara dağıtılır)
+SWITCH_PORTS_WORKERS = 0
+
+# 📌 Saatlik özet maili (False: kapalı; anlık durum mailleri zaten gönderiliyor, özet onların tekrarıdır)
+MAIL_DIGEST_ENABLED = False
+
+# 📌 Zamanlanmış çalıştırmaların yaklaşık 1/N'i profillenir (0: kapalı); çıktılar Latest_Logs/profiles altında
+PROFILE_SAMPLE_EVERY = 0
+
 # 📌 Log dizini ve dosya ayarları
 LOG_DIR = "D:/INTRANET/Netinfo/Logs/Latest_Logs"
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -87,19 +99,25 @@ class NetinfoService(win32serviceutil.ServiceFramework):
         log_message("✅ Service Started.")
         self.main()
 
-    def run_script(self, script_path):
+    def run_script(self, script_path, *args):
         """Python script çalıştır ve sonucu logla"""
         script_name = os.path.basename(script_path)
         log_message(f"🔵 JOB BAŞLADI: {script_name}")
+        metrics_exporter.job_started(script_name)
+        start_time = time.time()
+        ok = False
 
         try:
-            result = subprocess.run(["python", script_path], capture_output=True, text=True)
-            if result.returncode == 0:
+            result = subprocess.run(["python", script_path, *args], capture_output=True, text=True)
+            ok = result.returncode == 0
+            if ok:
                 log_message(f"✅ JOB BAŞARIYLA TAMAMLANDI: {script_name}")
             else:
                 log_message(f"❌ JOB HATA VERDİ: {script_name}\nHata: {result.stderr.strip()}")
         except Exception as e:
             log_message(f"❌ JOB ÇALIŞTIRILAMADI: {script_name}\nHata: {e}")
+        finally:
+            metrics_exporter.job_finished(script_name, time.time() - start_time, ok)
 
     def statseeker_task(self):
         """Statseeker verisini her 2 dakikada bir çalıştır."""
@@ -109,10 +127,11 @@ class NetinfoService(win32serviceutil.ServiceFramework):
         """Switch Ports scripti 07:00 - 20:00 arasında çalıştırılır."""
         now = datetime.now(TR_TIMEZONE)
         if 1 <= now.hour < 23 and not self.router_ports_running:
-            self.run_script("D:/INTRANET/Netinfo/Scripts/switch_ports.py")
+            args = ["--workers", str(SWITCH_PORTS_WORKERS)] if SWITCH_PORTS_WORKERS else []
+            self.run_script("D:/INTRANET/Netinfo/Scripts/switch_ports.py", *args)
 
     def ap_data_task(self):
-        """AP data scripti her 15 dakikada bir çalıştırılır."""
+        """AP data scripti her 5 dakikada bir çalışır; NetDB'ye sadece zamanı gelen AP'ler sorulur."""
         self.run_script("D:/INTRANET/Netinfo/Scripts/ap_data.py")
 
     def router_ports_task(self):
@@ -129,13 +148,27 @@ class NetinfoService(win32serviceutil.ServiceFramework):
         """Mail kontrol scripti dakikada bir çalıştırılır, sadece hata alırsa loglanır."""
         script_path = "D:/INTRANET/Netinfo/Scripts/mail_sender.py"
         script_name = os.path.basename(script_path)
+        metrics_exporter.job_started(script_name)
+        start_time = time.time()
+        ok = False
 
         try:
             result = subprocess.run(["python", script_path], capture_output=True, text=True)
-            if result.returncode != 0:
+            ok = result.returncode == 0
+            if not ok:
                 log_message(f"❌ JOB HATA VERDİ: {script_name}\nHata: {result.stderr.strip()}")
         except Exception as e:
             log_message(f"❌ JOB ÇALIŞTIRILAMADI: {script_name}\nHata: {e}")
+        finally:
+            metrics_exporter.job_finished(script_name, time.time() - start_time, ok)
+
+    def snmp_poller_task(self):
+        """Envanterdeki tüm cihazlardan SNMP arayüz ve ortam sayaçlarını toplar."""
+        self.run_script("D:/INTRANET/Netinfo/Scripts/snmp_poller.py")
+
+    def mail_digest_task(self):
+        """Son bir saatin durum değişikliklerini tek özet mail olarak gönderir."""
+        self.run_script("D:/INTRANET/Netinfo/Scripts/mail_sender.py", "--digest")
 
     def syslog_task(self):
         """Saat başı syslog verisini çekip analiz eder - OPTIMIZE EDİLDİ"""
@@ -164,14 +197,17 @@ class NetinfoService(win32serviceutil.ServiceFramework):
 
         # 🔄 TEMEL GÖREVLER
         schedule.every(2).minutes.do(self.statseeker_task)  # Her 2 dakika - cihaz durumu
-        schedule.every(10).minutes.do(self.switch_ports_task)  # Her 10 dakika - switch portları
-        schedule.every(15).minutes.do(self.ap_data_task)  # Her 15 dakika - ap data
+        schedule.every(5).minutes.do(self.switch_ports_task)  # Her 5 dakika - sadece zamanı gelen switch'ler
+        schedule.every(5).minutes.do(self.ap_data_task)  # Her 5 dakika - sadece zamanı gelen AP'ler
         schedule.every(1).minutes.do(self.mail_sender_task)  # Her dakika - mail kontrolü
+        schedule.every(5).minutes.do(self.snmp_poller_task)  # Her 5 dakika - SNMP sayaçları
 
         # 🕐 SAATLIK GÖREVLER
         schedule.every().hour.at(":00").do(self.syslog_task)  # Saat başı - syslog çek
         schedule.every().hour.at(":05").do(self.syslog_metrics_task)  # 5 dakika sonra - metrik analiz
         schedule.every().hour.at(":10").do(self.insight_task)  # 10 dakika sonra - içgörü
+        if MAIL_DIGEST_ENABLED:
+            schedule.every().hour.at(":15").do(self.mail_digest_task)  # Saat başı özet maili
 
         # 📅 GÜNLÜK GÖREVLER
         schedule.every().day.at("00:05").do(self.router_ports_task)  # Gece 00:05 - router portları
@@ -181,6 +217,18 @@ class NetinfoService(win32serviceutil.ServiceFramework):
         # 📌 Servis başlarken tüm job'ları log'la
         log_scheduled_jobs()
 
+        # 🔬 Örneklemeli profil: script'ler ortamdan okur
+        if PROFILE_SAMPLE_EVERY:
+            os.environ[profiling.PROFILE_SAMPLE_ENV] = str(PROFILE_SAMPLE_EVERY)
+            log_message(f"🔬 Zamanlanmış çalıştırmaların ~1/{PROFILE_SAMPLE_EVERY}'i profillenecek.")
+
+        # 📊 Prometheus metrikleri: http://<host>:METRICS_PORT/metrics
+        try:
+            metrics_exporter.start_server()
+            log_message(f"📊 Metrics exporter başlatıldı: port {metrics_exporter.METRICS_PORT}")
+        except OSError as e:
+            log_message(f"❌ Metrics exporter başlatılamadı: {e}")
+
         # 📌 Her 6 saatte bir job listesini yeniden log'la
         schedule.every(6).hours.do(log_scheduled_jobs)
 
@@ -0,0 +1,297 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from pysnmp.hlapi.asyncio import (
+    CommunityData,
+    ContextData,
+    ObjectIdentity,
+    ObjectType,
+    SnmpEngine,
+    UdpTransportTarget,
+    bulk_cmd,
+    get_cmd,
+)
+from pysnmp.proto import rfc1905
+
+# 📂 Dosya yolları
+DATA_DIR = "D:/INTRANET/Netinfo/Data"
+INVENTORY_FILE = f"{DATA_DIR}/network_device_inventory.json"
+COMMUNITY_CACHE_FILE = f"{DATA_DIR}/snmp_community_cache.json"
+OUTPUT_FILE = f"{DATA_DIR}/snmp_metrics.json"
+LOG_FILE = "D:/INTRANET/Netinfo/Logs/Latest_Logs/snmp_poller.log"
+
+# 📌 SNMP Settings
+COMMUNITIES = ["public", "private", "snmp_read"]   # co2.py ile aynı deneme sırası
+SNMP_PORT = 161
+SNMP_TIMEOUT = 2
+SNMP_RETRIES = 1
+MAX_CONCURRENCY = 64          # Aynı anda sorgulanan cihaz sayısı
+MAX_REPETITIONS = 25          # GETBULK başına kolon başına satır
+
+# 📌 OID'ler
+SCALAR_OIDS = {
+    "sys_uptime": "1.3.6.1.2.1.1.3.0",
+    "sys_name": "1.3.6.1.2.1.1.5.0",
+}
+
+INTERFACE_COLUMNS = {
+    "name": "1.3.6.1.2.1.31.1.1.1.1",          # ifName
+    "oper_status": "1.3.6.1.2.1.2.2.1.8",      # ifOperStatus
+    "in_octets": "1.3.6.1.2.1.31.1.1.1.6",     # ifHCInOctets
+    "out_octets": "1.3.6.1.2.1.31.1.1.1.10",   # ifHCOutOctets
+    "in_errors": "1.3.6.1.2.1.2.2.1.14",       # ifInErrors
+    "out_errors": "1.3.6.1.2.1.2.2.1.20",      # ifOutErrors
+}
+
+ENVIRONMENT_COLUMNS = {
+    "cpu_5min": "1.3.6.1.4.1.9.9.109.1.1.1.1.8",          # cpmCPUTotal5minRev
+    "temperature": "1.3.6.1.4.1.9.9.13.1.3.1.3",          # ciscoEnvMonTemperatureStatusValue
+    "fan_state": "1.3.6.1.4.1.9.9.13.1.4.1.3",            # ciscoEnvMonFanState
+    "power_state": "1.3.6.1.4.1.9.9.13.1.5.1.3",          # ciscoEnvMonSupplyState
+}
+
+# GETBULK yanıtındaki noSuchObject / noSuchInstance / endOfMibView
+EXCEPTION_TAGS = {rfc1905.noSuchObject.tagSet, rfc1905.noSuchInstance.tagSet, rfc1905.endOfMibView.tagSet}
+
+
+# 📌 Logging
+def log_message(level, message):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    log_entry = f"{timestamp} [{level}] {message}"
+    print(log_entry)
+    try:
+        with open(LOG_FILE, "a", encoding="utf-8") as f:
+            f.write(log_entry + "\n")
+    except OSError:
+        pass
+
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(path, data):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def load_inventory():
+    devices = load_json(INVENTORY_FILE, [])
+    return [d for d in devices if d.get("ipaddress") and d.get("hostname")]
+
+
+def to_value(value):
+    """pysnmp tiplerini JSON'a yazılabilir değere çevirir."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value.prettyPrint()
+
+
+class SnmpPoller:
+    """Tek SnmpEngine ile tüm cihazları sınırlı eşzamanlılıkla sorgular."""
+
+    def __init__(self, communities=None, community_cache=None, concurrency=MAX_CONCURRENCY,
+                 port=SNMP_PORT, timeout=SNMP_TIMEOUT, retries=SNMP_RETRIES):
+        self.engine = SnmpEngine()
+        self.context = ContextData()
+        self.communities = communities or COMMUNITIES
+        self.community_cache = community_cache if community_cache is not None else {}
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+
+    async def target(self, ip):
+        return await UdpTransportTarget.create((ip, self.port), timeout=self.timeout, retries=self.retries)
+
+    async def get(self, auth, target, oids):
+        """Tek istekte birden fazla scalar OID (multi-OID GET)."""
+        error_indication, error_status, _, var_binds = await get_cmd(
+            self.engine, auth, target, self.context,
+            *[ObjectType(ObjectIdentity(oid)) for oid in oids],
+            lookupMib=False,
+        )
+        if error_indication or error_status:
+            raise RuntimeError(str(error_indication or error_status.prettyPrint()))
+        return {str(name): value for name, value in var_binds}
+
+    async def walk_columns(self, auth, target, columns):
+        """
+        Birden fazla tablo kolonunu aynı GETBULK isteklerinde yürür.
+        Kolonlardan biri alt ağacından çıktığında sonraki isteklerden düşülür.
+        Dönüş: {kolon_oid: {index: value}}
+        """
+        tables = {column: {} for column in columns}
+        cursors = {column: column for column in columns}
+
+        while cursors:
+            active = list(cursors)
+            error_indication, error_status, _, var_binds = await bulk_cmd(
+                self.engine, auth, target, self.context, 0, MAX_REPETITIONS,
+                *[ObjectType(ObjectIdentity(cursors[column])) for column in active],
+                lookupMib=False,
+            )
+            if error_indication or error_status:
+                raise RuntimeError(str(error_indication or error_status.prettyPrint()))
+
+            # Eski pysnmp satır tablosu, yenisi düz liste döndürür; yanıt kolon sırasıyla iç içedir
+            flat = [vb for row in var_binds for vb in row] if var_binds and isinstance(var_binds[0], list) else list(var_binds)
+            if not flat:
+                break
+
+            finished = set()
+            advanced = False
+            for position, (name, value) in enumerate(flat):
+                column = active[position % len(active)]
+                if column in finished:
+                    continue
+                oid = str(name)
+                if not oid.startswith(column + ".") or value.tagSet in EXCEPTION_TAGS:
+                    finished.add(column)
+                    continue
+                if oid_key(oid) <= oid_key(cursors[column]):
+                    # OID ilerlemiyor (hatalı ajan); sonsuz döngüye girmemek için kolon burada kesilir
+                    finished.add(column)
+                    continue
+                tables[column][oid[len(column) + 1:]] = to_value(value)
+                cursors[column] = oid
+                advanced = True
+
+            for column in finished:
+                cursors.pop(column, None)
+            # Kısa yanıt tablonun bittiği anlamına gelmez; ajan yanıtı mesaj boyutuna göre kesebilir (RFC 3416 4.2.3).
+            # Kolonlar alt ağaçlarından çıkana ya da endOfMibView dönene kadar yürümeye devam edilir.
+            if not advanced and not finished:
+                break
+
+        return tables
+
+    async def try_community(self, community, target):
+        auth = CommunityData(community, mpModel=1)
+        try:
+            return auth, await self.get(auth, target, SCALAR_OIDS.values())
+        except RuntimeError:
+            return None, None
+
+    async def discover(self, ip, target):
+        """
+        Önbellekteki community önce denenir. Yanıt yoksa kalan community'ler paralel denenir;
+        v2c'de yanlış community de timeout verdiğinden sıralı denemek her biri için timeout bekletir.
+        """
+        cached = self.community_cache.get(ip)
+        if cached:
+            auth, scalars = await self.try_community(cached, target)
+            if auth:
+                return auth, scalars
+
+        candidates = [c for c in self.communities if c != cached]
+        attempts = await asyncio.gather(*(self.try_community(c, target) for c in candidates))
+        for community, (auth, scalars) in zip(candidates, attempts):
+            if auth:
+                self.community_cache[ip] = community
+                return auth, scalars
+
+        self.community_cache.pop(ip, None)
+        return None, None
+
+    async def poll_device(self, device):
+        ip = device["ipaddress"]
+        result = {"hostname": device["hostname"], "ip": ip, "polled_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+        async with self.semaphore:
+            started = time.perf_counter()
+            try:
+                target = await self.target(ip)
+                auth, scalars = await self.discover(ip, target)
+                if auth is None:
+                    result["error"] = "no_response"
+                    return result
+
+                result["sys_uptime"] = to_value(scalars.get(SCALAR_OIDS["sys_uptime"]))
+                result["sys_name"] = str(scalars.get(SCALAR_OIDS["sys_name"], ""))
+
+                interface_tables = await self.walk_columns(auth, target, list(INTERFACE_COLUMNS.values()))
+                result["interfaces"] = pivot(interface_tables, INTERFACE_COLUMNS)
+
+                environment_tables = await self.walk_columns(auth, target, list(ENVIRONMENT_COLUMNS.values()))
+                result["environment"] = {
+                    name: environment_tables[oid] for name, oid in ENVIRONMENT_COLUMNS.items() if environment_tables[oid]
+                }
+            except Exception as e:
+                result["error"] = str(e)
+            finally:
+                result["duration_ms"] = round((time.perf_counter() - started) * 1000)
+
+        return result
+
+    async def poll_all(self, devices):
+        results = await asyncio.gather(*(self.poll_device(device) for device in devices))
+        return {r["hostname"]: r for r in results}
+
+    def close(self):
+        try:
+            self.engine.close_dispatcher()
+        except AttributeError:
+            self.engine.transportDispatcher.closeDispatcher()
+
+
+def oid_key(oid):
+    return tuple(int(part) for part in oid.strip(".").split("."))
+
+
+def pivot(tables, columns):
+    """{kolon: {index: value}} yapısını {index: {alan: value}} yapısına çevirir."""
+    rows = {}
+    for field, oid in columns.items():
+        for index, value in tables.get(oid, {}).items():
+            rows.setdefault(index, {})[field] = value
+    return rows
+
+
+async def poll_inventory(devices, community_cache, **kwargs):
+    poller = SnmpPoller(community_cache=community_cache, **kwargs)
+    try:
+        return await poller.poll_all(devices)
+    finally:
+        poller.close()
+
+
+def main():
+    devices = load_inventory()
+    if not devices:
+        log_message("WARNING", "SNMP sorgulanacak cihaz bulunamadı.")
+        return
+
+    community_cache = load_json(COMMUNITY_CACHE_FILE, {})
+    started = time.perf_counter()
+    results = asyncio.run(poll_inventory(devices, community_cache))
+    elapsed = time.perf_counter() - started
+
+    failed = sum(1 for r in results.values() if "error" in r)
+    save_json(OUTPUT_FILE, {
+        "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "device_count": len(results),
+        "failed_count": failed,
+        "data": results,
+    })
+    save_json(COMMUNITY_CACHE_FILE, community_cache)
+    log_message("INFO", f"SNMP: {len(results)} cihaz {elapsed:.1f} sn'de sorgulandı, {failed} başarısız.")
+
+
+if __name__ == "__main__":
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    main()
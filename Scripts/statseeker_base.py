@@ -9,8 +9,14 @@ import urllib3
 import os
 import re
 import sys
+import time
 from dotenv import load_dotenv
 
+import impact
+import profiling
+import run_ledger
+import status_events
+
 load_dotenv()
 
 sys.stdout.reconfigure(encoding='utf-8')
@@ -22,7 +28,7 @@ SSL_VERIFY = os.environ.get("SSL_CERT_PATH", True)
 
 
 # API connection details
-base_url = 'https://statseeker.emea.fedex.com/api/v2.1/'
+base_url = os.environ.get("STATSEEKER_API_URL", "https://statseeker.emea.fedex.com/api/v2.1").rstrip("/") + "/"  # Yerel test: fake_api_server.py
 user = os.environ.get("STATSEEKER_USERNAME")
 password = os.environ.get("STATSEEKER_PASSWORD")
 
@@ -39,8 +45,7 @@ urls = {
 }
 
 # Log ayarları
-log_directory = "D:/INTRANET/Netinfo/Logs/Latest_Logs"
-os.makedirs(log_directory, exist_ok=True)
+log_directory = "D:/INTRANET/Netinfo/Logs/Latest_Logs"   # İlk log yazılırken oluşturulur
 
 log_start_date = datetime.now(pytz.timezone("Europe/Istanbul")).strftime("%Y%m%d")
 log_file_path = os.path.join(log_directory, f"network_device_inventory_{log_start_date}.log")
@@ -48,6 +53,8 @@ log_file_path = os.path.join(log_directory, f"network_device_inventory_{log_star
 STATUS_LOG_FILE = "D:/INTRANET/Netinfo/Logs/Latest_Logs/device_status_changes.json"
 ARCHIVE_FOLDER = "D:/INTRANET/Netinfo/Logs/Archived_Logs"
 uuid_file = 'D:/INTRANET/Netinfo/Data/UUID_Pool.json'
+INVENTORY_FILE = 'D:/INTRANET/Netinfo/Data/network_device_inventory.json'
+STATION_INFO_FILE = 'D:/INTRANET/Netinfo/Data/station-info.json'
 
 
 
@@ -88,6 +95,7 @@ def log_message(message):
     log_entry = f"{timestamp} - {message}\n"
 
     try:
+        os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
         with open(log_file_path, 'a', encoding='utf-8') as log_file:
             log_file.write(log_entry)
     except Exception as e:
@@ -151,9 +159,84 @@ def log_status_change(deviceid, hostname, old_status, new_status, serial):
         print(f"🟢 LOG: {hostname} ({deviceid}) için {old_status} → {new_status} kaydedildi. (mail_sent=0)")
     except Exception as e:
         print(f"🔴 HATA: JSON güncellenirken hata oluştu: {e}")
+        return
+
+    publish_status_events([new_entry])
+
+def publish_status_events(entries):
+    """Değişiklikleri data_api'nin SSE akışına iletir; yazılamazsa sadece loglanır."""
+    try:
+        status_events.append_events(entries)
+    except OSError as e:
+        log_message(f"⚠️ Durum olayları yayınlanamadı: {e}")
+
+def log_status_changes(changes, failed_hosts):
+    """Bir sweep'teki tüm durum değişikliklerini etki analiziyle birlikte tek seferde loglar."""
+    if not changes:
+        return
+
+    if os.path.exists(STATUS_LOG_FILE):
+        try:
+            with open(STATUS_LOG_FILE, 'r', encoding='utf-8') as f:
+                status_logs = json.load(f)
+                if not isinstance(status_logs, list):
+                    status_logs = []
+        except json.JSONDecodeError:
+            status_logs = []
+    else:
+        status_logs = []
+
+    # Her cihazın son kaydını tek geçişte bul (timestamp formatı sıralanabilir)
+    last_status = {}
+    for log in status_logs:
+        previous = last_status.get(log["deviceid"])
+        if previous is None or log["timestamp"] >= previous["timestamp"]:
+            last_status[log["deviceid"]] = log
+
+    now = datetime.now(pytz.timezone("Europe/Istanbul")).strftime('%Y-%m-%d %H:%M:%S')
+    new_entries = []
+
+    for change in changes:
+        last_entry = last_status.get(change["deviceid"])
+        if last_entry and last_entry["new_status"] == change["new_status"]:
+            print(f"🔵 INFO: {change['hostname']} ({change['deviceid']}) zaten {change['new_status'].upper()}, tekrar eklenmedi.")
+            continue
+
+        new_entries.append({
+            "log_id": str(uuid.uuid4()),
+            "timestamp": now,
+            "deviceid": change["deviceid"],
+            "hostname": change["hostname"],
+            "serial": change["serial"],
+            "old_status": change["old_status"],
+            "new_status": change["new_status"],
+            "mail_sent": 0
+        })
+
+    if not new_entries:
+        return
+
+    # 💥 DOWN olaylarına topoloji üzerinden etkilenen cihaz/AP/port listesini ekle
+    try:
+        impact.attach_impact(new_entries, failed_hosts)
+    except Exception as e:
+        log_message(f"⚠️ Etki analizi yapılamadı: {e}")
+
+    status_logs.extend(new_entries)
+
+    try:
+        with open(STATUS_LOG_FILE, 'w', encoding='utf-8') as f:
+            json.dump(status_logs, f, indent=2)
+        log_message(f"🟢 LOG: {len(new_entries)} durum değişikliği kaydedildi. (mail_sent=0)")
+    except Exception as e:
+        print(f"🔴 HATA: JSON güncellenirken hata oluştu: {e}")
+        return
 
-def update_status_change(device, previous_data):
-    """Cihazın durum değişikliklerini kontrol eder ve sadece belirlenen 3 alanı günceller."""
+    publish_status_events(new_entries)
+
+def update_status_change(device, previous_data, pending_changes=None):
+    """Cihazın durum değişikliklerini kontrol eder ve sadece belirlenen 3 alanı günceller.
+    pending_changes verilirse değişiklik hemen yazılmaz, toplu loglama için listeye eklenir."""
     deviceid = str(device["deviceid"])
     current_status = device["ping_state"].lower() if isinstance(device["ping_state"], str) else "unknown"
 
@@ -175,7 +258,16 @@ def update_status_change(device, previous_data):
     if status_changed:
         print(f"Status Change Detected: {device['hostname']} (ID: {deviceid}) from {previous_status} to {current_status}.")
         serial = device.get("serial", "Unknown")
-        log_status_change(deviceid, device["hostname"], previous_status, current_status, device["serial"])
+        if pending_changes is not None:
+            pending_changes.append({
+                "deviceid": deviceid,
+                "hostname": device["hostname"],
+                "serial": serial,
+                "old_status": previous_status,
+                "new_status": current_status
+            })
+        else:
+            log_status_change(deviceid, device["hostname"], previous_status, current_status, device["serial"])
 
         last_status_change = now  # Durum değiştiyse güncelle
 
@@ -231,13 +323,14 @@ def fetch_data(url):
     try:
         log_message(f"🔧 Bağlantı kuruluyor...")
 
-        response = requests.get(
-            url,
-            auth=(user, password),
-            verify=SSL_VERIFY,
-            timeout=60,
-              # Proxy kullanma - direkt bağlantı
-        )
+        with run_ledger.timed_request(url) as call:
+            response = call["response"] = requests.get(
+                url,
+                auth=(user, password),
+                verify=SSL_VERIFY,
+                timeout=60,
+                  # Proxy kullanma - direkt bağlantı
+            )
 
         if response.status_code == 200:
             log_message(f"✅ SUCCESS: Bağlantı başarılı - {url}")
@@ -651,7 +744,7 @@ def determine_device_type(model):
 
 def load_previous_data():
     """Önceki cihaz verilerini JSON'dan yükler ve hataları engeller."""
-    previous_data_file = 'D:/INTRANET/Netinfo/Data/network_device_inventory.json'
+    previous_data_file = INVENTORY_FILE
     if os.path.exists(previous_data_file):
         try:
             with open(previous_data_file, 'r', encoding='utf-8') as f:
@@ -664,8 +757,6 @@ def load_previous_data():
 
 def load_uuid_mapping():
     """ UUID Mapping dosyasını güvenli modda yükler. """
-    uuid_file = 'D:/INTRANET/Netinfo/Data/UUID_Pool.json'
-
     if not os.path.exists(uuid_file):
         log_message(f"🔴 ERROR: UUID Mapping dosyası bulunamadı: {uuid_file}")
         return {}, []
@@ -708,7 +799,7 @@ def assign_uuid(deviceid, uuid_mapping, available_uuids):
 
 def save_current_data(devices):
     """Cihaz verilerini günceller ve JSON dosyasına yazar."""
-    json_file = 'D:/INTRANET/Netinfo/Data/network_device_inventory.json'
+    json_file = INVENTORY_FILE
 
     try:
         with open(json_file, 'w', encoding='utf-8') as f:
@@ -744,7 +835,7 @@ def filter_and_group_devices(df):
 
 def station_info():
     """Load station information from station-info.json and map code/alternate_code to town."""
-    station_file = 'D:/INTRANET/Netinfo/Data/station-info.json'
+    station_file = STATION_INFO_FILE
     if not os.path.exists(station_file):
         log_message(f"Station info file not found: {station_file}")
         return {}
@@ -771,7 +862,7 @@ def station_info():
 
 def update_data():
     """Fetch and process data, updating status change information."""
-    json_file = 'D:/INTRANET/Netinfo/Data/network_device_inventory.json'
+    json_file = INVENTORY_FILE
 
     previous_data = load_previous_data()
     uuid_mapping, available_uuids = load_uuid_mapping()  # UUID listesi yüklendi
@@ -779,14 +870,18 @@ def update_data():
 
     for name, url in urls.items():
         log_message(f"Fetching {name} data...")
-        data = fetch_data(url)
+        with run_ledger.stage("fetch"):
+            data = fetch_data(url)
         if data:
-            df = process_data(data)
+            with run_ledger.stage("parse"):
+                df = process_data(data)
             data_frames[name] = df
         else:
             log_message(f"❌ {name} verisi API'den çekilemedi!")
+            run_ledger.record_failure("fetch")
 
     if 'device' in data_frames and 'inventory' in data_frames:
+        enrich_start = time.perf_counter()
         merged_data = data_frames['device'].merge(data_frames['inventory'], on='deviceid', how='left')
 
         merged_data['device_type'] = merged_data['model'].apply(determine_device_type)
@@ -841,9 +936,10 @@ def update_data():
 
         updated_devices = []
         new_devices = []
+        pending_changes = []
 
         for device in merged_data.to_dict(orient='records'):
-            status_update = update_status_change(device, previous_data)
+            status_update = update_status_change(device, previous_data, pending_changes)
 
             updated_device = {
                 "id": device["deviceid"],
@@ -870,18 +966,28 @@ def update_data():
             if device["deviceid"] not in previous_data:
                 new_devices.append(device)
 
+        # 📦 Durum değişikliklerini etki analiziyle toplu olarak logla
+        failed_hosts = [d["hostname"] for d in updated_devices if d["ping_state"] == "down"]
+        log_status_changes(pending_changes, failed_hosts)
+        run_ledger.add_stage("enrich", time.perf_counter() - enrich_start)
+
         # ✅ JSON çıktısı kaydı
+        write_start = time.perf_counter()
         with open(json_file, 'w', encoding='utf-8') as f:
             json.dump(updated_devices, f, indent=2)
+        run_ledger.record_write(json_file)
 
         log_message(f"🟢 LOG: {len(updated_devices)} cihaz verisi güncellendi → {json_file}")
 
         # ✅ UUID dosyasını güncelle
         remaining_uuids = [uuid for uuid in available_uuids if uuid not in newly_assigned_uuids]
         uuid_data = {"deviceid_uuid_mapping": uuid_mapping, "available_uuids": remaining_uuids}
-        uuid_file = 'D:/INTRANET/Netinfo/Data/UUID_Pool.json'
         with open(uuid_file, 'w', encoding='utf-8') as f:
             json.dump(uuid_data, f, indent=2)
+        run_ledger.record_write(uuid_file)
+        run_ledger.add_stage("write", time.perf_counter() - write_start)
+        run_ledger.count("devices", len(updated_devices))
+        run_ledger.count("devices_changed", len(pending_changes))
 
         log_message(f"🟢 UUID verisi güncellendi → {uuid_file}")
 
@@ -891,4 +997,6 @@ def update_data():
 
 
 if __name__ == "__main__":
-    update_data()
+    with run_ledger.job_run("statseeker_base"):
+        with profiling.profiled("statseeker_base"):
+            update_data()
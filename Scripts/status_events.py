@@ -0,0 +1,70 @@
+import json
+import os
+
+# 📂 Dashboard'lara anlık iletilen durum değişikliği olayları (satır başına bir JSON)
+EVENTS_FILE = "D:/INTRANET/Netinfo/Data/status_events.ndjson"
+MAX_BYTES = 2 * 1024 * 1024     # Dosya bu boyutu aşınca son KEEP_LINES olay tutulur
+KEEP_LINES = 1000
+TAIL_BYTES = 16 * 1024          # Son sıra numarası dosyanın bu kadarlık sonundan okunur
+
+
+def compact_event(entry):
+    """device_status_changes kaydından sadece arayüzün ihtiyaç duyduğu alanlar."""
+    event = {
+        "id": entry["log_id"],
+        "ts": entry["timestamp"],
+        "deviceid": str(entry["deviceid"]),
+        "hostname": entry["hostname"],
+        "old": entry["old_status"],
+        "new": entry["new_status"],
+    }
+    impact = entry.get("impact")
+    if isinstance(impact, dict):
+        # Etkilenen listeler yerine sayıları; ayrıntı device_status_changes.json'da
+        event["impact"] = {k: len(v) if isinstance(v, list) else v for k, v in impact.items()}
+    return event
+
+
+def last_seq(events_file):
+    """Dosyadaki son olayın sıra numarası; dosya yoksa ya da eski formattaysa 0."""
+    try:
+        with open(events_file, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - TAIL_BYTES))
+            tail = f.read()
+    except OSError:
+        return 0
+    for line in reversed(tail.splitlines()):
+        try:
+            return int(json.loads(line).get("seq", 0))
+        except (ValueError, AttributeError):
+            continue
+    return 0
+
+
+def append_events(entries, events_file=None):
+    """
+    Olayları dosyanın sonuna ekler; data_api dosyayı kaldığı yerden okuyup bağlı istemcilere yayınlar.
+    Her olaya kırpmalardan etkilenmeyen, sürekli artan bir sıra numarası (seq) verilir.
+    Dosya büyüyünce eski olaylar atılır; okuyucu baştan okur ve yayınladığı son seq'e kadar olanları atlar.
+    """
+    if not entries:
+        return
+    events_file = events_file or EVENTS_FILE
+    seq = last_seq(events_file)
+    lines = ""
+    for entry in entries:
+        seq += 1
+        event = compact_event(entry)
+        event["seq"] = seq
+        lines += json.dumps(event, ensure_ascii=False) + "\n"
+    with open(events_file, "a", encoding="utf-8") as f:
+        f.write(lines)
+
+    if os.path.getsize(events_file) > MAX_BYTES:
+        with open(events_file, "r", encoding="utf-8") as f:
+            kept = f.readlines()[-KEEP_LINES:]
+        temp_file = events_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            f.writelines(kept)
+        os.replace(temp_file, events_file)
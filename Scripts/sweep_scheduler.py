@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import re
+import time
+
+# 📂 Tetikleyici kaynakları
+STATUS_LOG_FILE = "D:/INTRANET/Netinfo/Logs/Latest_Logs/device_status_changes.json"
+SYSLOG_FILE = "D:/INTRANET/Netinfo/Data/syslog_data.json"
+
+# 📌 Scheduler Settings
+MIN_INTERVAL = 5 * 60          # Sık değişen cihaz en fazla bu sıklıkla sorgulanır
+MAX_INTERVAL = 60 * 60         # Hiç değişmeyen cihaz en geç bu sürede bir sorgulanır
+SPEEDUP = 0.5                  # Değişiklik görülünce aralık bu oranla kısalır
+BACKOFF = 1.5                  # Değişiklik yoksa aralık bu oranla uzar
+
+# Port up/down olayları (Cisco IOS): %LINK-3-UPDOWN, %LINEPROTO-5-UPDOWN
+LINK_EVENT_PATTERN = re.compile(r"%(LINK|LINEPROTO)-\d+-(UPDOWN|CHANGED)")
+
+
+def load_state(state_file):
+    state = {"devices": {}, "cursors": {}}
+    if os.path.exists(state_file):
+        try:
+            with open(state_file, "r", encoding="utf-8") as f:
+                state.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+    return state
+
+
+def save_state(state, state_file, keep=None):
+    """keep verilirse envanterden çıkmış cihazların kayıtları silinir."""
+    if keep is not None:
+        keep = set(keep)
+        state["devices"] = {k: v for k, v in state["devices"].items() if k in keep}
+    temp_file = state_file + ".tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    os.replace(temp_file, state_file)
+
+
+def fingerprint(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def due_devices(state, keys, base_interval, now=None, limit=None):
+    """
+    Zamanı gelmiş cihazları en çok geciken önce olacak şekilde döndürür.
+    Daha önce hiç sorgulanmamış cihazlar hemen sorgulanır.
+    limit verilirse (API bütçesi) en fazla o kadar cihaz döner; kalanlar sonraki turda öne geçer.
+    """
+    now = now or time.time()
+    due = []
+    for key in keys:
+        entry = state["devices"].get(key)
+        if entry is None:
+            due.append((float("-inf"), key))
+            continue
+        entry.setdefault("interval", base_interval)
+        if entry.get("next_due", 0) <= now:
+            due.append((entry.get("next_due", 0), key))
+    due.sort(key=lambda item: item[0])
+    keys = [key for _, key in due]
+    return keys[:limit] if limit else keys
+
+
+def record_poll(state, key, value_fingerprint, base_interval, now=None):
+    """
+    Başarılı sorgudan sonra çağrılır. Veri değiştiyse aralık kısalır, değişmediyse uzar.
+    Dönüş: veri önceki sorgudan farklı mı
+    """
+    now = now or time.time()
+    entry = state["devices"].setdefault(key, {"interval": base_interval})
+    changed = entry.get("fingerprint") != value_fingerprint
+    if "fingerprint" in entry:
+        factor = SPEEDUP if changed else BACKOFF
+        entry["interval"] = round(min(MAX_INTERVAL, max(MIN_INTERVAL, entry["interval"] * factor)))
+    entry["fingerprint"] = value_fingerprint
+    entry["last_polled"] = now
+    entry["next_due"] = now + entry["interval"]
+    entry.pop("trigger", None)
+    if changed:
+        entry["last_changed"] = now
+    return changed
+
+
+def record_failure(state, key, base_interval, now=None):
+    """Veri alınamadıysa aralık değişmez; tekrar deneme sıklığını circuit breaker belirler."""
+    now = now or time.time()
+    entry = state["devices"].setdefault(key, {"interval": base_interval})
+    entry["next_due"] = now + entry["interval"]
+
+
+def trigger(state, key, reason):
+    """Cihazı bir sonraki turda hemen sorgulanacak şekilde işaretler."""
+    entry = state["devices"].get(key)
+    if entry is None:
+        return False        # Hiç sorgulanmamış cihaz zaten hemen sorgulanır
+    entry["next_due"] = 0
+    entry["trigger"] = reason
+    return True
+
+
+def is_triggered(state, key):
+    """Cihaz bir olayla işaretlenmiş ve henüz başarıyla sorgulanmamış mı."""
+    return "trigger" in state["devices"].get(key, {})
+
+
+def load_json_list(path):
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return data if isinstance(data, list) else []
+
+
+def apply_triggers(state, key_by_deviceid, keys=None):
+    """
+    Son çalışmadan bu yana gelen Statseeker durum değişiklikleri ve syslog port up/down
+    olaylarına göre ilgili cihazları hemen sorgulanacak şekilde işaretler.
+    İlk çalışmada sadece imleç ilerletilir; geçmiş olaylar tetikleyici sayılmaz.
+    Dönüş: {key: sebep}
+    """
+    keys = set(keys) if keys is not None else None
+    cursors = state["cursors"]
+    triggered = {}
+
+    def resolve(record):
+        key = key_by_deviceid.get(str(record.get("deviceid")))
+        if key is None and keys is not None and record.get("hostname") in keys:
+            key = record["hostname"]
+        return key
+
+    sources = (
+        ("status", STATUS_LOG_FILE, "timestamp", lambda r: True, "status_change"),
+        ("syslog", SYSLOG_FILE, "time", lambda r: LINK_EVENT_PATTERN.search(r.get("text", "")), "link_event"),
+    )
+    for name, path, time_field, matches, reason in sources:
+        records = load_json_list(path)
+        if not records:
+            continue
+        latest = max(str(r.get(time_field, "")) for r in records)
+        cursor = cursors.get(name)
+        cursors[name] = max(latest, cursor or "")
+        if cursor is None:
+            continue
+        for record in records:
+            if str(record.get(time_field, "")) <= cursor or not matches(record):
+                continue
+            key = resolve(record)
+            if key and trigger(state, key, reason):
+                triggered[key] = reason
+
+    return triggered
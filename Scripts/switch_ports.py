@@ -1,16 +1,30 @@
+import argparse
 import pytz
 import requests
 import json
 import pandas as pd
 import logging
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 import os
+import subprocess
+import sys
 import time
+from contextlib import nullcontext
 from functools import lru_cache
 from cryptography.fernet import Fernet
 from macarna import mac_lookup
+from requests.adapters import HTTPAdapter
+
+import circuit_breaker
+import endpoint_retry
+import main_data_shards
+import netdb_broker
+import profiling
+import run_ledger
+import sweep_scheduler
+import topology
+import work_queue
 
 # File paths
 CREDENTIALS_FILE = "D:/INTRANET/Netinfo/Config/credentials.json"
@@ -20,10 +34,21 @@ LOG_DIR = "D:/INTRANET/Netinfo/logs/Latest_Logs"
 TURKEY_TZ = pytz.timezone("Europe/Istanbul")
 
 # API and input/output paths
-NETDB_AUTH_URL = "https://network-api.npe.fedex.com/v1/authorize"
-NETDB_BASE_URL = "https://network-api.npe.fedex.com/v1/device/"
+NETDB_API_URL = os.environ.get("NETDB_API_URL", "https://network-api.npe.fedex.com/v1").rstrip("/")  # Yerel test: fake_api_server.py
+NETDB_AUTH_URL = f"{NETDB_API_URL}/authorize"
+NETDB_BASE_URL = f"{NETDB_API_URL}/device/"
 INPUT_FILE = "D:/INTRANET/Netinfo/Data/network_device_inventory.json"
 OUTPUT_JSON_FILE = "D:/INTRANET/Netinfo/Data/main_data.json"
+SCHEDULE_STATE_FILE = "D:/INTRANET/Netinfo/Data/sweep_schedule_switch.json"
+MAX_WORKERS = 20
+BASE_INTERVAL = 10 * 60      # Yeni cihazın başlangıç sorgu aralığı (eski sabit tarama aralığı)
+MAX_DEVICES_PER_RUN = None   # Tur başına API bütçesi; None = zamanı gelen tüm cihazlar
+QUEUE_JOB = "switch_ports"
+SWEEP_TIMEOUT = 30 * 60       # Kuyruk turunun en uzun süresi (saniye)
+WORKER_IDLE_SLEEP = 5
+WORKER_BATCH_SIZE = 10        # Worker'ın tek seferde kiralayıp aynı havuzda çektiği cihaz sayısı
+WRITE_SHARDS = True           # main_data.json yanında cihaz başına dosyalar (main_data_shards)
+MAIN_DATA_COMPACT = True      # WRITE_SHARDS açıkken main_data.json tek satır ve sadece bir switch değiştiyse yazılır
 
 # Proxy settings
 PROXY = {
@@ -31,18 +56,20 @@ PROXY = {
     "https": "http://eu-proxy.tntad.fedex.com:9090"
 }
 
-# Loglama ayarları
-os.makedirs(LOG_DIR, exist_ok=True)
-log_file_date = datetime.now().strftime('%Y%m%d')
-log_file = os.path.join(LOG_DIR, f"switch_ports_{log_file_date}.log")
+# Loglama ayarları; log dosyası script çalıştırıldığında açılır (import eden modüller, ör. benchmark, dizin oluşturmaz)
 log_start_time = datetime.now()
 
-logging.basicConfig(
-    filename=log_file,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    encoding="utf-8"
-)
+
+def setup_logging():
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_file_date = datetime.now().strftime('%Y%m%d')
+    logging.basicConfig(
+        filename=os.path.join(LOG_DIR, f"switch_ports_{log_file_date}.log"),
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        encoding="utf-8"
+    )
+
 
 def log_message(level, message):
     """
@@ -65,16 +92,16 @@ def log_message(level, message):
         logging.info(message)
 
 # Encryption and credentials handling
+# Anahtar ilk ihtiyaçta okunur; parse/write fonksiyonlarını kullanan modüller anahtar olmadan import edebilir
+@lru_cache(maxsize=1)
 def load_key():
     if not os.path.exists(KEY_FILE):
         raise FileNotFoundError("Secret key file not found.")
     with open(KEY_FILE, 'rb') as key_file:
         return key_file.read()
 
-ENCRYPTION_KEY = load_key()
-
 def decrypt_data(encrypted_data):
-    cipher = Fernet(ENCRYPTION_KEY)
+    cipher = Fernet(load_key())
     return cipher.decrypt(encrypted_data.encode()).decode()
 
 def load_credentials():
@@ -99,7 +126,8 @@ def get_netdb_bearer_token():
 
     for attempt in range(3):
         try:
-            response = requests.post(NETDB_AUTH_URL, data=auth_data, headers=headers, timeout=60)
+            with run_ledger.timed_request(NETDB_AUTH_URL) as call:
+                response = call["response"] = requests.post(NETDB_AUTH_URL, data=auth_data, headers=headers, timeout=60)
             response.raise_for_status()
             token = response.json().get("access_token")
             if token:
@@ -109,32 +137,53 @@ def get_netdb_bearer_token():
             log_message("error", f"Error retrieving token: {e}")
     raise RuntimeError("Failed to obtain bearer token after multiple attempts.")
 
-def fetch_device_data(hostname, bearer_token, timeout=60):
-    """
-    Belirtilen hostname için cihaz verilerini alır.
-    """
-    log_message("info", f"Cihaz verileri alınıyor: {hostname}")
-    urls = {
+def device_endpoint_urls(hostname):
+    return {
         "interfaces": f"{NETDB_BASE_URL}{hostname}/interfaces?device_type=cisco_ios",
         "vlans": f"{NETDB_BASE_URL}{hostname}/vlans?device_type=cisco_ios",
         "neighbors": f"{NETDB_BASE_URL}{hostname}/neighbors?device_type=cisco_ios",
         "mac_address_table": f"{NETDB_BASE_URL}{hostname}/mac-address-table?device_type=cisco_ios"
     }
-    headers = {"Authorization": f"Bearer {bearer_token}", "Accept": "application/json"}
-    results = {}
 
-    for key, url in urls.items():
-        try:
-            response = requests.get(url, headers=headers, timeout=timeout)
-            response.raise_for_status()
-            results[key] = response.json().get("results", {})
-            log_message("info", f"{key.capitalize()} verileri başarıyla alındı: {hostname}")
-        except requests.RequestException as e:
-            log_message("error", f"{key.capitalize()} verileri alınırken hata oluştu: {hostname}, Hata: {str(e)}")
 
-    if len(results) == 4:
-        return results
-    return None
+def create_session(bearer_token):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Authorization": f"Bearer {bearer_token}", "Accept": "application/json"})
+    return session
+
+
+def fetch_devices_data(hostnames, bearer_token, timeout=60, on_device_done=None, refresh=(), session=None):
+    """
+    Tüm cihazların endpoint'lerini tek havuzda çeker.
+    Sadece başarısız olan endpoint tekrar denenir; hâlâ alınamayanlar için önceki
+    başarılı yanıt kullanılır ve stale olarak işaretlenir.
+    refresh: olayla tetiklenen cihazlar; broker'daki olay öncesi yanıt kullanılmaz (max_age=0).
+    session verilirse (worker) o kullanılır ve kapatılmaz.
+    """
+    jobs = {hostname: device_endpoint_urls(hostname) for hostname in hostnames}
+    refresh_urls = {url for hostname in refresh if hostname in jobs for url in jobs[hostname].values()}
+    with nullcontext(session) if session else create_session(bearer_token) as session:
+        return endpoint_retry.fetch_endpoints(
+            jobs,
+            # wait=False: başka işte süren istek için thread bekletilmez, endpoint bekleme kuyruğuna döner
+            lambda url: netdb_broker.fetch(url, lambda: endpoint_retry.get_json(session, url, timeout=timeout),
+                                           max_age=0 if url in refresh_urls else netdb_broker.FRESHNESS_SECONDS,
+                                           wait=False),
+            max_workers=MAX_WORKERS,
+            on_host_done=on_device_done,
+            store_fresh=False,
+        )
+
+
+def fetch_device_data(hostname, bearer_token, timeout=60):
+    """
+    Belirtilen hostname için cihaz verilerini alır.
+    """
+    log_message("info", f"Cihaz verileri alınıyor: {hostname}")
+    return fetch_devices_data([hostname], bearer_token, timeout)[hostname]
 
 def get_main_data_last_modified():
     file_path = OUTPUT_JSON_FILE  # JSON dosyasının yolu
@@ -148,9 +197,7 @@ def get_main_data_last_modified():
 
     return "Bilinmiyor"  # Dosya yoksa düzgün mesaj döndür
 
-# Fonksiyonu çalıştır ve logla
 MAIN_DATA_LAST_MODIFIED = get_main_data_last_modified()
-log_message("info", f"Main Data Last Modified: {MAIN_DATA_LAST_MODIFIED}")
 
 
 def process_vlan_data(vlan_data):
@@ -209,21 +256,24 @@ def normalize_interface_name(name):
     return name
 
 
-def process_device_data(row, bearer_token):
+def process_device_data(row, fetched):
     hostname = row["hostname"]
     device_id = row["deviceid"]
     log_message("info", f"{hostname} işleniyor...")
 
-    for attempt in range(3):
-        device_data = fetch_device_data(hostname, bearer_token)
-        if device_data:
-            break
-        log_message("warning", f"Veri alınamadı: {hostname}, Deneme: {attempt + 1}")
+    payloads = fetched["results"]
+    if fetched["failed"]:
+        log_message("warning", f"{hostname} - alınamayan endpoint'ler: {fetched['failed']}")
+    if fetched["stale"]:
+        log_message("warning", f"{hostname} - önceki veriden kullanılan endpoint'ler: {fetched['stale']}")
 
-    if not device_data:
-        log_message("error", f"Tüm denemeler başarısız oldu: {hostname}")
+    # Port listesi interface verisinden üretildiği için o olmadan cihaz işlenemez
+    if "interfaces" not in payloads:
+        log_message("error", f"Interface verisi alınamadı: {hostname}")
         return None
 
+    device_data = {key: (payload or {}).get("results", {}) for key, payload in payloads.items()}
+
     interfaces_data = device_data.get("interfaces", {})
     vlans_data = device_data.get("vlans", [])
     neighbors_data = device_data.get("neighbors", {})
@@ -296,86 +346,377 @@ def process_device_data(row, bearer_token):
         })
 
     log_message("info", f"{hostname} işleme tamamlandı. {len(port_data)} port bulundu.")
-    return {hostname: {"last_updated": datetime.now().isoformat(), "ports": port_data}}
+    device_entry = {"last_updated": datetime.now().isoformat(), "ports": port_data}
+    if fetched["stale"]:
+        device_entry["stale_endpoints"] = fetched["stale"]
+    return {hostname: device_entry}
 
 
-def fetch_network_data():
-    start_time = time.time()
-    log_message("info", "Ağ veri toplama işlemi başlatılıyor...")
+# Sayaç/trafik alanları ve MAC tablosu (girdiler yaşlanıp düştükçe) her turda değişir;
+# sadece port durumu ve bağlantı bilgisi izlenir
+FINGERPRINT_FIELDS = ("interface_name", "link_status", "protocol_status", "vlan_id", "speed", "duplex",
+                      "neighbor_hostname", "neighbor_port")
 
-    with open(INPUT_FILE, "r", encoding="utf-8") as json_file:
-        df = pd.DataFrame(json.load(json_file))  # JSON verisini DataFrame'e çevir
 
-    # Sadece hostname içinde 'sw' geçenleri al, router'ları filtrele
-    switches = df[df["hostname"].str.contains("sw", case=False, na=False)]
+def port_fingerprint(ports):
+    return sweep_scheduler.fingerprint(sorted(
+        [port.get(field) for field in FINGERPRINT_FIELDS] for port in ports
+    ))
 
-    bearer_token = get_netdb_bearer_token()
-    if not bearer_token:
-        log_message("error", "NetDB Bearer token alınamadı. İşlem sonlandırılıyor.")
-        return
 
-    all_data = {}
-    failed_devices = []
+def load_previous_device_data():
+    if not os.path.exists(OUTPUT_JSON_FILE):
+        return {}
+    try:
+        with open(OUTPUT_JSON_FILE, "r", encoding="utf-8") as f:
+            return json.load(f).get("data", {})
+    except (OSError, ValueError) as e:
+        log_message("warning", f"Önceki main_data okunamadı: {e}")
+        return {}
 
-    # 📌 **Switch Bazlı Trafik Verileri**
-    switch_traffic_summary = {}
 
-    with ThreadPoolExecutor(max_workers=20) as executor:
-        future_to_switch = {executor.submit(process_device_data, row, bearer_token): row for _, row in
-                            switches.iterrows()}
+def device_outcome(row, fetched):
+    """
+    Cihazın çekme ve işleme sonucunu coordinator'ın kaydedeceği özet haline getirir.
+    Aynı yapı hem süreç içi toplamada hem de kuyruk worker'larından döner.
+    """
+    hostname = row["hostname"]
+    outcome = {
+        "hostname": hostname,
+        "not_found": fetched["status"].get("interfaces") == 404,
+        # Hiçbir endpoint taze yanıt vermediyse cihaz erişilemez sayılır
+        "fresh": bool(set(fetched["results"]) - set(fetched["stale"])),
+        "result": None,
+        "error": None,
+    }
+    try:
+        with run_ledger.stage("parse"):
+            outcome["result"] = process_device_data(row, fetched)
+    except Exception as e:
+        outcome["error"] = str(e)
+        run_ledger.record_failure("parse")
+        log_message("error", f"{hostname} cihazı işlenirken hata oluştu: {e}")
+    return outcome
 
-        for future in tqdm(as_completed(future_to_switch), total=len(switches), desc="Cihaz verileri işleniyor"):
-            row = future_to_switch[future]
-            try:
-                result = future.result()
-                if result:
-                    all_data.update(result)
 
-                    # 📌 **Her Switch için Toplam Input & Output Mbps Hesaplama**
-                    hostname = row["hostname"]
-                    ports = result[hostname]["ports"]
+def collect_in_process(rows, hostnames, bearer_token, on_outcome, refresh=()):
+    progress = tqdm(total=len(rows), desc="Cihaz verileri işleniyor")
 
-                    total_input = sum(port["input_rate_mbps"] for port in ports)
-                    total_output = sum(port["output_rate_mbps"] for port in ports)
+    def on_device_done(hostname, fetched):
+        """Cihazın tüm endpoint'leri bittiğinde (başarılı, stale ya da başarısız) çağrılır."""
+        progress.update(1)
+        on_outcome(device_outcome(rows[hostname], fetched))
 
-                    switch_traffic_summary[hostname] = {
-                        "input_mbps": round(total_input, 2),
-                        "output_mbps": round(total_output, 2)
-                    }
+    fetch_devices_data(hostnames, bearer_token, on_device_done=on_device_done, refresh=refresh)
+    progress.close()
 
-                else:
-                    failed_devices.append(row["hostname"])
-            except Exception as e:
-                failed_devices.append(row["hostname"])
-                log_message("error", f"{row['hostname']} cihazı işlenirken hata oluştu: {e}")
 
-    if failed_devices:
-        log_message("warning", f"Veri alınamayan cihazlar: {', '.join(failed_devices)}")
+def collect_with_workers(rows, hostnames, workers, on_outcome, refresh=()):
+    """
+    Cihazları kuyruğa iş olarak yazar, yerel worker process'leri başlatır ve biten işleri toplar.
+    Aynı kuyruğu gören başka hostlardaki worker'lar da (switch_ports.py --worker) işlere katılabilir.
+    Çöken worker'ın işi kira süresi dolunca başka worker'a geçer.
+    """
+    conn = work_queue.connect()
+    sweep_id = work_queue.create_sweep(
+        conn, QUEUE_JOB,
+        [(h, {**json.loads(rows[h][["hostname", "deviceid"]].to_json()), "refresh": h in refresh}) for h in hostnames]
+    )
+    log_message("info", f"Kuyruk turu oluşturuldu: {sweep_id} ({len(hostnames)} cihaz, {workers} yerel worker)")
+
+    def spawn():
+        return subprocess.Popen([sys.executable, os.path.abspath(__file__), "--worker", "--sweep", sweep_id])
+
+    processes = [spawn() for _ in range(workers)]
+    respawns = 0
+    seen = set()
+    progress = tqdm(total=len(hostnames), desc="Cihaz verileri işleniyor (kuyruk)")
+    deadline = time.time() + SWEEP_TIMEOUT
+    try:
+        while True:
+            for item in work_queue.finished_items(conn, sweep_id, seen):
+                seen.add(item["id"])
+                progress.update(1)
+                outcome = item["result"] or {"hostname": item["key"], "not_found": False, "fresh": False,
+                                             "result": None, "error": item["error"]}
+                on_outcome(outcome)
+            if work_queue.is_finished(conn, sweep_id):
+                break
+            if time.time() > deadline:
+                log_message("error", f"Kuyruk turu {SWEEP_TIMEOUT} sn içinde bitmedi: {work_queue.sweep_counts(conn, sweep_id)}")
+                break
+            # Tüm yerel worker'lar bittiği halde iş kaldıysa (çökme) yenisi başlatılır
+            if processes and all(p.poll() is not None for p in processes) and respawns < workers:
+                respawns += 1
+                log_message("warning", "Yerel worker'lar sonlandı, kalan işler için yeni worker başlatılıyor.")
+                processes.append(spawn())
+            time.sleep(1)
+    finally:
+        progress.close()
+        # Boşta bekleyen worker'lar kendiliğinden çıkıp çalışma kaydını yazabilsin diye kısa süre beklenir
+        exit_deadline = time.time() + WORKER_IDLE_SLEEP + 5
+        for process in processes:
+            try:
+                process.wait(timeout=max(0, exit_deadline - time.time()))
+            except subprocess.TimeoutExpired:
+                process.terminate()
+        conn.close()
+
+
+def run_worker(sweep_id=None):
+    """
+    Kuyruktan WORKER_BATCH_SIZE kadar iş kiralayıp cihazları tek havuzda çeker; her cihaz bittiği anda
+    sonucu kuyruğa yazılır. Oturum (bağlantı havuzu) worker boyunca tek; iş kalmayınca çıkar.
+    """
+    worker = work_queue.worker_name()
+    with run_ledger.stage("auth"):
+        bearer_token = get_netdb_bearer_token()
+    if not bearer_token:
+        log_message("error", f"Worker {worker}: NetDB Bearer token alınamadı.")
+        return
 
-    # 📌 **Genel Toplam Hesaplama**
-    cumulated_input_mbps = round(sum(switch["input_mbps"] for switch in switch_traffic_summary.values()), 2)
-    cumulated_output_mbps = round(sum(switch["output_mbps"] for switch in switch_traffic_summary.values()), 2)
+    conn = work_queue.connect()
+    processed = 0
+    try:
+        with create_session(bearer_token) as session:
+            while True:
+                items = work_queue.lease_batch(conn, QUEUE_JOB, worker, WORKER_BATCH_SIZE, sweep_id)
+                if not items:
+                    # Başka worker'larda süren işler olabilir; kiraları düşerse devralınır
+                    if sweep_id and not work_queue.is_finished(conn, sweep_id):
+                        time.sleep(WORKER_IDLE_SLEEP)
+                        continue
+                    break
+
+                # Farklı turlarda aynı cihaz olabilir; cihaz bir kez çekilir, sonucu tüm işlerine yazılır
+                items_by_hostname = {}
+                for item in items:
+                    items_by_hostname.setdefault(item["payload"]["hostname"], []).append(item)
+                refresh = [hostname for hostname, host_items in items_by_hostname.items()
+                           if any(item["payload"].get("refresh") for item in host_items)]
+                done = set()
+
+                def on_device_done(hostname, fetched):
+                    nonlocal processed
+                    done.add(hostname)
+                    for item in items_by_hostname[hostname]:
+                        work_queue.complete(conn, item["id"], worker, device_outcome(item["payload"], fetched))
+                        processed += 1
+
+                try:
+                    with run_ledger.stage("fetch"):
+                        fetch_devices_data(list(items_by_hostname), bearer_token, on_device_done=on_device_done,
+                                           refresh=refresh, session=session)
+                except Exception as e:
+                    for hostname, host_items in items_by_hostname.items():
+                        if hostname in done:
+                            continue
+                        log_message("error", f"Worker {worker}: {hostname} başarısız: {e}")
+                        run_ledger.record_failure("device")
+                        for item in host_items:
+                            work_queue.fail(conn, item["id"], worker, e)
+    finally:
+        conn.close()
+    run_ledger.count("devices_polled", processed)
+    log_message("info", f"Worker {worker} tamamlandı: {processed} cihaz işlendi.")
+
+
+def save_main_data(all_data):
+    """
+    Switch bazlı ve genel trafik toplamlarını hesaplar, main_data.json'u ve cihaz dosyalarını yazar.
+    Dönüş: main_data.json'daki özet alanlar
+    """
+    # 📌 **Her Switch için Toplam Input & Output Mbps Hesaplama**
+    switch_traffic_summary = {}
+    for hostname, device_entry in all_data.items():
+        ports = device_entry.get("ports", [])
+        switch_traffic_summary[hostname] = {
+            "input_mbps": round(sum(port["input_rate_mbps"] for port in ports), 2),
+            "output_mbps": round(sum(port["output_rate_mbps"] for port in ports), 2)
+        }
+        if device_entry.get("stale"):
+            switch_traffic_summary[hostname]["stale"] = True
+
+    # 📌 **Genel Toplam Hesaplama: sadece bu turda sorgulanan switch'lerin anlık hızları toplanır**
+    polled = [switch for switch in switch_traffic_summary.values() if not switch.get("stale")]
+    cumulated_input_mbps = round(sum(switch["input_mbps"] for switch in polled), 2)
+    cumulated_output_mbps = round(sum(switch["output_mbps"] for switch in polled), 2)
 
     # 📌 **Son veri güncelleme saatini Türkiye saatine göre al**
     last_whole_data_updated = datetime.now(pytz.utc).astimezone(TURKEY_TZ).strftime('%d.%m.%Y %H:%M')
 
-    # 📌 **JSON dosyasını kaydederken tüm verileri ekle**
-    with open(OUTPUT_JSON_FILE, "w", encoding="utf-8") as f:
-        json.dump({
-            "last_whole_data_updated": last_whole_data_updated,  # Türkiye saatine göre güncellenmiş zaman
-            "cumulated_input_mbps": cumulated_input_mbps,  # 🔥 Toplam giriş trafiği
-            "cumulated_output_mbps": cumulated_output_mbps,  # 🔥 Toplam çıkış trafiği
-            "switch_traffic_summary": switch_traffic_summary,  # 🔥 Switch bazlı giriş/çıkış verileri
-            "data": all_data  # Tüm cihaz verileri
-        }, f, indent=2, ensure_ascii=False)
+    summary = {
+        "last_whole_data_updated": last_whole_data_updated,  # Türkiye saatine göre güncellenmiş zaman
+        "cumulated_input_mbps": cumulated_input_mbps,  # 🔥 Toplam giriş trafiği
+        "cumulated_output_mbps": cumulated_output_mbps,  # 🔥 Toplam çıkış trafiği
+        "cumulated_switch_count": len(polled),  # Toplamlara giren (bu turda sorgulanan) switch sayısı
+        "switch_traffic_summary": switch_traffic_summary,  # 🔥 Switch bazlı giriş/çıkış verileri
+    }
+
+    # 📌 **Cihaz başına dosyalar: sadece içeriği değişen switch'ler yeniden yazılır**
+    changed = True
+    if WRITE_SHARDS:
+        try:
+            written, removed = main_data_shards.write_shards(all_data, summary)
+            changed = bool(written or removed)
+            run_ledger.count("shards_written", written)
+            log_message("info", f"Cihaz dosyaları güncellendi: {written}/{len(all_data)} switch yeniden yazıldı")
+        except OSError as e:
+            log_message("error", f"Cihaz dosyaları yazılamadı: {e}")
+
+    # 📌 **main_data.json: cihaz dosyaları varken özetin güncel hali manifest'tedir;
+    # tam dosya sadece bir switch'in verisi değiştiyse (tek satır olarak) yeniden yazılır**
+    compact = WRITE_SHARDS and MAIN_DATA_COMPACT
+    if changed or not compact or not os.path.exists(OUTPUT_JSON_FILE):
+        with open(OUTPUT_JSON_FILE, "w", encoding="utf-8") as f:
+            json.dump({**summary, "data": all_data}, f, ensure_ascii=False,
+                      indent=None if compact else 2, separators=(",", ":") if compact else None)
+        run_ledger.record_write(OUTPUT_JSON_FILE)
+    else:
+        log_message("info", "Switch verisi değişmedi, main_data.json yeniden yazılmadı")
 
-    log_message("info", f"🔄 Veriler başarıyla güncellendi! Son güncelleme: {last_whole_data_updated}")
-    log_message("info", f"📊 Toplam Giriş Trafiği: {cumulated_input_mbps} Mbps")
-    log_message("info", f"📊 Toplam Çıkış Trafiği: {cumulated_output_mbps} Mbps")
+    return summary
+
+
+def fetch_network_data(workers=0):
+    """workers > 0 ise cihazlar kuyruk üzerinden worker process'lerine dağıtılır."""
+    start_time = time.time()
+    log_message("info", "Ağ veri toplama işlemi başlatılıyor...")
+
+    with open(INPUT_FILE, "r", encoding="utf-8") as json_file:
+        df = pd.DataFrame(json.load(json_file))  # JSON verisini DataFrame'e çevir
+    run_ledger.record_read(INPUT_FILE)
+
+    # Sadece hostname içinde 'sw' geçenleri al, router'ları filtrele
+    switches = df[df["hostname"].str.contains("sw", case=False, na=False)]
+
+    # Kuyruk modunda token'ı worker'lar kendisi alır
+    bearer_token = None
+    if not workers:
+        with run_ledger.stage("auth"):
+            bearer_token = get_netdb_bearer_token()
+        if not bearer_token:
+            log_message("error", "NetDB Bearer token alınamadı. İşlem sonlandırılıyor.")
+            run_ledger.record_failure("auth")
+            return
+
+    all_data = {}
+    failed_devices = []
+    changed_devices = []
+
+    # 📌 **Sürekli hata veren / NetDB'de olmayan cihazlar cooldown boyunca atlanır**
+    breaker = circuit_breaker.load_state()
+    rows = {}
+    skipped_devices = []
+    for _, row in switches.iterrows():
+        hostname = row["hostname"]
+        if circuit_breaker.is_not_found(breaker, hostname) or not circuit_breaker.allow(breaker, hostname):
+            skipped_devices.append(hostname)
+        else:
+            rows[hostname] = row
+    if skipped_devices:
+        log_message("warning", f"Devre açık, atlanan cihazlar: {', '.join(skipped_devices)}")
+
+    # 📌 **Sadece zamanı gelen cihazlar sorgulanır; diğerlerinin önceki verisi korunur**
+    schedule_state = sweep_scheduler.load_state(SCHEDULE_STATE_FILE)
+    triggered = sweep_scheduler.apply_triggers(
+        schedule_state, {str(row["deviceid"]): hostname for hostname, row in rows.items()}, rows
+    )
+    if triggered:
+        log_message("info", f"Olay tetiklemeli yenilenecek cihazlar: {triggered}")
+    due = set(sweep_scheduler.due_devices(schedule_state, rows, BASE_INTERVAL, limit=MAX_DEVICES_PER_RUN))
+    previous_data = load_previous_device_data()
+    for hostname in rows:
+        if hostname not in due and hostname in previous_data:
+            # last_updated önceki sorgunun zamanı olarak kalır; toplamlara dahil edilmez
+            all_data[hostname] = {**previous_data[hostname], "stale": True}
+    rows = {hostname: row for hostname, row in rows.items() if hostname in due or hostname not in previous_data}
+    log_message("info", f"Zamanı gelen cihaz: {len(rows)}, önceki veriden: {len(all_data)}")
+
+    # Statseeker'da down görünen cihazlar sona alınır
+    hostnames = circuit_breaker.prioritize(rows, lambda h: rows[h].get("ping_state") == "down")
+    # Önceki turlardan kalan tetikler de dahil; bu cihazlar için broker önbelleği atlanır
+    refresh = {hostname for hostname in rows if sweep_scheduler.is_triggered(schedule_state, hostname)}
+
+    def on_outcome(outcome):
+        hostname = outcome["hostname"]
+        if outcome["not_found"]:
+            circuit_breaker.mark_not_found(breaker, hostname)
+        if outcome["fresh"]:
+            circuit_breaker.record_success(breaker, hostname)
+        else:
+            circuit_breaker.record_failure(breaker, hostname, outcome["error"] or "Hiçbir endpoint yanıt vermedi")
+
+        result = outcome["result"]
+        if result:
+            all_data.update(result)
+            if sweep_scheduler.record_poll(schedule_state, hostname,
+                                           port_fingerprint(result[hostname]["ports"]), BASE_INTERVAL):
+                changed_devices.append(hostname)
+        else:
+            failed_devices.append(hostname)
+            sweep_scheduler.record_failure(schedule_state, hostname, BASE_INTERVAL)
+            run_ledger.record_failure("device")
+
+    # parse süresi fetch'in içinde, cihazlar bittikçe ölçülür
+    with run_ledger.stage("fetch"):
+        if workers:
+            collect_with_workers(rows, hostnames, workers, on_outcome, refresh)
+        else:
+            collect_in_process(rows, hostnames, bearer_token, on_outcome, refresh)
+    run_ledger.count("devices_polled", len(rows))
+    run_ledger.count("devices_skipped", len(skipped_devices))
+    run_ledger.count("devices_changed", len(changed_devices))
+
+    try:
+        circuit_breaker.save_state(breaker)
+    except OSError as e:
+        log_message("error", f"Circuit breaker durumu kaydedilemedi: {e}")
+    try:
+        sweep_scheduler.save_state(schedule_state, SCHEDULE_STATE_FILE, keep=switches["hostname"])
+    except OSError as e:
+        log_message("error", f"Tarama planı kaydedilemedi: {e}")
+    log_message("info", f"Portları değişen cihaz sayısı: {len(changed_devices)}")
+
+    if failed_devices:
+        log_message("warning", f"Veri alınamayan cihazlar: {', '.join(failed_devices)}")
+
+    with run_ledger.stage("write"):
+        summary = save_main_data(all_data)
+    run_ledger.count("devices", len(all_data))
+    log_message("info", f"🔄 Veriler başarıyla güncellendi! Son güncelleme: {summary['last_whole_data_updated']}")
+    log_message("info", f"📊 Toplam Giriş Trafiği: {summary['cumulated_input_mbps']} Mbps")
+    log_message("info", f"📊 Toplam Çıkış Trafiği: {summary['cumulated_output_mbps']} Mbps")
+
+    # 📌 **Neighbor tablolarından topolojiyi güncelle**
+    try:
+        with run_ledger.stage("enrich"):
+            topology.update_topology({"data": all_data})
+    except Exception as e:
+        log_message("error", f"Topoloji güncellenirken hata oluştu: {e}")
+        run_ledger.record_failure("topology")
 
     end_time = time.time()
     log_message("info", f"Ağ veri toplama işlemi tamamlandı. Toplam süre: {end_time - start_time:.2f} saniye")
 
 
 if __name__ == "__main__":
-    fetch_network_data()
+    parser = argparse.ArgumentParser(description="Switch port verilerini NetDB'den toplar.")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Cihazları kuyruk üzerinden bu kadar yerel worker process'ine dağıtır")
+    parser.add_argument("--worker", action="store_true", help="Kuyruktan iş alan worker olarak çalışır")
+    parser.add_argument("--sweep", help="Worker sadece bu turun işlerini alır")
+    parser.add_argument("--profile", action="store_true",
+                        help="cProfile ve tracemalloc çıktısını log dizinine yazar (NETINFO_PROFILE ile de açılır)")
+    args = parser.parse_args()
+
+    setup_logging()
+    log_message("info", f"Main Data Last Modified: {MAIN_DATA_LAST_MODIFIED}")
+    if args.worker:
+        with run_ledger.job_run("switch_ports.worker"):
+            with profiling.profiled("switch_ports.worker"):
+                run_worker(args.sweep)
+    else:
+        with run_ledger.job_run("switch_ports"):
+            with profiling.profiled("switch_ports"):
+                fetch_network_data(workers=args.workers)
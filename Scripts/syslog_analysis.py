@@ -1,9 +1,13 @@
 import json
 import os
 import re
+import time
 from collections import defaultdict, Counter
 from datetime import datetime, timedelta
 
+import profiling
+import run_ledger
+
 # 📂 File paths
 DATA_FOLDER = "D:/INTRANET/Netinfo/Data"
 LOG_FOLDER = "D:/INTRANET/Netinfo/Logs/Syslog_AI"
@@ -12,9 +16,6 @@ SYSLOG_RAW_FILE = os.path.join(DATA_FOLDER, "syslog_data.json")
 MAIN_DATA_FILE = os.path.join(DATA_FOLDER, "main_data.json")
 SUMMARY_LOG_FILE = os.path.join(LOG_FOLDER, "syslog_summary.json")
 
-# 🛠️ Ensure directories exist
-os.makedirs(LOG_FOLDER, exist_ok=True)
-
 # ❌ Logs to be ignored
 IGNORED_LOGS = ["SYS-6-LOGOUT", "SSH-5-SSH2", "SEC_LOGIN-5-LOGIN_SUCCESS", "test"]
 
@@ -106,14 +107,17 @@ def categorize_error(log_text):
 
 def process_syslog_data():
     """Processes syslog data, summarizes, and saves the report."""
-    raw_logs = load_json_file(SYSLOG_RAW_FILE, [])
-    main_data = load_json_file(MAIN_DATA_FILE, [])
+    with run_ledger.stage("parse"):
+        raw_logs = load_json_file(SYSLOG_RAW_FILE, [])
+        main_data = load_json_file(MAIN_DATA_FILE, [])
+    run_ledger.record_read(SYSLOG_RAW_FILE)
+    run_ledger.record_read(MAIN_DATA_FILE)
 
     if not raw_logs:
         print("⚠️ Warning: No data found in syslog_data.json!")
         return
 
-
+    enrich_start = time.perf_counter()
     device_summary = defaultdict(lambda: {
         "device_id": "",
         "device_name": "",
@@ -220,13 +224,23 @@ def process_syslog_data():
         else:
             summary["most_common_device_error_type"] = "No device-specific errors"
 
+    run_ledger.add_stage("enrich", time.perf_counter() - enrich_start)
+    run_ledger.count("syslog_entries", len(raw_logs))
+    run_ledger.count("devices", len(device_summary))
+
     # **Özet JSON dosyasına kaydet**
-    with open(SUMMARY_LOG_FILE, "w", encoding="utf-8") as f:
-        json.dump(device_summary, f, indent=2, ensure_ascii=False)
+    with run_ledger.stage("write"):
+        # 🛠️ Ensure directories exist
+        os.makedirs(os.path.dirname(SUMMARY_LOG_FILE), exist_ok=True)
+        with open(SUMMARY_LOG_FILE, "w", encoding="utf-8") as f:
+            json.dump(device_summary, f, indent=2, ensure_ascii=False)
+    run_ledger.record_write(SUMMARY_LOG_FILE)
 
     print(f"Summary log report generated: {SUMMARY_LOG_FILE}")
 
 
 
-
-process_syslog_data()
+if __name__ == "__main__":
+    with run_ledger.job_run("syslog_analysis"):
+        with profiling.profiled("syslog_analysis"):
+            process_syslog_data()
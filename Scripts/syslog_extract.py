@@ -5,6 +5,9 @@ from datetime import datetime, timedelta
 import pytz
 from dotenv import load_dotenv
 
+import profiling
+import run_ledger
+
 load_dotenv()
 
 # Proxy ayarları
@@ -19,7 +22,7 @@ MAX_FILE_SIZE_MB = 100  # Maksimum dosya boyutu kontrolü
 MAX_LOG_AGE_HOURS = 48  # Maksimum log yaşı
 
 # API bağlantı bilgileri
-base_url = "https://statseeker.emea.fedex.com/api/v2.1/"
+base_url = os.environ.get("STATSEEKER_API_URL", "https://statseeker.emea.fedex.com/api/v2.1").rstrip("/") + "/"
 user = os.environ.get("STATSEEKER_USERNAME")
 password = os.environ.get("STATSEEKER_PASSWORD")
 SSL_VERIFY = os.environ.get("SSL_CERT_PATH", True)
@@ -81,7 +84,8 @@ def fetch_syslog_data():
     url = urls["syslog"]
     try:
         log_message(f"📡 API çağrısı yapılıyor... (Limit: {SYSLOG_LIMIT})")
-        response = requests.get(url, auth=(user, password), verify=SSL_VERIFY, timeout=60)
+        with run_ledger.timed_request(url) as call:
+            response = call["response"] = requests.get(url, auth=(user, password), verify=SSL_VERIFY, timeout=60)
 
         # HTTP Yanıt Kontrolü
         if response.status_code != 200:
@@ -201,6 +205,8 @@ def save_syslog_data(new_logs):
         try:
             with open(syslog_json_file, "w", encoding="utf-8") as f:
                 json.dump(unique_logs, f, indent=2)
+            run_ledger.record_write(syslog_json_file)
+            run_ledger.count("syslog_new", len(filtered_logs))
 
             final_size_mb = get_file_size_mb(syslog_json_file)
             log_message(f"🟢 {len(filtered_logs)} yeni syslog mesajı eklendi")
@@ -217,8 +223,13 @@ if __name__ == "__main__":
     log_message("🚀 Optimized Syslog Extract başlatılıyor...")
     log_message(f"⚙️ Ayarlar: Limit={SYSLOG_LIMIT}, Max Size={MAX_FILE_SIZE_MB}MB, Max Age={MAX_LOG_AGE_HOURS}h")
 
-    syslog_data = fetch_syslog_data()
-    if syslog_data:
-        save_syslog_data(syslog_data)
-    else:
-        log_message("❌ Syslog verisi alınamadı")
+    with run_ledger.job_run("syslog_extract"):
+        with profiling.profiled("syslog_extract"):
+            with run_ledger.stage("fetch"):
+                syslog_data = fetch_syslog_data()
+            if syslog_data:
+                with run_ledger.stage("write"):
+                    save_syslog_data(syslog_data)
+            else:
+                log_message("❌ Syslog verisi alınamadı")
+                run_ledger.record_failure("fetch")
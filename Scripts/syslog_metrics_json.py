@@ -7,6 +7,9 @@ import pytz
 from collections import defaultdict, Counter
 import re
 
+import profiling
+import run_ledger
+
 # Dosya yolları
 DATA_DIR = "D:/INTRANET/Netinfo/Data"
 SYSLOG_RAW_FILE = os.path.join(DATA_DIR, "syslog_data.json")
@@ -65,7 +68,8 @@ def load_json_file(file_path, default_data=None):
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
-            return data if data else default_data
+        run_ledger.record_read(file_path)
+        return data if data else default_data
     except (json.JSONDecodeError, Exception) as e:
         print(f"⚠️ {file_path} dosyası bozuk: {e}")
         return default_data
@@ -76,9 +80,11 @@ def save_json_file(file_path, data):
     try:
         with open(file_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
+        run_ledger.record_write(file_path)
         return True
     except Exception as e:
         print(f"❌ {file_path} kaydedilemedi: {e}")
+        run_ledger.record_failure("write")
         return False
 
 
@@ -405,29 +411,35 @@ def cleanup_old_raw_logs():
 
 
 if __name__ == "__main__":
-    print("🚀 JSON tabanlı Syslog Metrics işlemi başlıyor...")
-
-    # 1. Ham logları saatlik metriklere dönüştür
-    print("\n📊 1. Ham loglar işleniyor...")
-    process_raw_logs_to_hourly_metrics()
-
-    # 2. Saatlik özet oluştur
-    print("\n⏰ 2. Saatlik özet oluşturuluyor...")
-    generate_hourly_summary()
-
-    # 3. Günlük özet oluştur
-    print("\n📅 3. Günlük özet oluşturuluyor...")
-    generate_daily_summary()
-
-    # 4. Trend analizi göster
-    print("\n📈 4. Trend analizi...")
-    trends = get_trend_analysis(7)
-    print(f"   Bugün: {trends.get('today_errors', 0)} hata")
-    print(f"   Dün: {trends.get('yesterday_errors', 0)} hata")
-    print(f"   Trend: {trends.get('trend_direction', 'bilinmiyor')} (%{trends.get('change_percentage', 0)})")
-
-    # 5. Eski ham logları temizle
-    print("\n🧹 5. Eski loglar temizleniyor...")
-    cleanup_old_raw_logs()
-
-    print("\n✅ Tüm işlemler tamamlandı!")
+    with run_ledger.job_run("syslog_metrics"):
+        with profiling.profiled("syslog_metrics"):
+            print("🚀 JSON tabanlı Syslog Metrics işlemi başlıyor...")
+
+            # 1. Ham logları saatlik metriklere dönüştür
+            print("\n📊 1. Ham loglar işleniyor...")
+            with run_ledger.stage("parse"):
+                process_raw_logs_to_hourly_metrics()
+
+            # 2. Saatlik özet oluştur
+            print("\n⏰ 2. Saatlik özet oluşturuluyor...")
+            with run_ledger.stage("enrich"):
+                generate_hourly_summary()
+
+            # 3. Günlük özet oluştur
+            print("\n📅 3. Günlük özet oluşturuluyor...")
+            with run_ledger.stage("enrich"):
+                generate_daily_summary()
+
+            # 4. Trend analizi göster
+            print("\n📈 4. Trend analizi...")
+            trends = get_trend_analysis(7)
+            print(f"   Bugün: {trends.get('today_errors', 0)} hata")
+            print(f"   Dün: {trends.get('yesterday_errors', 0)} hata")
+            print(f"   Trend: {trends.get('trend_direction', 'bilinmiyor')} (%{trends.get('change_percentage', 0)})")
+
+            # 5. Eski ham logları temizle
+            print("\n🧹 5. Eski loglar temizleniyor...")
+            with run_ledger.stage("cleanup"):
+                cleanup_old_raw_logs()
+
+            print("\n✅ Tüm işlemler tamamlandı!")
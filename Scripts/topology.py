@@ -0,0 +1,295 @@
+import json
+import logging
+import os
+import re
+from collections import deque
+from datetime import datetime
+
+import pytz
+
+# 📂 Dosya yolları
+DATA_DIR = "D:/INTRANET/Netinfo/Data"
+MAIN_DATA_FILE = os.path.join(DATA_DIR, "main_data.json")
+ROUTER_DATA_FILE = os.path.join(DATA_DIR, "main_router_data.json")
+AP_INVENTORY_FILE = os.path.join(DATA_DIR, "access_point_inventory.json")
+DEVICE_INVENTORY_FILE = os.path.join(DATA_DIR, "network_device_inventory.json")
+TOPOLOGY_FILE = os.path.join(DATA_DIR, "topology.json")
+
+TURKEY_TZ = pytz.timezone("Europe/Istanbul")
+
+# Hostname kalıpları (statseeker_base.extract_location ile aynı isimlendirme)
+ROUTER_PATTERN = re.compile(r"ttr|vz\d", re.IGNORECASE)
+CORE_SWITCH_PATTERN = re.compile(r"csw", re.IGNORECASE)
+SWITCH_PATTERN = re.compile(r"sw", re.IGNORECASE)
+AP_PATTERN = re.compile(r"SEG", re.IGNORECASE)
+
+logger = logging.getLogger(__name__)
+
+# load_topology için mtime bazlı önbellek
+_topology_cache = {"mtime": None, "path": None, "topology": None}
+
+
+def normalize_hostname(hostname):
+    """Neighbor tablolarındaki FQDN/boşluk farklarını temizler."""
+    if not isinstance(hostname, str):
+        return None
+    hostname = hostname.strip()
+    if not hostname or hostname == "N/A":
+        return None
+    return hostname.split(".")[0]
+
+
+def classify_device(hostname, device_type=None):
+    """Cihaz tipini inventory bilgisinden, yoksa hostname'den belirler."""
+    if device_type in ("Router", "Switch", "Access Point"):
+        return device_type
+    if AP_PATTERN.search(hostname):
+        return "Access Point"
+    if ROUTER_PATTERN.search(hostname):
+        return "Router"
+    if SWITCH_PATTERN.search(hostname):
+        return "Switch"
+    return "Unknown"
+
+
+def load_json(file_path, default=None):
+    """JSON dosyasını güvenli şekilde yükler."""
+    if not os.path.exists(file_path):
+        return default
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        logger.error(f"{file_path} okunamadı: {e}")
+        return default
+
+
+def iter_neighbor_rows(main_data=None, router_data=None):
+    """main_data (switch) ve main_router_data (router) portlarından neighbor satırlarını üretir."""
+    if main_data:
+        devices = main_data.get("data", main_data) if isinstance(main_data, dict) else {}
+        for hostname, device in devices.items():
+            if not isinstance(device, dict):
+                continue
+            for port in device.get("ports", []):
+                if isinstance(port, dict):
+                    yield hostname, port
+
+    for device in router_data or []:
+        if not isinstance(device, dict):
+            continue
+        for port in device.get("ports", []):
+            if isinstance(port, dict):
+                yield device.get("hostname"), port
+
+
+def build_topology(main_data=None, router_data=None, ap_inventory=None, device_inventory=None):
+    """
+    Neighbor tablolarından komşuluk grafiği kurar.
+    Cihazlar node, neighbor satırları link (local/remote port) olur; core'dan başlayan
+    BFS ile her cihazın uplink'i (parent) ve altındaki cihazlar (children) indekslenir.
+    """
+    nodes = {}
+    adjacency = {}
+    links = {}
+    port_state = {}
+
+    def add_node(hostname, device_type=None, deviceid=None):
+        node = nodes.setdefault(hostname, {"type": classify_device(hostname), "deviceid": None})
+        if device_type:
+            node["type"] = classify_device(hostname, device_type)
+        if deviceid is not None:
+            node["deviceid"] = deviceid
+        adjacency.setdefault(hostname, {})
+
+    for device in device_inventory or []:
+        hostname = normalize_hostname(device.get("hostname"))
+        if hostname:
+            add_node(hostname, device.get("device_type"), device.get("deviceid"))
+
+    for ap in ap_inventory or []:
+        hostname = normalize_hostname(ap.get("hostname"))
+        if hostname:
+            add_node(hostname, "Access Point", ap.get("deviceid"))
+
+    for hostname, port in iter_neighbor_rows(main_data, router_data):
+        local = normalize_hostname(hostname)
+        remote = normalize_hostname(port.get("neighbor_hostname"))
+        if not local or not remote or local == remote:
+            continue
+        add_node(local)
+        add_node(remote)
+
+        local_port = port.get("interface_name", "N/A")
+        remote_port = port.get("neighbor_port", "N/A")
+
+        # Aynı link iki uçtan da raporlanabilir; tek kayıt tut
+        key = tuple(sorted([(local, local_port), (remote, remote_port)]))
+        links.setdefault(key, {
+            "a": local, "a_port": local_port,
+            "b": remote, "b_port": remote_port
+        })
+
+        adjacency[local].setdefault(remote, [local_port, remote_port])
+        adjacency[remote].setdefault(local, [remote_port, local_port])
+        port_state[(local, local_port)] = {
+            "link_status": port.get("link_status", "unknown"),
+            "is_up": port.get("is_up", False)
+        }
+
+    # Core: router'lar; router görünmeyen bileşenlerde core switch'ler
+    cores = sorted(h for h, n in nodes.items() if n["type"] == "Router")
+    parents = {}
+    depth = {}
+    bfs(adjacency, cores, parents, depth)
+
+    orphan_cores = sorted(h for h in nodes if h not in depth and CORE_SWITCH_PATTERN.search(h))
+    if orphan_cores:
+        bfs(adjacency, orphan_cores, parents, depth)
+        cores.extend(orphan_cores)
+
+    children = {}
+    for child, (parent, _, _) in parents.items():
+        children.setdefault(parent, []).append(child)
+
+    # AP → switch port indeksi (ap_data.load_main_data bunu kullanır)
+    ap_uplinks = {}
+    for hostname, node in nodes.items():
+        if node["type"] != "Access Point":
+            continue
+        # Sadece switch olmadığı bilinen komşular atlanır; hostname'inde "sw" olmayan ve inventory'de tipi
+        # bulunmayan switch'ler "Unknown" sınıflanır. Önce bilinen switch, sonra AP'yi kendi port
+        # tablosunda raporlayan (main_data'daki) komşu tercih edilir.
+        candidates = [
+            (neighbor, ports) for neighbor, ports in adjacency[hostname].items()
+            if nodes[neighbor]["type"] not in ("Access Point", "Router")
+        ]
+        candidates.sort(key=lambda item: (nodes[item[0]]["type"] != "Switch",
+                                          (item[0], item[1][1]) not in port_state))
+        for neighbor, (ap_port, switch_port) in candidates[:1]:
+            state = port_state.get((neighbor, switch_port), {})
+            ap_uplinks[hostname] = {
+                "connected_switch": neighbor,
+                "connected_port": switch_port,
+                "neighbor_port": ap_port,
+                "link_status": state.get("link_status", "unknown"),
+                "is_up": state.get("is_up", False)
+            }
+
+    return {
+        "generated_at": datetime.now(TURKEY_TZ).strftime("%d-%m-%Y %H:%M:%S"),
+        "nodes": nodes,
+        "links": list(links.values()),
+        "adjacency": adjacency,
+        "cores": cores,
+        "parents": parents,
+        "depth": depth,
+        "children": children,
+        "ap_uplinks": ap_uplinks
+    }
+
+
+def bfs(adjacency, roots, parents, depth):
+    """Çoklu kaynaklı BFS; parents[child] = [parent, child_port, parent_port]."""
+    queue = deque()
+    for root in roots:
+        if root in adjacency and root not in depth:
+            depth[root] = 0
+            queue.append(root)
+
+    while queue:
+        current = queue.popleft()
+        for neighbor, (local_port, remote_port) in adjacency[current].items():
+            if neighbor in depth:
+                continue
+            depth[neighbor] = depth[current] + 1
+            parents[neighbor] = [current, remote_port, local_port]
+            queue.append(neighbor)
+
+
+def save_topology(topology, file_path=TOPOLOGY_FILE):
+    """Topolojiyi önce geçici dosyaya, sonra atomik olarak yerine yazar."""
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(topology, f, ensure_ascii=False)
+    os.replace(tmp_path, file_path)
+
+
+def load_topology(file_path=TOPOLOGY_FILE):
+    """Kayıtlı topolojiyi yükler; dosya değişmediyse bellekteki kopyayı döndürür."""
+    try:
+        mtime = os.path.getmtime(file_path)
+    except OSError:
+        return None
+
+    if _topology_cache["path"] == file_path and _topology_cache["mtime"] == mtime:
+        return _topology_cache["topology"]
+
+    topology = load_json(file_path)
+    if topology is not None:
+        _topology_cache.update({"mtime": mtime, "path": file_path, "topology": topology})
+    return topology
+
+
+def uplink_path(topology, hostname):
+    """Cihazdan core'a kadar olan hop listesini döndürür (ilk eleman cihazın kendisi)."""
+    hostname = normalize_hostname(hostname)
+    if not topology or hostname not in topology.get("depth", {}):
+        return []
+
+    parents = topology["parents"]
+    path = [{"hostname": hostname, "port": None, "remote_port": None}]
+    current = hostname
+    while current in parents:
+        parent, local_port, parent_port = parents[current]
+        path[-1]["port"] = local_port
+        path[-1]["remote_port"] = parent_port
+        path.append({"hostname": parent, "port": None, "remote_port": None})
+        current = parent
+    return path
+
+
+def devices_behind(topology, hostname):
+    """Cihazın altındaki (core'a uzak taraftaki) tüm cihazları döndürür."""
+    hostname = normalize_hostname(hostname)
+    if not topology:
+        return []
+
+    children = topology.get("children", {})
+    result = []
+    stack = list(children.get(hostname, []))
+    while stack:
+        child = stack.pop()
+        result.append(child)
+        stack.extend(children.get(child, []))
+    return result
+
+
+def ap_switch_port(topology, ap_hostname):
+    """AP'nin bağlı olduğu switch/port bilgisini indeks üzerinden döndürür."""
+    if not topology:
+        return None
+    return topology.get("ap_uplinks", {}).get(normalize_hostname(ap_hostname))
+
+
+def update_topology(main_data=None):
+    """Toplanan verilerden topolojiyi yeniden kurar ve kaydeder."""
+    if main_data is None:
+        main_data = load_json(MAIN_DATA_FILE, {})
+
+    topology = build_topology(
+        main_data=main_data,
+        router_data=load_json(ROUTER_DATA_FILE, []),
+        ap_inventory=load_json(AP_INVENTORY_FILE, []),
+        device_inventory=load_json(DEVICE_INVENTORY_FILE, [])
+    )
+    save_topology(topology)
+    logger.info(
+        f"Topoloji güncellendi: {len(topology['nodes'])} cihaz, {len(topology['links'])} link, "
+        f"{len(topology['cores'])} core, {len(topology['ap_uplinks'])} AP bağlantısı"
+    )
+    return topology
+
+
+if __name__ == "__main__":
+    update_topology()
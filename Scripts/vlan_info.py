@@ -7,6 +7,8 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 from cryptography.fernet import Fernet
 
+import netdb_broker
+
 # **📌 Dosya yolları**
 CREDENTIALS_FILE = "D:/INTRANET/Netinfo/Config/credentials.json"
 KEY_FILE = "D:/INTRANET/Netinfo/Config/secret.key"
@@ -14,8 +16,9 @@ LOG_DIR = "D:/INTRANET/Netinfo/logs/Latest_Logs"
 VLAN_DATA_FILE = "D:/INTRANET/Netinfo/Data/device_vlan_data.json"  # **📌 VLAN için yeni JSON dosyası**
 
 # **📌 API URL ve Proxy Ayarları**
-NETDB_AUTH_URL = "https://network-api.npe.fedex.com/v1/authorize"
-NETDB_BASE_URL = "https://network-api.npe.fedex.com/v1/device/"
+NETDB_API_URL = os.environ.get("NETDB_API_URL", "https://network-api.npe.fedex.com/v1").rstrip("/")  # Yerel test: fake_api_server.py
+NETDB_AUTH_URL = f"{NETDB_API_URL}/authorize"
+NETDB_BASE_URL = f"{NETDB_API_URL}/device/"
 
 PROXY = {
     "http": "http://eu-proxy.tntad.fedex.com:9090",
@@ -104,10 +107,13 @@ def fetch_vlan_data(hostname, bearer_token):
 
     log_message("info", f"📡 API çağrısı yapılıyor: {url}")
 
-    try:
+    def get():
         response = requests.get(url, headers=headers, timeout=60)
         response.raise_for_status()
         return response.json()
+
+    try:
+        return netdb_broker.fetch(url, get)
     except requests.HTTPError as e:
         log_message("error", f"❌ {hostname} için hata: {e.response.status_code} - {e.response.text}")
         return None
@@ -0,0 +1,187 @@
+import json
+import os
+import socket
+import sqlite3
+import time
+
+# 📂 Coordinator ve worker'ların paylaştığı kuyruk (başka hostlardaki worker'lar için ortak diskte olabilir)
+QUEUE_DB = "D:/INTRANET/Netinfo/Data/work_queue.db"
+
+# 📌 Queue Settings
+LEASE_SECONDS = 10 * 60        # Bu sürede tamamlanmayan iş (worker çöktü) başka worker'a verilir
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 30
+KEEP_SWEEPS_SECONDS = 24 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sweeps (
+    id TEXT PRIMARY KEY,
+    job TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sweep_id TEXT NOT NULL,
+    job TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    finished_at REAL,
+    UNIQUE (sweep_id, key)
+);
+CREATE INDEX IF NOT EXISTS items_lease ON items (job, status, position);
+"""
+
+
+def connect(db_path=QUEUE_DB):
+    """
+    autocommit bağlantısı; yazma işlemleri BEGIN IMMEDIATE ile sıralanır.
+    Ağ paylaşımında da çalışması için WAL yerine varsayılan journal modu kullanılır.
+    """
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def create_sweep(conn, job, items, now=None):
+    """
+    items: [(key, payload)] — sıra, işlerin dağıtılma önceliğidir.
+    Dönüş: sweep_id
+    """
+    now = now or time.time()
+    sweep_id = f"{job}-{time.strftime('%Y%m%d%H%M%S', time.localtime(now))}-{os.getpid()}"
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Eski turların kayıtları temizlenir
+        old = [row["id"] for row in conn.execute(
+            "SELECT id FROM sweeps WHERE created_at < ?", (now - KEEP_SWEEPS_SECONDS,))]
+        for old_id in old:
+            conn.execute("DELETE FROM items WHERE sweep_id = ?", (old_id,))
+            conn.execute("DELETE FROM sweeps WHERE id = ?", (old_id,))
+        conn.execute("INSERT INTO sweeps (id, job, created_at) VALUES (?, ?, ?)", (sweep_id, job, now))
+        conn.executemany(
+            "INSERT INTO items (sweep_id, job, key, payload, position) VALUES (?, ?, ?, ?, ?)",
+            [(sweep_id, job, key, json.dumps(payload, ensure_ascii=False), position)
+             for position, (key, payload) in enumerate(items)],
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return sweep_id
+
+
+def lease(conn, job, worker, sweep_id=None, lease_seconds=LEASE_SECONDS, now=None):
+    """
+    Sıradaki işi worker'a kiralar. Süresi dolmuş kiralar (çöken worker) yeniden dağıtılır;
+    deneme hakkı biten iş failed olarak kapatılır.
+    Dönüş: {"id", "key", "payload", "attempts"} ya da None
+    """
+    items = lease_batch(conn, job, worker, 1, sweep_id, lease_seconds, now)
+    return items[0] if items else None
+
+
+def lease_batch(conn, job, worker, limit, sweep_id=None, lease_seconds=LEASE_SECONDS, now=None):
+    """
+    Sıradaki en fazla limit işi tek işlemde worker'a kiralar; kurallar lease() ile aynıdır.
+    Dönüş: [{"id", "key", "payload", "attempts"}, ...] (iş yoksa boş liste)
+    """
+    now = now or time.time()
+    sweep_filter = "AND sweep_id = ?" if sweep_id else ""
+    params = (job, now, now) + ((sweep_id,) if sweep_id else ())
+    leased = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        while len(leased) < limit:
+            row = conn.execute(
+                f"""SELECT id, key, payload, status, attempts FROM items
+                    WHERE job = ? AND ((status = 'pending' AND available_at <= ?)
+                                       OR (status = 'leased' AND lease_until < ?)) {sweep_filter}
+                    ORDER BY position LIMIT 1""",
+                params,
+            ).fetchone()
+            if row is None:
+                break
+            if row["status"] == "leased" and row["attempts"] >= MAX_ATTEMPTS:
+                conn.execute(
+                    "UPDATE items SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                    ("Kira süresi doldu (worker yanıt vermedi)", now, row["id"]),
+                )
+                continue
+            conn.execute(
+                """UPDATE items SET status = 'leased', attempts = attempts + 1,
+                                    lease_owner = ?, lease_until = ? WHERE id = ?""",
+                (worker, now + lease_seconds, row["id"]),
+            )
+            leased.append({"id": row["id"], "key": row["key"], "payload": json.loads(row["payload"]),
+                           "attempts": row["attempts"] + 1})
+        conn.execute("COMMIT")
+        return leased
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def complete(conn, item_id, worker, result):
+    """Kira hâlâ bu worker'daysa sonucu yazar; kira başkasına geçtiyse False döner."""
+    cursor = conn.execute(
+        """UPDATE items SET status = 'done', result = ?, error = NULL, finished_at = ?
+           WHERE id = ? AND status = 'leased' AND lease_owner = ?""",
+        (json.dumps(result, ensure_ascii=False), time.time(), item_id, worker),
+    )
+    return cursor.rowcount == 1
+
+
+def fail(conn, item_id, worker, error, retry_delay=RETRY_DELAY):
+    """Deneme hakkı kaldıysa iş retry_delay sonra tekrar dağıtılır, yoksa failed olur."""
+    now = time.time()
+    cursor = conn.execute(
+        """UPDATE items SET
+               status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+               finished_at = CASE WHEN attempts >= ? THEN ? ELSE NULL END,
+               available_at = ?, error = ?, lease_owner = NULL, lease_until = NULL
+           WHERE id = ? AND status = 'leased' AND lease_owner = ?""",
+        (MAX_ATTEMPTS, MAX_ATTEMPTS, now, now + retry_delay, str(error)[:500], item_id, worker),
+    )
+    return cursor.rowcount == 1
+
+
+def sweep_counts(conn, sweep_id):
+    counts = dict.fromkeys(("pending", "leased", "done", "failed"), 0)
+    for row in conn.execute("SELECT status, COUNT(*) AS n FROM items WHERE sweep_id = ? GROUP BY status",
+                            (sweep_id,)):
+        counts[row["status"]] = row["n"]
+    return counts
+
+
+def is_finished(conn, sweep_id):
+    counts = sweep_counts(conn, sweep_id)
+    return counts["pending"] == 0 and counts["leased"] == 0
+
+
+def finished_items(conn, sweep_id, seen=()):
+    """
+    seen'de olmayan biten işler: [{"id", "key", "status", "result", "error"}]
+    İşler id sırasıyla bitmediği için imleç yerine görülmüş id kümesi kullanılır.
+    """
+    ids = [row["id"] for row in conn.execute(
+        "SELECT id FROM items WHERE sweep_id = ? AND status IN ('done', 'failed')", (sweep_id,))
+        if row["id"] not in seen]
+    items = []
+    for item_id in ids:
+        row = conn.execute("SELECT id, key, status, result, error FROM items WHERE id = ?", (item_id,)).fetchone()
+        items.append({"id": row["id"], "key": row["key"], "status": row["status"],
+                      "result": json.loads(row["result"]) if row["result"] else None, "error": row["error"]})
+    return items
@@ -1,7 +1,14 @@
-﻿from flask import Flask, request, jsonify
+﻿from flask import Flask, Response, request, jsonify, stream_with_context
 import requests
-import pandas as pd
+import csv
+import io
+import json
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,42 +17,221 @@ username = os.environ.get("STATSEEKER_USERNAME")
 password = os.environ.get("STATSEEKER_PASSWORD")
 SSL_VERIFY = os.environ.get("SSL_CERT_PATH", True)
 
+STATSEEKER_API_URL = os.environ.get("STATSEEKER_API_URL", "https://statseeker.emea.fedex.com/api/v2.1").rstrip("/")
+STATSEEKER_PORT_URL = f"{STATSEEKER_API_URL}/cdt_port/"
+REPORT_FIELDS = "deviceid,name,ifTitle,ifSpeed,ifDescr,ifAdminStatus,if90day"
+REQUEST_TIMEOUT = (5, 30)
+
+# 📌 Bulk Report Settings
+BULK_PAGE_SIZE = 1000       # Statseeker'dan sayfa başına port satırı
+BULK_DEVICEID_CHUNK = 200   # URL uzunluğu için tek filtredeki en fazla deviceid
+
+# 📌 Report Cache Settings
+CACHE_TTL = 5 * 60          # Aynı cihaz raporu bu süre boyunca Statseeker'a tekrar sorulmaz
+CACHE_MAX_ENTRIES = 256     # En uzun süredir kullanılmayan rapor önce atılır
+
+REPORT_COLUMNS = {
+    "deviceid": "Device ID",
+    "name": "Interface",
+    "ifTitle": "Tanım",
+    "ifSpeed": "Hız (Mbps)",
+    "ifDescr": "Açıklama",
+    "ifAdminStatus": "Durum",
+    "if90day": "90 Gün",
+}
+
 app = Flask(__name__)
 
+
+class ReportError(Exception):
+    pass
+
+
+def create_session():
+    """Tüm istekler tek bağlantı havuzunu kullanır; her çağrıda TLS el sıkışması yapılmaz."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.auth = (username, password)
+    session.verify = SSL_VERIFY
+    return session
+
+
+session = create_session()
+
+_cache = OrderedDict()      # deviceid -> (expires_at, report)
+_in_flight = {}             # deviceid -> Future
+_cache_lock = threading.Lock()
+
+
+def transform_ports(data_objects):
+    """Statseeker port satırlarını rapor kolonlarına çevirir."""
+    result = []
+    for row in data_objects:
+        record = {label: row.get(field) for field, label in REPORT_COLUMNS.items()}
+        record["Hız (Mbps)"] = int(row.get("ifSpeed") or 0) // 1000000
+        record["90 Gün"] = "Aktif" if row.get("if90day") == 1 else "Aktif değil"
+        result.append(record)
+    return result
+
+
+def fetch_report(deviceid):
+    try:
+        response = session.get(f"{STATSEEKER_PORT_URL}?fields={REPORT_FIELDS}&deviceid={deviceid}",
+                               timeout=REQUEST_TIMEOUT)
+    except requests.RequestException:
+        raise ReportError("Statseeker API isteği başarısız")
+    if response.status_code != 200:
+        raise ReportError("Statseeker API isteği başarısız")
+
+    try:
+        return transform_ports(response.json()["data"]["objects"][0]["data"])
+    except Exception as e:
+        raise ReportError(f"Veri işleme hatası: {str(e)}")
+
+
+def get_cached_report(deviceid):
+    """
+    TTL süresindeki rapor önbellekten döner. Aynı cihaz için süren bir istek varsa
+    eş zamanlı çağrılar onun sonucunu bekler; Statseeker'a tek istek gider.
+    Hatalar önbelleğe alınmaz.
+    """
+    with _cache_lock:
+        entry = _cache.get(deviceid)
+        if entry and entry[0] > time.monotonic():
+            _cache.move_to_end(deviceid)
+            return entry[1]
+        future = _in_flight.get(deviceid)
+        leader = future is None
+        if leader:
+            future = _in_flight[deviceid] = Future()
+
+    if not leader:
+        return future.result()
+
+    try:
+        report = fetch_report(deviceid)
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(report)
+        with _cache_lock:
+            _cache[deviceid] = (time.monotonic() + CACHE_TTL, report)
+            _cache.move_to_end(deviceid)
+            while len(_cache) > CACHE_MAX_ENTRIES:
+                _cache.popitem(last=False)
+        return report
+    finally:
+        with _cache_lock:
+            _in_flight.pop(deviceid, None)
+
+
+def iter_port_pages(deviceids=None, group=None):
+    """
+    cdt_port'u deviceid listesi (IN filtresi) ve/veya Statseeker grubu ile sayfa sayfa çeker.
+    Her sayfa rapor kolonlarına çevrilmiş satır listesi olarak döner.
+    """
+    base_query = f"fields={REPORT_FIELDS}&links=none&limit={BULK_PAGE_SIZE}"
+    if group:
+        base_query += f"&groups={requests.utils.quote(group)}"
+    chunks = [deviceids[i:i + BULK_DEVICEID_CHUNK] for i in range(0, len(deviceids), BULK_DEVICEID_CHUNK)] \
+        if deviceids else [None]
+
+    for chunk in chunks:
+        query = base_query + (f"&deviceid_filter=IN({','.join(chunk)})" if chunk else "")
+        offset = 0
+        while True:
+            try:
+                response = session.get(f"{STATSEEKER_PORT_URL}?{query}&offset={offset}", timeout=REQUEST_TIMEOUT)
+            except requests.RequestException:
+                raise ReportError("Statseeker API isteği başarısız")
+            if response.status_code != 200:
+                raise ReportError("Statseeker API isteği başarısız")
+            try:
+                objects = response.json()["data"]["objects"]
+                rows = objects[0]["data"] if objects else []
+            except Exception as e:
+                raise ReportError(f"Veri işleme hatası: {str(e)}")
+
+            yield transform_ports(rows)
+            if len(rows) < BULK_PAGE_SIZE:
+                break
+            offset += BULK_PAGE_SIZE
+
+
+def ndjson_lines(pages):
+    for page in pages:
+        yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in page)
+
+
+def csv_lines(pages):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(REPORT_COLUMNS.values()))
+    # Excel Türkçe karakterleri BOM ile doğru açar
+    buffer.write("\ufeff")
+    writer.writeheader()
+    for page in pages:
+        writer.writerows(page)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+@app.route('/Netinfo/api/get_report_bulk', methods=['GET'])
+def get_report_bulk():
+    """
+    Çok cihazlı port raporu: ?deviceids=1,2,3 (ya da tekrarlı deviceid=) ve/veya ?group=<Statseeker grubu>
+    format=ndjson (varsayılan) | csv, unused=1 ile sadece 90 gündür aktif olmayan portlar.
+    Sonuç sayfa sayfa akıtılır; tüm filo tek bir sayfalı sorguyla çekilir.
+    """
+    deviceids = [d.strip() for value in request.args.getlist('deviceid') + request.args.getlist('deviceids')
+                 for d in value.split(',') if d.strip()]
+    group = request.args.get('group')
+    output_format = request.args.get('format', 'ndjson').lower()
+    unused_only = request.args.get('unused', '').lower() in ('1', 'true', 'yes')
+
+    if not deviceids and not group:
+        return jsonify({"error": "deviceids veya group gerekli"}), 400
+    if not all(d.isdigit() for d in deviceids):
+        return jsonify({"error": "Device ID sayısal olmalı"}), 400
+    if output_format not in ('ndjson', 'csv'):
+        return jsonify({"error": "format ndjson ya da csv olmalı"}), 400
+
+    pages = iter_port_pages(list(dict.fromkeys(deviceids)), group)
+    if unused_only:
+        pages = ([row for row in page if row["90 Gün"] != "Aktif"] for page in pages)
+
+    # İlk sayfa akış başlamadan çekilir; Statseeker hatası düzgün HTTP hatası olarak döner
+    try:
+        first_page = next(pages)
+    except ReportError as e:
+        return jsonify({"error": str(e)}), 500
+
+    def all_pages():
+        yield first_page
+        try:
+            yield from pages
+        except ReportError as e:
+            app.logger.error(f"Bulk rapor akışı yarıda kesildi: {e}")
+
+    if output_format == 'csv':
+        return Response(stream_with_context(csv_lines(all_pages())), mimetype='text/csv',
+                        headers={"Content-Disposition": "attachment; filename=port_report.csv"})
+    return Response(stream_with_context(ndjson_lines(all_pages())), mimetype='application/x-ndjson')
+
+
 @app.route('/Netinfo/api/get_report', methods=['GET'])
 def get_report():
     deviceid = request.args.get('deviceid')
     if not deviceid:
         return jsonify({"error": "Device ID gerekli"}), 400
 
-    api_url = f"https://statseeker.emea.fedex.com/api/v2.1/cdt_port/?fields=deviceid,name,ifTitle,ifSpeed,ifDescr,ifAdminStatus,if90day&deviceid={deviceid}"
-
-    response = requests.get(api_url, auth=(username, password), verify=SSL_VERIFY)
-    if response.status_code != 200:
-        return jsonify({"error": "Statseeker API isteği başarısız"}), 500
-
     try:
-        data = response.json()
-        data_objects = data["data"]["objects"][0]["data"]
-        df = pd.DataFrame(data_objects)
-
-        df["ifSpeed"] = df["ifSpeed"].fillna(0).astype(int) // 1000000
-        df["if90day"] = df["if90day"].apply(lambda x: "Aktif" if x == 1 else "Aktif değil")
-
-        result = df.rename(columns={
-            "deviceid": "Device ID",
-            "name": "Interface",
-            "ifTitle": "Tanım",
-            "ifSpeed": "Hız (Mbps)",
-            "ifDescr": "Açıklama",
-            "ifAdminStatus": "Durum",
-            "if90day": "90 Gün"
-        }).to_dict(orient="records")
-
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({"error": f"Veri işleme hatası: {str(e)}"}), 500
+        return jsonify(get_cached_report(deviceid))
+    except ReportError as e:
+        return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=False)
-
+    app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
@@ -0,0 +1,420 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+from collections import OrderedDict, deque
+from urllib.parse import parse_qs, unquote
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 📂 Collector'ların yazdığı JSON dosyaları
+DATA_DIR = os.environ.get("NETINFO_DATA_DIR", "D:/INTRANET/Netinfo/Data")
+SNAPSHOT_FILES = {
+    "main_data": "main_data.json",
+    "ap_inventory": "access_point_inventory.json",
+    "insight_summary": "insight_summary.json",
+}
+STATUS_EVENTS_FILE = os.path.join(DATA_DIR, "status_events.ndjson")   # statseeker_base yazar
+
+# 📌 API Settings
+RELOAD_INTERVAL = 2          # Dosya değişikliği kontrol aralığı (saniye)
+SLICE_CACHE_SIZE = 512       # Snapshot başına sıkıştırılmış dilim sayısı
+MIN_COMPRESS_SIZE = 1024     # Bundan küçük yanıtlar sıkıştırılmaz
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# 📌 SSE Settings
+EVENT_BUFFER_SIZE = 500      # Yeniden bağlanan istemciye Last-Event-ID'den sonrası buradan gönderilir
+CLIENT_QUEUE_SIZE = 100      # Yavaş istemcinin kuyruğu dolunca olaylar atılıp "resync" gönderilir
+HEARTBEAT_INTERVAL = 15
+
+
+def encode_variants(payload):
+    """Yanıtı bir kez serileştirip desteklenen tüm kodlamalarla sıkıştırır."""
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    variants = {"identity": body}
+    if len(body) >= MIN_COMPRESS_SIZE:
+        variants["gzip"] = gzip.compress(body, GZIP_LEVEL)
+        if brotli is not None:
+            variants["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return variants
+
+
+class Snapshot:
+    """Bir JSON dosyasının bellekteki son hali; dosya değişince yenisiyle değiştirilir."""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.signature = None
+        self.version = None
+        self.data = None
+        self.slices = OrderedDict()     # dilim anahtarı -> kodlanmış yanıtlar
+        self.pending = {}               # (version, dilim anahtarı) -> üretimi süren future
+
+    def changed(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return (stat.st_mtime_ns, stat.st_size) != self.signature
+
+    def read(self):
+        """Dosyayı okuyup tam snapshot'ı sıkıştırır (thread'de çalışır); bozuk dosyada hata fırlatır."""
+        stat = os.stat(self.path)
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw.decode("utf-8-sig"))
+        slices = OrderedDict([("", encode_variants(data))])
+        return (stat.st_mtime_ns, stat.st_size), hashlib.sha1(raw).hexdigest()[:16], data, slices
+
+    def swap(self, loaded):
+        # Event loop thread'inde çağrılır; istekler yarım güncellenmiş snapshot görmez
+        self.signature, self.version, self.data, self.slices = loaded
+
+    def etag(self, key):
+        return f'"{self.version}-{hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]}"'
+
+    async def encoded(self, key, build):
+        """
+        Dilim bu snapshot için daha önce üretildiyse önbellekten döner.
+        Yoksa dilim thread'de üretilip sıkıştırılır; büyük dilimler event loop'u (SSE, diğer istekler) bekletmez.
+        Aynı dilimi aynı anda isteyenler tek üretimi bekler.
+        """
+        variants = self.slices.get(key)
+        if variants is not None:
+            self.slices.move_to_end(key)
+            return variants
+
+        version = self.version
+        pending = self.pending.get((version, key))
+        if pending is None:
+            data = self.data
+            pending = asyncio.ensure_future(asyncio.to_thread(lambda: encode_variants(build(data))))
+            self.pending[(version, key)] = pending
+            pending.add_done_callback(lambda _: self.pending.pop((version, key), None))
+        variants = await pending
+
+        # Üretim sırasında dosya yenilendiyse eski snapshot'ın dilimi önbelleğe yazılmaz
+        if self.version == version:
+            self.slices[key] = variants
+            while len(self.slices) > SLICE_CACHE_SIZE:
+                # Tam snapshot (anahtar "") hiç atılmaz
+                oldest = next(k for k in self.slices if k)
+                del self.slices[oldest]
+        return variants
+
+
+snapshots = {name: Snapshot(name, os.path.join(DATA_DIR, file)) for name, file in SNAPSHOT_FILES.items()}
+
+
+async def reload_changed():
+    for snapshot in snapshots.values():
+        if snapshot.changed():
+            try:
+                snapshot.swap(await asyncio.to_thread(snapshot.read))
+            except (OSError, ValueError) as e:
+                # Yarım yazılmış dosya: önceki snapshot sunulmaya devam eder, sonraki kontrolde tekrar denenir
+                print(f"⚠️ {snapshot.name} yüklenemedi: {e}")
+
+
+class StatusFeed:
+    """
+    status_events.ndjson dosyasını kaldığı yerden okur ve yeni olayları bağlı SSE istemcilerine dağıtır.
+    Her istemcinin sınırlı kuyruğu vardır; yavaş bir istemci diğerlerini ve okuyucuyu bekletmez.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.file_id = None
+        self.last_seq = 0
+        self.rewound = False
+        self.buffer = deque(maxlen=EVENT_BUFFER_SIZE)
+        self.subscribers = set()
+
+    def read_new(self):
+        """Thread'de çalışır; sadece tamamlanmış satırları okur."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return []
+        # Dosya kırpıldıysa (yeni dosya ya da küçülmüş) baştan okunur; yayınlanmış olaylar seq ile elenir
+        file_id = (stat.st_dev, stat.st_ino)
+        offset = 0 if stat.st_size < self.offset or file_id != self.file_id else self.offset
+        self.file_id = file_id
+        self.rewound = offset == 0
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            chunk = f.read()
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        self.offset = offset + len(complete)
+        events = []
+        for line in complete.decode("utf-8").splitlines():
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+        return events
+
+    async def poll(self, publish=True):
+        events = await asyncio.to_thread(self.read_new)
+        seqs = [event["seq"] for event in events if isinstance(event.get("seq"), int)]
+        if self.rewound and seqs and max(seqs) < self.last_seq:
+            # Dosya silinip yeniden oluşturulmuş; sıra numaraları baştan başlar
+            self.last_seq = 0
+        for event in events:
+            seq = event.get("seq")
+            if not isinstance(seq, int) or seq <= self.last_seq:
+                continue
+            self.last_seq = seq
+            self.buffer.append(event)
+            if publish:
+                for queue in self.subscribers:
+                    self.deliver(queue, event)
+
+    @staticmethod
+    def deliver(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Geride kalan istemci: bekleyen olaylar atılır, istemci snapshot'ı yeniden çeker
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({"type": "resync"})
+
+    def subscribe(self, last_event_id=None):
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        if last_event_id:
+            ids = [event["id"] for event in self.buffer]
+            if last_event_id in ids:
+                for event in list(self.buffer)[ids.index(last_event_id) + 1:]:
+                    self.deliver(queue, event)
+            else:
+                self.deliver(queue, {"type": "resync"})
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+
+status_feed = StatusFeed(STATUS_EVENTS_FILE)
+
+
+async def watch_files():
+    while True:
+        await reload_changed()
+        await status_feed.poll()
+        await asyncio.sleep(RELOAD_INTERVAL)
+
+
+class NotFound(Exception):
+    pass
+
+
+# 📌 Dilimler
+def switch_list(data):
+    summary = data.get("switch_traffic_summary", {})
+    return {
+        "last_whole_data_updated": data.get("last_whole_data_updated"),
+        "switches": [
+            {"hostname": hostname, "last_updated": device.get("last_updated"),
+             "port_count": len(device.get("ports", [])), **summary.get(hostname, {})}
+            for hostname, device in data.get("data", {}).items()
+        ],
+    }
+
+
+def switch_detail(hostname):
+    def build(data):
+        device = data.get("data", {}).get(hostname)
+        if device is None:
+            raise NotFound(f"{hostname} bulunamadı")
+        return device
+    return build
+
+
+def switch_ports(hostname, filters):
+    def build(data):
+        device = switch_detail(hostname)(data)
+        return [port for port in device.get("ports", [])
+                if all(str(port.get(field, "")).lower() == value.lower() for field, value in filters.items())]
+    return build
+
+
+def ap_list(filters):
+    def build(data):
+        return [ap for ap in data
+                if all(str(ap.get(field, "")).lower() == value.lower() for field, value in filters.items())]
+    return build
+
+
+def ap_detail(deviceid):
+    def build(data):
+        for ap in data:
+            if str(ap.get("deviceid")) == deviceid:
+                return ap
+        raise NotFound(f"{deviceid} bulunamadı")
+    return build
+
+
+def route(path, query):
+    """(snapshot adı, dilim anahtarı, dilim üretici) döndürür. Anahtar "" tam snapshot'tır."""
+    parts = [unquote(p) for p in path.strip("/").split("/")]
+    if parts[:2] != ["Netinfo", "data"]:
+        raise NotFound(path)
+    parts = parts[2:]
+    filters = {k: v[-1] for k, v in sorted(query.items())}
+    filter_key = "&".join(f"{k}={v}" for k, v in filters.items())
+
+    if len(parts) == 1 and parts[0] in snapshots:
+        return parts[0], "", None
+    if parts == ["switches"]:
+        return "main_data", "switches", switch_list
+    if len(parts) == 2 and parts[0] == "switches":
+        return "main_data", f"switch:{parts[1]}", switch_detail(parts[1])
+    if len(parts) == 3 and parts[0] == "switches" and parts[2] == "ports":
+        return "main_data", f"ports:{parts[1]}?{filter_key}", switch_ports(parts[1], filters)
+    if parts == ["aps"]:
+        return "ap_inventory", f"aps?{filter_key}", ap_list(filters)
+    if len(parts) == 2 and parts[0] == "aps":
+        return "ap_inventory", f"ap:{parts[1]}", ap_detail(parts[1])
+    raise NotFound(path)
+
+
+def choose_encoding(accept_encoding, variants):
+    accepted = {item.split(";")[0].strip() for item in accept_encoding.split(",")}
+    for encoding in ("br", "gzip"):
+        if encoding in variants and encoding in accepted:
+            return encoding
+    return "identity"
+
+
+async def send(send_fn, status, body=b"", headers=()):
+    await send_fn({"type": "http.response.start", "status": status,
+                   "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers]})
+    await send_fn({"type": "http.response.body", "body": body})
+
+
+async def send_error(send_fn, status, message):
+    body = json.dumps({"error": message}, ensure_ascii=False).encode("utf-8")
+    await send(send_fn, status, body, [("content-type", "application/json; charset=utf-8")])
+
+
+async def lifespan(receive, send_fn):
+    watcher = None
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await reload_changed()
+            await status_feed.poll(publish=False)     # Geçmiş olaylar sadece tampona alınır
+            watcher = asyncio.create_task(watch_files())
+            await send_fn({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if watcher:
+                watcher.cancel()
+            await send_fn({"type": "lifespan.shutdown.complete"})
+            return
+
+
+def sse_message(event):
+    if event.get("type") == "resync":
+        return b"event: resync\ndata: {}\n\n"
+    data = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {event['id']}\nevent: status\ndata: {data}\n\n".encode("utf-8")
+
+
+async def wait_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def stream_status(receive, send_fn, headers):
+    """
+    GET /Netinfo/data/status/stream — durum değişikliklerini Server-Sent Events olarak iletir.
+    Tarayıcı yeniden bağlanınca Last-Event-ID'den sonraki olaylar tampondan gönderilir;
+    tampon yetmezse "resync" olayı ile istemci tam veriyi yeniden çeker.
+    """
+    queue = status_feed.subscribe(headers.get("last-event-id"))
+    await send_fn({"type": "http.response.start", "status": 200, "headers": [
+        (b"content-type", b"text/event-stream; charset=utf-8"),
+        (b"cache-control", b"no-cache"),
+        (b"x-accel-buffering", b"no"),
+    ]})
+
+    disconnected = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        await send_fn({"type": "http.response.body", "body": b"retry: 5000\n\n", "more_body": True})
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({getter, disconnected}, timeout=HEARTBEAT_INTERVAL,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                getter.cancel()
+                break
+            body = sse_message(getter.result()) if getter in done else b": ping\n\n"
+            if getter not in done:
+                getter.cancel()
+            await send_fn({"type": "http.response.body", "body": body, "more_body": True})
+    except OSError:
+        pass
+    finally:
+        status_feed.unsubscribe(queue)
+        disconnected.cancel()
+
+
+async def app(scope, receive, send_fn):
+    """
+    ASGI uygulaması (uvicorn data_api:app). Tüm yanıtlar ETag taşır; If-None-Match eşleşirse 304 döner.
+    GET /Netinfo/data/{main_data|ap_inventory|insight_summary}
+    GET /Netinfo/data/switches, /switches/{hostname}, /switches/{hostname}/ports?vlan_id=..&is_up=..
+    GET /Netinfo/data/aps?city=.., /aps/{deviceid}
+    GET /Netinfo/data/status/stream (SSE)
+    """
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send_fn)
+    if scope["type"] != "http":
+        return
+    if scope["method"] not in ("GET", "HEAD"):
+        return await send_error(send_fn, 405, "Sadece GET desteklenir")
+
+    headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+    if scope["path"].rstrip("/") == "/Netinfo/data/status/stream":
+        return await stream_status(receive, send_fn, headers)
+    try:
+        name, key, build = route(scope["path"], parse_qs(scope["query_string"].decode("latin-1")))
+    except NotFound:
+        return await send_error(send_fn, 404, "Bulunamadı")
+
+    snapshot = snapshots[name]
+    if snapshot.data is None:
+        return await send_error(send_fn, 503, f"{name} henüz yüklenmedi")
+
+    etag = snapshot.etag(key)
+    common = [("etag", etag), ("cache-control", "no-cache"), ("vary", "Accept-Encoding")]
+    if etag in [tag.strip() for tag in headers.get("if-none-match", "").split(",")]:
+        return await send(send_fn, 304, headers=common)
+
+    try:
+        variants = await snapshot.encoded(key, build)
+    except NotFound as e:
+        return await send_error(send_fn, 404, str(e))
+
+    encoding = choose_encoding(headers.get("accept-encoding", ""), variants)
+    body = variants[encoding]
+    response_headers = common + [("content-type", "application/json; charset=utf-8"),
+                                 ("content-length", str(len(body)))]
+    if encoding != "identity":
+        response_headers.append(("content-encoding", encoding))
+    await send(send_fn, 200, b"" if scope["method"] == "HEAD" else body, response_headers)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run("data_api:app", host="0.0.0.0", port=5001, log_level="info")
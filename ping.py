@@ -1,8 +1,10 @@
 ﻿import requests
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from cryptography.fernet import Fernet
+from requests.adapters import HTTPAdapter
 
 # 📁 Dosya yolları
 CREDENTIALS_FILE = "D:/INTRANET/Netinfo/Config/credentials.json"
@@ -11,8 +13,16 @@ INPUT_FILE = "D:/INTRANET/Netinfo/Data/network_device_inventory.json"
 OUTPUT_JSON_FILE = "D:/INTRANET/Netinfo/Data/ping_results.json"
 
 # 🌐 API URL'leri
-API_URL = "https://network-api.npe.fedex.com/v1/tshoot/ping?hosts={host}&count=1&timeout=1500"
-AUTH_URL = "https://network-api.npe.fedex.com/v1/authorize"
+NETDB_API_URL = os.environ.get("NETDB_API_URL", "https://network-api.npe.fedex.com/v1").rstrip("/")  # Yerel test: Scripts/fake_api_server.py
+API_URL = NETDB_API_URL + "/tshoot/ping?hosts={host}&count=1&timeout=1500"
+AUTH_URL = f"{NETDB_API_URL}/authorize"
+
+# 📦 Batch ayarları
+BATCH_SIZE = 50                # tshoot çağrısı başına en fazla host
+MAX_URL_LENGTH = 2000          # Proxy/API tarafında güvenli URL uzunluğu
+MAX_WORKERS = 8                # Eşzamanlı batch isteği
+PING_TIMEOUT_MS = 1500
+REQUEST_TIMEOUT = (5, 60)      # (connect, read) - batch yanıtı tüm hostları bekler
 
 
 # 🔐 Şifreleme ve kimlik bilgileri yükleme
@@ -72,27 +82,83 @@ def get_bearer_token():
         return None
 
 
+# 🔌 Paylaşılan HTTP oturumu (bağlantı havuzu)
+def create_session(bearer_token):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        'Accept': 'application/json',
+        'Authorization': f'Bearer {bearer_token}'
+    })
+    return session
+
+
+# 📦 Hostları URL ve API limitlerine göre batch'lere böl
+def make_batches(hosts, batch_size=BATCH_SIZE, max_url_length=MAX_URL_LENGTH):
+    base_length = len(API_URL.format(host=""))
+    batches = []
+    batch = []
+    length = base_length
+
+    for host in hosts:
+        added = len(host) + (1 if batch else 0)
+        if batch and (len(batch) >= batch_size or length + added > max_url_length):
+            batches.append(batch)
+            batch = []
+            length = base_length
+            added = len(host)
+        batch.append(host)
+        length += added
+
+    if batch:
+        batches.append(batch)
+    return batches
+
+
 # 📡 Ping atma fonksiyonu
-def ping_host(ip, bearer_token):
-    """API üzerinden verilen IP adresine ping atar ve sonucu döndürür."""
+def ping_batch(hosts, session):
+    """Tek tshoot çağrısıyla birden fazla hosta ping atar; sonuç host bazlı results map'idir."""
     try:
-        url = API_URL.format(host=ip)
-        headers = {
-            'Accept': 'application/json',
-            'Authorization': f'Bearer {bearer_token}'
-        }
-        response = requests.get(url, headers=headers)
+        url = API_URL.format(host=",".join(hosts))
+        response = session.get(url, timeout=REQUEST_TIMEOUT)
 
         if response.status_code == 200:
             return response.json()
         else:
-            print(f"⚠️ {ip} için veri alınamadı! {response.status_code} - {response.text}")
+            print(f"⚠️ {len(hosts)} host için veri alınamadı! {response.status_code} - {response.text}")
             return None
     except Exception as e:
-        print(f"❌ {ip} için hata oluştu: {e}")
+        print(f"❌ {len(hosts)} hostluk batch için hata oluştu: {e}")
         return None
 
 
+def ping_host(ip, bearer_token):
+    """API üzerinden verilen IP adresine ping atar ve sonucu döndürür."""
+    with create_session(bearer_token) as session:
+        return ping_batch([ip], session)
+
+
+def parse_batch_result(hosts, result):
+    """API yanıtını kayıt listesine çevirir; yanıtta olmayan hostlar başarısız sayılır."""
+    rows = []
+    results = (result or {}).get("results", {})
+    permalink = (result or {}).get("permalink", "")
+
+    for ip in hosts:
+        data = results.get(ip)
+        rows.append({
+            "IP Address": ip,
+            "Success": data.get("success", False) if data else False,
+            "Ping Count": data.get("count", 0) if data else 0,
+            "Timeout (ms)": data.get("timeout", 0) if data else PING_TIMEOUT_MS,
+            "Permalink": permalink,
+            "Error": None if data else ("no_response" if result else "request_failed")
+        })
+    return rows
+
+
 # 📥 JSON'dan IP adreslerini oku
 def load_ip_addresses():
     if not os.path.exists(INPUT_FILE):
@@ -105,11 +171,15 @@ def load_ip_addresses():
 
 
 # 📤 Sonuçları JSON olarak kaydet
-def save_results_to_json(results, filename):
+def save_results_to_json(results, filename, quiet=False):
+    """Geçici dosyaya yazıp yer değiştirir; okuyucular yarım dosya görmez."""
+    temp_file = filename + ".tmp"
     try:
-        with open(filename, "w", encoding="utf-8") as f:
+        with open(temp_file, "w", encoding="utf-8") as f:
             json.dump(results, f, indent=2, ensure_ascii=False)
-        print(f"✅ Sonuçlar {filename} dosyasına kaydedildi.")
+        os.replace(temp_file, filename)
+        if not quiet:
+            print(f"✅ Sonuçlar {filename} dosyasına kaydedildi.")
     except Exception as e:
         print(f"❌ JSON'a kaydederken hata oluştu: {e}")
 
@@ -130,27 +200,32 @@ def main():
         print("⚠️ IP adresleri bulunamadı! İşlem sonlandırılıyor.")
         return
 
+    # Aynı IP birden fazla cihazda geçebilir
+    ip_addresses = list(dict.fromkeys(ip_addresses))
+    batches = make_batches(ip_addresses)
+    print(f"📦 {len(ip_addresses)} IP, {len(batches)} batch halinde sorgulanıyor...")
+
     # Sonuçları tutacak liste
     ping_results = {
         "timestamp": datetime.now().isoformat(),
+        "complete": False,
+        "total": len(ip_addresses),
         "results": []
     }
 
-    # Ping işlemi yap
-    for ip in ip_addresses:
-        result = ping_host(ip, bearer_token)
-        if result:
-            for ip, data in result.get("results", {}).items():
-                ping_results["results"].append({
-                    "IP Address": ip,
-                    "Success": data.get("success", False),
-                    "Ping Count": data.get("count", 0),
-                    "Timeout (ms)": data.get("timeout", 0),
-                    "Permalink": result.get("permalink", "")
-                })
+    # Batch'ler eşzamanlı çalışır; her biten batch dosyaya hemen yazılır
+    with create_session(bearer_token) as session, ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {executor.submit(ping_batch, batch, session): batch for batch in batches}
+        for future in as_completed(futures):
+            result = future.result()
+            ping_results["results"].extend(parse_batch_result(futures[future], result))
+            # Hiç yanıt alınamadıysa önceki sağlam dosya ezilmez
+            if result:
+                save_results_to_json(ping_results, OUTPUT_JSON_FILE, quiet=True)
 
     # Sonuçları JSON olarak kaydet
-    if ping_results["results"]:
+    ping_results["complete"] = True
+    if any(row["Error"] != "request_failed" for row in ping_results["results"]):
         save_results_to_json(ping_results, OUTPUT_JSON_FILE)
     else:
         print("❌ Hiç ping sonucu alınamadı!")